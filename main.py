@@ -20,16 +20,31 @@ import sqlite3
 import datetime
 from datetime import datetime as dt, timedelta
 import json
-import urllib.request
+import re
+import hashlib
+import zlib
+import tempfile
+import math
+import urllib.parse
+import http.client
+import numpy as np
 import matplotlib
 matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 from pathlib import Path
+from contextlib import contextmanager
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+from functools import lru_cache
+from itertools import islice
+from typing import NamedTuple, Optional
 import warnings
 import threading
-import shutil
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import time
 import sys
 import os
 
@@ -187,12 +202,899 @@ ICONOS_CATEGORIAS = [
 ]
 
 
+# === DINERO ===
+class Dinero:
+    """
+    Importe monetario exacto guardado en centavos enteros.
+    Dinero.desde(1234.5) convierte desde unidades; Dinero(123450) recibe centavos.
+    Se formatea como un número ('{:,.0f}') y opera con números y con otros Dinero.
+    En SQLite se guarda como INTEGER en las columnas declaradas DINERO.
+    """
+    __slots__ = ('centavos',)
+
+    def __init__(self, centavos=0):
+        self.centavos = int(centavos)
+
+    @classmethod
+    def desde(cls, valor):
+        """Convierte un importe en unidades (float, int, str, Decimal) redondeando al centavo"""
+        if valor is None or isinstance(valor, Dinero):
+            return valor
+        if isinstance(valor, int):
+            return cls(valor * 100)
+        centavos = (Decimal(str(valor)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+        return cls(centavos)
+
+    @classmethod
+    def _desde_sqlite(cls, valor):
+        try:
+            return cls(int(valor))
+        except ValueError:
+            # Valor REAL heredado que no pasó por la migración
+            return cls(round(float(valor)))
+
+    def repartir(self, partes):
+        """Divide en `partes` importes que suman exactamente el total"""
+        base, resto = divmod(self.centavos, partes)
+        return [Dinero(base + (1 if i < resto else 0)) for i in range(partes)]
+
+    def _centavos_de(self, otro):
+        if isinstance(otro, Dinero):
+            return otro.centavos
+        if isinstance(otro, (int, float, Decimal)):
+            return Dinero.desde(otro).centavos
+        return None
+
+    def __add__(self, otro):
+        centavos = self._centavos_de(otro)
+        return NotImplemented if centavos is None else Dinero(self.centavos + centavos)
+
+    __radd__ = __add__
+
+    def __sub__(self, otro):
+        centavos = self._centavos_de(otro)
+        return NotImplemented if centavos is None else Dinero(self.centavos - centavos)
+
+    def __rsub__(self, otro):
+        centavos = self._centavos_de(otro)
+        return NotImplemented if centavos is None else Dinero(centavos - self.centavos)
+
+    def __mul__(self, factor):
+        if isinstance(factor, (int, float, Decimal)) and not isinstance(factor, bool):
+            return Dinero(round(self.centavos * factor))
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, otro):
+        # Dinero / Dinero es una proporción; Dinero / número sigue siendo Dinero
+        if isinstance(otro, Dinero):
+            return self.centavos / otro.centavos
+        if isinstance(otro, (int, float, Decimal)):
+            return Dinero(round(self.centavos / otro))
+        return NotImplemented
+
+    def __neg__(self):
+        return Dinero(-self.centavos)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Dinero(abs(self.centavos))
+
+    def __bool__(self):
+        return self.centavos != 0
+
+    def __float__(self):
+        return self.centavos / 100
+
+    def __int__(self):
+        # Trunca hacia cero como int(float), pero sin pasar por float
+        unidades = abs(self.centavos) // 100
+        return -unidades if self.centavos < 0 else unidades
+
+    def __round__(self, ndigits=None):
+        return round(float(self), ndigits)
+
+    def _comparables(self, otro):
+        # Todas las comparaciones usan el valor exacto, sin redondear al centavo: contra
+        # números, las unidades como Fraction. Así el orden es total y a == b implica
+        # hash(a) == hash(b) también con int, float y Decimal.
+        if isinstance(otro, Dinero):
+            return self.centavos, otro.centavos
+        if isinstance(otro, (int, float, Decimal)):
+            return Fraction(self.centavos, 100), otro
+        return None
+
+    def __eq__(self, otro):
+        par = self._comparables(otro)
+        return NotImplemented if par is None else par[0] == par[1]
+
+    def __lt__(self, otro):
+        par = self._comparables(otro)
+        return NotImplemented if par is None else par[0] < par[1]
+
+    def __le__(self, otro):
+        par = self._comparables(otro)
+        return NotImplemented if par is None else par[0] <= par[1]
+
+    def __gt__(self, otro):
+        par = self._comparables(otro)
+        return NotImplemented if par is None else par[0] > par[1]
+
+    def __ge__(self, otro):
+        par = self._comparables(otro)
+        return NotImplemented if par is None else par[0] >= par[1]
+
+    def __hash__(self):
+        # El mismo hash que el número de igual valor: Dinero(100) == 1 y hash(1)
+        if self.centavos % 100 == 0:
+            return hash(self.centavos // 100)
+        return hash(Fraction(self.centavos, 100))
+
+    def __format__(self, formato):
+        return format(float(self), formato) if formato else str(self)
+
+    def __str__(self):
+        signo = '-' if self.centavos < 0 else ''
+        unidades, centavos = divmod(abs(self.centavos), 100)
+        return f"{signo}{unidades}.{centavos:02d}"
+
+    def __repr__(self):
+        return f"Dinero('{self}')"
+
+
+sqlite3.register_adapter(Dinero, lambda dinero: dinero.centavos)
+sqlite3.register_converter('DINERO', Dinero._desde_sqlite)
+
+
+# === REGISTROS ===
+# Un tipo por tabla. Son NamedTuple (sin __dict__ por fila) y se leen por nombre:
+# g.monto en lugar de g[3]. Las consultas piden las columnas explícitamente con
+# columnas(Registro), así que agregar columnas a una tabla no corre los índices.
+class Gasto(NamedTuple):
+    id: int
+    fecha: str
+    categoria: str
+    monto: Dinero
+    moneda: str
+    descripcion: str
+    cuenta: str
+    notas: str
+
+
+class GastoUbicado(NamedTuple):
+    id: int
+    fecha: str
+    categoria: str
+    monto: Dinero
+    moneda: str
+    descripcion: str
+    cuenta: str
+    notas: str
+    lugar_nombre: str
+    comercio: str
+    latitud: float
+    longitud: float
+
+
+class Categoria(NamedTuple):
+    id: int
+    nombre: str
+    color: str
+    icono: str
+    categoria_padre: Optional[str]
+
+
+class Cuenta(NamedTuple):
+    id: int
+    nombre: str
+    tipo: str
+
+
+class Sueldo(NamedTuple):
+    id: int
+    mes: str
+    monto: Dinero
+    bonos: Dinero
+
+
+class MetaAhorro(NamedTuple):
+    id: int
+    nombre: str
+    monto_objetivo: Dinero
+    monto_actual: Dinero
+    fecha_inicio: str
+    fecha_objetivo: str
+    moneda: str
+    icono: str
+    completada: int
+
+
+class Tarjeta(NamedTuple):
+    id: int
+    nombre: str
+    banco: str
+    limite: Dinero
+    dia_cierre: int
+    dia_vencimiento: int
+    activa: int
+    color: str
+
+
+class Recurrente(NamedTuple):
+    id: int
+    nombre: str
+    categoria: str
+    monto: Dinero
+    moneda: str
+    cuenta: str
+    frecuencia: str
+    dia_mes: int
+    activa: int
+    ultima_ejecucion: Optional[str]
+
+
+class Presupuesto(NamedTuple):
+    id: int
+    categoria: str
+    mes: str
+    limite: Dinero
+
+
+class CuentaPorPagar(NamedTuple):
+    id: int
+    nombre: str
+    categoria: str
+    monto: Dinero
+    moneda: str
+    dia_vencimiento: int
+    activa: int
+    ultima_alerta: Optional[str]
+    notas: str
+
+
+class Alerta(NamedTuple):
+    id: int
+    tipo: str
+    mensaje: str
+    fecha: str
+    leida: int
+    nivel: str
+
+
+class Deuda(NamedTuple):
+    id: int
+    nombre: str
+    monto_total: Dinero
+    monto_pagado: Dinero
+    con_quien: str
+    tipo: str
+    fecha_creacion: str
+    fecha_vencimiento: Optional[str]
+    saldada: int
+    notas: str
+
+
+class FinScore(NamedTuple):
+    id: int
+    fecha: str
+    puntuacion: int
+    ahorro_mensual: Dinero
+    gasto_promedio: Dinero
+    deudas_totales: Dinero
+    cumplimiento_presupuestos: Optional[float]
+    racha_dias: int
+
+
+class Logro(NamedTuple):
+    id: int
+    nombre: str
+    descripcion: str
+    icono: str
+    desbloqueado: int
+    fecha_desbloqueo: Optional[str]
+    progreso_actual: int
+    progreso_objetivo: int
+
+
+class ReglaContexto(NamedTuple):
+    id: int
+    nombre: str
+    tipo_trigger: str
+    condicion: str
+    accion: str
+    parametros: str
+    activa: int
+    ultima_ejecucion: Optional[str]
+
+
+class ReglaGeofence(NamedTuple):
+    id: int
+    nombre: str
+    latitud: float
+    longitud: float
+    radio_metros: int
+    categoria_sugerida: Optional[str]
+    cuenta_sugerida: Optional[str]
+    activa: int
+
+
+class ReglaAhorro(NamedTuple):
+    id: int
+    nombre: str
+    tipo_regla: str
+    activa: int
+    modo_agresividad: str
+    meta_destino_id: Optional[int]
+    ultima_ejecucion: Optional[str]
+    monto_ahorrado_total: Dinero
+    configuracion: Optional[str]
+
+
+class Suscripcion(NamedTuple):
+    id: int
+    nombre: str
+    categoria: Optional[str]
+    monto: Dinero
+    moneda: str
+    frecuencia: str
+    dia_cobro: Optional[int]
+    fecha_inicio: str
+    fecha_proximo_cobro: Optional[str]
+    activa: int
+    recordatorio_dias_antes: int
+    proveedor: Optional[str]
+    notas: Optional[str]
+
+
+class GrupoSplitwise(NamedTuple):
+    id: int
+    nombre: str
+    descripcion: str
+    tipo: str
+    fecha_creacion: str
+    activo: int
+    icono: str
+
+
+class ParticipanteSplitwise(NamedTuple):
+    id: int
+    grupo_id: int
+    nombre: str
+    email: str
+
+
+class GastoSplitwise(NamedTuple):
+    id: int
+    grupo_id: int
+    descripcion: str
+    monto_total: Dinero
+    moneda: str
+    pagado_por: str
+    fecha: str
+    categoria: str
+    metodo_division: str
+    notas: str
+
+
+class PresupuestoCompartido(NamedTuple):
+    id: int
+    nombre: str
+    categoria: Optional[str]
+    limite: Dinero
+    mes: str
+    moneda: str
+    compartido: int
+    creado_por: str
+    fecha_creacion: str
+    descripcion: str
+    icono: str
+
+
+class ParticipantePresupuesto(NamedTuple):
+    id: int
+    presupuesto_id: int
+    nombre: str
+    email: str
+    rol: str
+    fecha_agregado: str
+    activo: int
+
+
+class AlertaConfiguracion(NamedTuple):
+    id: int
+    tipo_alerta: str
+    categoria: Optional[str]
+    umbral_porcentaje: int
+    activa: int
+    frecuencia: str
+    ultima_notificacion: Optional[str]
+    parametros: Optional[str]
+
+
+class NotificacionBuddy(NamedTuple):
+    id: int
+    tipo: str
+    titulo: str
+    mensaje: str
+    categoria: Optional[str]
+    presupuesto_id: Optional[int]
+    nivel: str
+    fecha: str
+    leida: int
+    accion_requerida: int
+
+
+class TemaColor(NamedTuple):
+    id: int
+    nombre: str
+    primary_color: str
+    secondary_color: str
+    success_color: str
+    danger_color: str
+    warning_color: str
+    info_color: str
+    background_color: str
+    card_bg_color: str
+    activo: int
+
+
+@lru_cache(maxsize=None)
+def columnas(registro, prefijo=''):
+    """Lista de columnas de un registro para usar en SELECT (con prefijo de tabla opcional)"""
+    return ', '.join(f'{prefijo}{campo}' for campo in registro._fields)
+
+
+@lru_cache(maxsize=None)
+def fabrica_registro(registro):
+    """row_factory que arma `registro` directamente desde la tupla de SQLite"""
+    nuevo = tuple.__new__
+
+    def fabrica(cursor, fila):
+        return nuevo(registro, fila)
+    return fabrica
+
+
+# === FECHAS ===
+def rango_mes(mes):
+    """
+    Convierte un mes 'YYYY-MM' en el rango semiabierto [inicio, fin) de fechas ISO.
+    Permite filtrar con fecha >= ? AND fecha < ? y aprovechar los índices sobre fecha.
+    """
+    anio, numero = (int(parte) for parte in mes.split('-')[:2])
+    inicio = datetime.date(anio, numero, 1)
+    if numero == 12:
+        fin = datetime.date(anio + 1, 1, 1)
+    else:
+        fin = datetime.date(anio, numero + 1, 1)
+    return inicio.isoformat(), fin.isoformat()
+
+
+def meses_anteriores(mes, cantidad):
+    """Los `cantidad` meses 'YYYY-MM' anteriores a `mes`, del más viejo al más reciente"""
+    anio, numero = (int(parte) for parte in mes.split('-')[:2])
+    indice = anio * 12 + numero - 1
+    return [f'{i // 12:04d}-{i % 12 + 1:02d}' for i in range(indice - cantidad, indice)]
+
+
+# === BÚSQUEDA ===
+def consulta_fts(texto):
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5: todas las palabras deben
+    aparecer y la última, desde dos letras, se toma como prefijo (búsqueda mientras se escribe).
+    Cada palabra va entre comillas para que los operadores de FTS5 no se interpreten.
+    """
+    palabras = [p.replace('"', '') for p in (texto or '').split()]
+    palabras = [p for p in palabras if any(c.isalnum() for c in p)]
+    if not palabras:
+        return ''
+    terminos = [f'"{p}"' for p in palabras]
+    # Con una sola letra el prefijo abarcaría medio vocabulario: se busca la palabra exacta
+    if len(palabras[-1]) >= 2:
+        terminos[-1] += '*'
+    return ' '.join(terminos)
+
+
+# === GEOHASH ===
+BASE32_GEOHASH = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Precisión con que se guardan las ubicaciones (9 caracteres ≈ celdas de 5 m)
+PRECISION_GEOHASH = 9
+RADIO_TIERRA_M = 6371000
+METROS_POR_GRADO = RADIO_TIERRA_M * math.pi / 180
+# Cantidad máxima de rangos del índice que se consultan por búsqueda por radio
+MAXIMO_CELDAS_GEOHASH = 32
+
+
+def geohash_codificar(lat, lon, precision=PRECISION_GEOHASH):
+    """Geohash estándar en base 32: intercala bits de longitud y latitud partiendo el rango a la mitad"""
+    rango_lat, rango_lon = [-90.0, 90.0], [-180.0, 180.0]
+    codigo, bits, valor, es_lon = [], 0, 0, True
+    while len(codigo) < precision:
+        rango, coordenada = (rango_lon, lon) if es_lon else (rango_lat, lat)
+        medio = (rango[0] + rango[1]) / 2
+        valor <<= 1
+        if coordenada >= medio:
+            valor |= 1
+            rango[0] = medio
+        else:
+            rango[1] = medio
+        es_lon = not es_lon
+        bits += 1
+        if bits == 5:
+            codigo.append(BASE32_GEOHASH[valor])
+            bits, valor = 0, 0
+    return ''.join(codigo)
+
+
+def geohash_tamano_celda(precision):
+    """Alto y ancho en grados de una celda de geohash de `precision` caracteres"""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** (bits - bits // 2)
+
+
+def caja_radio(lat, lon, radio_metros):
+    """Rectángulo (lat_min, lat_max, lon_min, lon_max) en grados que contiene el círculo"""
+    d_lat = radio_metros / METROS_POR_GRADO
+    lat_min, lat_max = max(lat - d_lat, -90.0), min(lat + d_lat, 90.0)
+    # El ancho en grados se toma en el borde más cercano al polo, donde el círculo es más ancho
+    d_lon = radio_metros / (METROS_POR_GRADO * max(math.cos(math.radians(max(abs(lat_min), abs(lat_max)))), 1e-6))
+    return lat_min, lat_max, lon - d_lon, lon + d_lon
+
+
+def geohash_celdas_radio(lat, lon, radio_metros, maximo_celdas=MAXIMO_CELDAS_GEOHASH):
+    """
+    Prefijos de geohash que cubren el rectángulo del círculo, con la precisión más fina
+    que lo cubre con a lo sumo `maximo_celdas` celdas (cuanto más finas, menos filas de
+    más trae cada rango del índice).
+    """
+    lat_min, lat_max, lon_min, lon_max = caja_radio(lat, lon, radio_metros)
+    precision = PRECISION_GEOHASH
+    while precision > 1:
+        alto, ancho = geohash_tamano_celda(precision)
+        cantidad = (math.floor(lat_max / alto) - math.floor(lat_min / alto) + 1) * \
+                   (math.floor(lon_max / ancho) - math.floor(lon_min / ancho) + 1)
+        if cantidad <= maximo_celdas:
+            break
+        precision -= 1
+
+    alto, ancho = geohash_tamano_celda(precision)
+    celdas = set()
+    for i in range(math.floor(lat_min / alto), math.floor(lat_max / alto) + 1):
+        for j in range(math.floor(lon_min / ancho), math.floor(lon_max / ancho) + 1):
+            # Centro de cada celda de la grilla; la longitud se da vuelta en el antimeridiano
+            lat_celda = min((i + 0.5) * alto, 90.0 - alto / 2)
+            lon_celda = ((j + 0.5) * ancho + 180) % 360 - 180
+            celdas.add(geohash_codificar(lat_celda, lon_celda, precision))
+    return sorted(celdas)
+
+
+def distancia_metros(lat1, lon1, lat2, lon2):
+    """Distancia sobre la esfera terrestre (fórmula de Haversine)"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distancias_metros(lat, lon, lats, lons):
+    """distancia_metros vectorizada: de un punto (o arrays de puntos) a arrays de puntos, en una sola pasada"""
+    lat, lon, lats, lons = (np.radians(np.asarray(x, dtype=float)) for x in (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * RADIO_TIERRA_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+# === GEOFENCES ===
+# Lado en grados de la grilla que preindexa las geocercas (~1 km de latitud)
+CELDA_GEOFENCE_GRADOS = 0.01
+# Geocercas que ocupan más celdas que esto se revisan siempre en lugar de indexarse
+MAXIMO_CELDAS_GEOFENCE = 400
+
+
+class IndiceGeofence:
+    """Geocercas en arrays contiguos con una grilla de celdas -> geocercas que la tocan.
+
+    Cada punto se compara solo contra las geocercas de su celda (y las muy grandes, que
+    se revisan siempre), todas las distancias de una vez, y gana la más cercana que lo
+    contiene.
+    """
+
+    def __init__(self, reglas):
+        self.reglas = list(reglas)
+        self.latitudes = np.array([r.latitud for r in self.reglas], dtype=float)
+        self.longitudes = np.array([r.longitud for r in self.reglas], dtype=float)
+        self.radios = np.array([r.radio_metros for r in self.reglas], dtype=float)
+
+        celdas, siempre = {}, []
+        for indice, regla in enumerate(self.reglas):
+            lat_min, lat_max, lon_min, lon_max = caja_radio(regla.latitud, regla.longitud, regla.radio_metros)
+            filas = range(self._celda(lat_min), self._celda(lat_max) + 1)
+            columnas_celda = range(self._celda(lon_min), self._celda(lon_max) + 1)
+            if len(filas) * len(columnas_celda) > MAXIMO_CELDAS_GEOFENCE:
+                siempre.append(indice)
+                continue
+            for fila in filas:
+                for columna in columnas_celda:
+                    celdas.setdefault((fila, columna), []).append(indice)
+        self.siempre = np.array(siempre, dtype=np.int64)
+        self.celdas = {celda: np.concatenate([indices, self.siempre]).astype(np.int64)
+                       for celda, indices in celdas.items()}
+
+    @staticmethod
+    def _celda(grados):
+        return int(math.floor(grados / CELDA_GEOFENCE_GRADOS))
+
+    def _candidatas(self, lat, lon):
+        return self.celdas.get((self._celda(lat), self._celda(lon)), self.siempre)
+
+    def buscar(self, lat, lon):
+        """La regla más cercana que contiene el punto, o None"""
+        candidatas = self._candidatas(lat, lon)
+        if not len(candidatas):
+            return None
+        distancias = distancias_metros(lat, lon, self.latitudes[candidatas], self.longitudes[candidatas])
+        distancias[distancias > self.radios[candidatas]] = np.inf
+        mejor = int(np.argmin(distancias))
+        return self.reglas[candidatas[mejor]] if np.isfinite(distancias[mejor]) else None
+
+    def buscar_lote(self, lats, lons):
+        """Índice (en self.reglas) de la regla más cercana que contiene cada punto, -1 si ninguna"""
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        resultado = np.full(len(lats), -1, dtype=np.int64)
+        if not len(lats) or not self.reglas:
+            return resultado
+
+        # Se agrupan los puntos por celda: una matriz puntos × candidatas por celda
+        claves = np.stack([np.floor(lats / CELDA_GEOFENCE_GRADOS), np.floor(lons / CELDA_GEOFENCE_GRADOS)], axis=1)
+        celdas, grupo = np.unique(claves.astype(np.int64), axis=0, return_inverse=True)
+        grupo = grupo.ravel()
+        orden = np.argsort(grupo, kind='stable')
+        cortes = np.cumsum(np.bincount(grupo, minlength=len(celdas)))[:-1]
+        for (fila, columna), puntos in zip(celdas.tolist(), np.split(orden, cortes)):
+            candidatas = self.celdas.get((fila, columna), self.siempre)
+            if not len(candidatas):
+                continue
+            distancias = distancias_metros(lats[puntos, None], lons[puntos, None],
+                                           self.latitudes[candidatas], self.longitudes[candidatas])
+            distancias[distancias > self.radios[candidatas]] = np.inf
+            mejores = np.argmin(distancias, axis=1)
+            dentro = np.isfinite(distancias[np.arange(len(puntos)), mejores])
+            resultado[puntos[dentro]] = candidatas[mejores[dentro]]
+        return resultado
+
+
 # === BASE DE DATOS ===
+# Ajustes aplicados a cada conexión SQLite
+PRAGMAS_SQLITE = {
+    'journal_mode': 'WAL',        # Lectores y escritores no se bloquean entre sí
+    'synchronous': 'NORMAL',      # Seguro con WAL y evita un fsync por commit
+    'cache_size': -32000,         # Negativo = KiB (~32 MB de caché de páginas)
+    'mmap_size': 268435456,       # 256 MB mapeados en memoria para lecturas
+    'temp_store': 'MEMORY',       # Tablas temporales y ordenamientos en RAM
+}
+
+
+def configurar_conexion(conn, solo_lectura=False):
+    """Aplica los PRAGMAS_SQLITE a una conexión"""
+    for pragma, valor in PRAGMAS_SQLITE.items():
+        # El modo de journal se guarda en el archivo, solo lo fija quien escribe
+        if solo_lectura and pragma == 'journal_mode':
+            continue
+        conn.execute(f'PRAGMA {pragma} = {valor}')
+    return conn
+
+
+def benchmark_conexion(filas_unitarias=1000, filas_lote=100000, segundos_lectura=2.0, semilla=0):
+    """Compara escrituras y lecturas con la conexión por defecto de SQLite y con PRAGMAS_SQLITE"""
+    import random
+    print(f"{'conexión':>10} {'ins/s c/u':>10} {'ins/s lote':>11} {'lect/s':>8} {'lect/s+escr':>12}")
+    for nombre, configurar in (('defecto', lambda conn, solo_lectura=False: conn), ('ajustada', configurar_conexion)):
+        aleatorio = random.Random(semilla)
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = str(Path(directorio) / 'gastos.db')
+            conn = configurar(sqlite3.connect(ruta))
+            conn.execute('CREATE TABLE gastos (id INTEGER PRIMARY KEY, fecha TEXT, categoria TEXT, monto INTEGER)')
+            conn.execute('CREATE INDEX idx_gastos_fecha ON gastos(fecha)')
+            conn.commit()
+
+            def fila():
+                return (f"2025-{aleatorio.randint(1, 12):02d}-{aleatorio.randint(1, 28):02d}",
+                        aleatorio.choice('ABCDEFGH'), aleatorio.randint(100, 5000000))
+
+            # Un commit por gasto, como agregar_gasto desde la UI
+            inicio = time.perf_counter()
+            for _ in range(filas_unitarias):
+                conn.execute('INSERT INTO gastos (fecha, categoria, monto) VALUES (?, ?, ?)', fila())
+                conn.commit()
+            unitarias = filas_unitarias / (time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            conn.executemany('INSERT INTO gastos (fecha, categoria, monto) VALUES (?, ?, ?)',
+                             (fila() for _ in range(filas_lote)))
+            conn.commit()
+            lote = filas_lote / (time.perf_counter() - inicio)
+
+            lector = configurar(sqlite3.connect(ruta), solo_lectura=True)
+
+            def lecturas():
+                cantidad, fin = 0, time.perf_counter() + segundos_lectura
+                while time.perf_counter() < fin:
+                    mes = aleatorio.randint(1, 12)
+                    lector.execute('SELECT categoria, SUM(monto) FROM gastos WHERE fecha >= ? AND fecha < ? GROUP BY categoria',
+                                   (f"2025-{mes:02d}-01", f"2025-{mes:02d}-32")).fetchall()
+                    cantidad += 1
+                return cantidad / segundos_lectura
+
+            solas = lecturas()
+
+            # Las mismas lecturas mientras otro hilo confirma gastos de a uno
+            detener = threading.Event()
+
+            def escritor():
+                escritura = configurar(sqlite3.connect(ruta))
+                while not detener.is_set():
+                    escritura.execute('INSERT INTO gastos (fecha, categoria, monto) VALUES (?, ?, ?)', ('2025-06-15', 'A', 100))
+                    escritura.commit()
+                escritura.close()
+
+            hilo = threading.Thread(target=escritor, daemon=True)
+            hilo.start()
+            try:
+                concurrentes = lecturas()
+            finally:
+                detener.set()
+                hilo.join()
+            lector.close()
+            conn.close()
+        print(f"{nombre:>10} {unitarias:>10.0f} {lote:>11.0f} {solas:>8.0f} {concurrentes:>12.0f}")
+
+
 class Database:
+    # Pasos de migración en orden: la posición (desde 1) es la versión del esquema
+    # guardada en PRAGMA user_version. Los pasos nuevos se agregan siempre al final
+    # y deben ser idempotentes; nunca reordenar ni editar un paso ya publicado.
+    MIGRACIONES = (
+        'crear_tablas',
+        'inicializar_datos',
+        'crear_indices_gastos',
+        'crear_resumen_mensual',
+        'convertir_montos_a_centavos',
+        'crear_tabla_cotizaciones',
+        'crear_estado_logros',
+        'crear_alertas_enviadas',
+        'crear_estadisticas_gastos',
+        'crear_versiones_datos',
+        'unificar_finscore_diario',
+        'crear_balances_splitwise',
+        'crear_busqueda_gastos',
+        'recodificar_geohash_ubicaciones',
+        'versionar_reglas_geofence',
+        'agregar_columnas_faltantes',
+        'completar_triggers_splitwise',
+    )
+
+    # Columnas sumadas a tablas que ya pueden existir en bases de usuarios: CREATE TABLE
+    # IF NOT EXISTS no las agrega, así que migrar() las completa con ALTER TABLE antes
+    # de los pasos pendientes. Se agregan al final: (tabla, columna, definición), y junto
+    # con un paso 'agregar_columnas_faltantes' más al final de MIGRACIONES para que las
+    # bases ya al día también lo corran.
+    COLUMNAS_AGREGADAS = (
+        ('categorias', 'categoria_padre', 'TEXT DEFAULT NULL'),
+        ('alertas', 'nivel', "TEXT DEFAULT 'info'"),
+    )
+
+    # Efecto de cada división impaga y cada pago sobre el saldo de un participante
+    # (positivo = le deben). Sumado por grupo y participante da los balances.
+    MOVIMIENTOS_SPLITWISE = '''
+        SELECT g.grupo_id, d.participante, -d.monto_debe AS importe
+        FROM divisiones_splitwise d JOIN gastos_splitwise g ON g.id = d.gasto_id
+        WHERE COALESCE(d.pagado, 0) = 0 AND d.participante != g.pagado_por
+        UNION ALL
+        SELECT g.grupo_id, g.pagado_por, d.monto_debe
+        FROM divisiones_splitwise d JOIN gastos_splitwise g ON g.id = d.gasto_id
+        WHERE COALESCE(d.pagado, 0) = 0 AND d.participante != g.pagado_por
+        UNION ALL
+        SELECT grupo_id, de_quien, monto FROM pagos_splitwise
+        UNION ALL
+        SELECT grupo_id, para_quien, -monto FROM pagos_splitwise
+    '''
+
+    # Tablas cuyos cambios invalidan los cálculos cacheados (ver version_datos)
+    TABLAS_VERSIONADAS = ('gastos', 'presupuestos', 'deudas_compartidas', 'reglas_geofence')
+    # Entradas del FinScore: si no cambian, el puntaje del día sigue valiendo
+    ENTRADAS_FINSCORE = ('gastos', 'presupuestos', 'deudas_compartidas')
+
+    # Columnas de importes que se guardan como centavos enteros (tipo DINERO)
+    COLUMNAS_DINERO = {
+        'gastos': ('monto',),
+        'sueldos': ('monto', 'bonos'),
+        'metas_ahorro': ('monto_objetivo', 'monto_actual'),
+        'tarjetas': ('limite',),
+        'transacciones_recurrentes': ('monto',),
+        'presupuestos': ('limite',),
+        'cuentas_por_pagar': ('monto',),
+        'deudas_compartidas': ('monto_total', 'monto_pagado'),
+        'reglas_ahorro_auto': ('monto_ahorrado_total',),
+        'suscripciones': ('monto',),
+        'finscore_historico': ('ahorro_mensual', 'gasto_promedio', 'deudas_totales'),
+        'gastos_splitwise': ('monto_total',),
+        'divisiones_splitwise': ('monto_debe',),
+        'pagos_splitwise': ('monto',),
+        'presupuestos_compartidos': ('limite',),
+        'resumen_mensual': ('total',),
+    }
+
     def __init__(self):
-        self.conn = sqlite3.connect(str(RUTA_DB))
-        self.crear_tablas()
-        self.inicializar_datos()
+        self.conn = configurar_conexion(sqlite3.connect(str(RUTA_DB), detect_types=sqlite3.PARSE_DECLTYPES))
+        self._nivel_transaccion = 0
+        self.migrar()
+
+        # Conexión solo lectura para reportes y dashboard: con WAL las lecturas
+        # largas no bloquean los inserts hechos por self.conn (y viceversa).
+        # Solo ve datos ya confirmados.
+        uri_lectura = f"{Path(RUTA_DB).resolve().as_uri()}?mode=ro"
+        self.conn_lectura = configurar_conexion(
+            sqlite3.connect(uri_lectura, uri=True, detect_types=sqlite3.PARSE_DECLTYPES), solo_lectura=True)
+
+    def migrar(self):
+        """Aplica las migraciones pendientes según PRAGMA user_version"""
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+
+        if version < len(self.MIGRACIONES):
+            # Los pasos pendientes pueden contar con todas las columnas actuales
+            with self.transaccion():
+                self.agregar_columnas_faltantes()
+
+        for numero, nombre in enumerate(self.MIGRACIONES[version:], start=version + 1):
+            with self.transaccion():
+                getattr(self, nombre)()
+                self.conn.execute(f'PRAGMA user_version = {numero}')
+            print(f"🗄️ Migración {numero} aplicada: {nombre}")
+
+    def agregar_columnas_faltantes(self):
+        """ALTER TABLE ... ADD COLUMN de las COLUMNAS_AGREGADAS que falten en tablas existentes"""
+        cursor = self.conn.cursor()
+        existentes = {}
+        for tabla, columna, definicion in self.COLUMNAS_AGREGADAS:
+            if tabla not in existentes:
+                existentes[tabla] = {fila[1] for fila in cursor.execute(f'PRAGMA table_info({tabla})')}
+            # Tabla inexistente: la crea completa el paso de migración correspondiente
+            if existentes[tabla] and columna not in existentes[tabla]:
+                cursor.execute(f'ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}')
+                existentes[tabla].add(columna)
+                print(f"🗄️ Columna agregada: {tabla}.{columna}")
+
+    @contextmanager
+    def transaccion(self):
+        """
+        Agrupa varias escrituras en un único commit.
+        Se puede anidar: solo el bloque más externo confirma o revierte.
+        """
+        externa = self._nivel_transaccion == 0
+        if externa and not self.conn.in_transaction:
+            self.conn.execute('BEGIN')
+        self._nivel_transaccion += 1
+        try:
+            yield self
+        except Exception:
+            self._nivel_transaccion -= 1
+            if externa:
+                self.conn.rollback()
+            raise
+        self._nivel_transaccion -= 1
+        if externa:
+            self.conn.commit()
+
+    def _confirmar(self):
+        """Hace commit, salvo dentro de una transaccion() que confirmará al final"""
+        if self._nivel_transaccion == 0:
+            self.conn.commit()
+
+    def _consultar(self, registro, sql, parametros=(), lectura=False):
+        """Ejecuta un SELECT cuyas filas se devuelven como `registro`"""
+        cursor = (self.conn_lectura if lectura else self.conn).cursor()
+        cursor.row_factory = fabrica_registro(registro)
+        return cursor.execute(sql, parametros)
 
     def crear_tablas(self):
         cursor = self.conn.cursor()
@@ -584,8 +1486,6 @@ class Database:
             )
         ''')
 
-        self.conn.commit()
-
     def inicializar_datos(self):
         cursor = self.conn.cursor()
 
@@ -640,61 +1540,783 @@ class Database:
             ''', (nombre, primary, secondary, success, danger, warning, info, bg, card_bg, 1 if nombre == 'Default' else 0))
 
         # Configuraciones de alertas proactivas (estilo Buddy)
-        cursor.execute('INSERT OR IGNORE INTO alertas_configuracion (tipo_alerta, umbral_porcentaje) VALUES (?, ?)', ('presupuesto_porcentaje', 80))
-        cursor.execute('INSERT OR IGNORE INTO alertas_configuracion (tipo_alerta, umbral_porcentaje) VALUES (?, ?)', ('presupuesto_porcentaje', 90))
-        cursor.execute('INSERT OR IGNORE INTO alertas_configuracion (tipo_alerta, umbral_porcentaje) VALUES (?, ?)', ('presupuesto_porcentaje', 100))
+        # La tabla no tiene UNIQUE, así que se evita duplicar con NOT EXISTS
+        for umbral in (80, 90, 100):
+            cursor.execute('''
+                INSERT INTO alertas_configuracion (tipo_alerta, umbral_porcentaje)
+                SELECT ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM alertas_configuracion
+                    WHERE tipo_alerta = ? AND umbral_porcentaje = ? AND categoria IS NULL
+                )
+            ''', ('presupuesto_porcentaje', umbral, 'presupuesto_porcentaje', umbral))
 
-        self.conn.commit()
+    def crear_indices_gastos(self):
+        """Índices para consultas de gastos por rango de fechas"""
+        cursor = self.conn.cursor()
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_gastos_fecha ON gastos(fecha)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_gastos_categoria_fecha ON gastos(categoria, fecha)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_gastos_cuenta_fecha ON gastos(cuenta, fecha)')
+
+    def crear_resumen_mensual(self):
+        """Tabla de totales por mes/categoría/cuenta/moneda mantenida por triggers"""
+        cursor = self.conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS resumen_mensual (
+                mes TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                cuenta TEXT NOT NULL,
+                moneda TEXT NOT NULL,
+                total REAL NOT NULL DEFAULT 0,
+                cantidad INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (mes, categoria, cuenta, moneda)
+            ) WITHOUT ROWID
+        ''')
+        self.crear_triggers_resumen_mensual()
+        self.reconstruir_resumen_mensual()
+
+    def crear_triggers_resumen_mensual(self):
+        """Triggers de gastos que mantienen resumen_mensual al día"""
+        cursor = self.conn.cursor()
+
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_gastos_insert AFTER INSERT ON gastos
+            BEGIN
+                INSERT INTO resumen_mensual (mes, categoria, cuenta, moneda, total, cantidad)
+                VALUES (substr(NEW.fecha, 1, 7), NEW.categoria, NEW.cuenta, COALESCE(NEW.moneda, 'ARS'), NEW.monto, 1)
+                ON CONFLICT (mes, categoria, cuenta, moneda)
+                DO UPDATE SET total = total + excluded.total, cantidad = cantidad + 1;
+            END
+        ''')
+
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_gastos_delete AFTER DELETE ON gastos
+            BEGIN
+                UPDATE resumen_mensual SET total = total - OLD.monto, cantidad = cantidad - 1
+                WHERE mes = substr(OLD.fecha, 1, 7) AND categoria = OLD.categoria
+                  AND cuenta = OLD.cuenta AND moneda = COALESCE(OLD.moneda, 'ARS');
+                DELETE FROM resumen_mensual
+                WHERE mes = substr(OLD.fecha, 1, 7) AND categoria = OLD.categoria
+                  AND cuenta = OLD.cuenta AND moneda = COALESCE(OLD.moneda, 'ARS') AND cantidad <= 0;
+            END
+        ''')
+
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_gastos_update
+            AFTER UPDATE OF fecha, categoria, cuenta, moneda, monto ON gastos
+            BEGIN
+                UPDATE resumen_mensual SET total = total - OLD.monto, cantidad = cantidad - 1
+                WHERE mes = substr(OLD.fecha, 1, 7) AND categoria = OLD.categoria
+                  AND cuenta = OLD.cuenta AND moneda = COALESCE(OLD.moneda, 'ARS');
+                DELETE FROM resumen_mensual
+                WHERE mes = substr(OLD.fecha, 1, 7) AND categoria = OLD.categoria
+                  AND cuenta = OLD.cuenta AND moneda = COALESCE(OLD.moneda, 'ARS') AND cantidad <= 0;
+                INSERT INTO resumen_mensual (mes, categoria, cuenta, moneda, total, cantidad)
+                VALUES (substr(NEW.fecha, 1, 7), NEW.categoria, NEW.cuenta, COALESCE(NEW.moneda, 'ARS'), NEW.monto, 1)
+                ON CONFLICT (mes, categoria, cuenta, moneda)
+                DO UPDATE SET total = total + excluded.total, cantidad = cantidad + 1;
+            END
+        ''')
+
+    def reconstruir_resumen_mensual(self):
+        """Recalcula resumen_mensual desde cero a partir de gastos"""
+        with self.transaccion():
+            cursor = self.conn.cursor()
+            cursor.execute('DELETE FROM resumen_mensual')
+            cursor.execute('''
+                INSERT INTO resumen_mensual (mes, categoria, cuenta, moneda, total, cantidad)
+                SELECT substr(fecha, 1, 7), categoria, cuenta, COALESCE(moneda, 'ARS'), SUM(monto), COUNT(*)
+                FROM gastos
+                GROUP BY substr(fecha, 1, 7), categoria, cuenta, COALESCE(moneda, 'ARS')
+            ''')
+
+    def crear_estado_logros(self):
+        """Estado incremental de los logros: gastos por día, rachas de días seguidos y contadores"""
+        cursor = self.conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS dias_registro (
+                fecha TEXT PRIMARY KEY,
+                cantidad INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        # Cada fila es una racha máxima de días consecutivos con al menos un gasto
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rachas (
+                inicio TEXT PRIMARY KEY,
+                fin TEXT NOT NULL,
+                dias INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_rachas_fin ON rachas(fin)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_rachas_dias ON rachas(dias)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS estado_logros (
+                clave TEXT PRIMARY KEY,
+                valor INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        self.crear_triggers_logros()
+        self.reconstruir_estado_logros()
+
+    def crear_triggers_logros(self):
+        """Triggers que mantienen dias_registro, rachas y estado_logros en O(log n) por gasto"""
+        cursor = self.conn.cursor()
+
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_logros_gastos_insert AFTER INSERT ON gastos
+            BEGIN
+                INSERT INTO dias_registro (fecha, cantidad) VALUES (substr(NEW.fecha, 1, 10), 1)
+                ON CONFLICT (fecha) DO UPDATE SET cantidad = cantidad + 1;
+                UPDATE estado_logros SET valor = valor + 1 WHERE clave = 'total_gastos';
+            END
+        ''')
+
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_logros_gastos_delete AFTER DELETE ON gastos
+            BEGIN
+                UPDATE dias_registro SET cantidad = cantidad - 1 WHERE fecha = substr(OLD.fecha, 1, 10);
+                DELETE FROM dias_registro WHERE fecha = substr(OLD.fecha, 1, 10) AND cantidad <= 0;
+                UPDATE estado_logros SET valor = valor - 1 WHERE clave = 'total_gastos';
+            END
+        ''')
+
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_logros_gastos_update AFTER UPDATE OF fecha ON gastos
+            WHEN substr(OLD.fecha, 1, 10) != substr(NEW.fecha, 1, 10)
+            BEGIN
+                UPDATE dias_registro SET cantidad = cantidad - 1 WHERE fecha = substr(OLD.fecha, 1, 10);
+                DELETE FROM dias_registro WHERE fecha = substr(OLD.fecha, 1, 10) AND cantidad <= 0;
+                INSERT INTO dias_registro (fecha, cantidad) VALUES (substr(NEW.fecha, 1, 10), 1)
+                ON CONFLICT (fecha) DO UPDATE SET cantidad = cantidad + 1;
+            END
+        ''')
+
+        # Día nuevo: se une con la racha que termina el día anterior y con la que empieza el siguiente
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_rachas_dia_insert AFTER INSERT ON dias_registro
+            BEGIN
+                INSERT INTO rachas (inicio, fin, dias)
+                VALUES (
+                    COALESCE((SELECT inicio FROM rachas WHERE fin = date(NEW.fecha, '-1 day')), NEW.fecha),
+                    COALESCE((SELECT fin FROM rachas WHERE inicio = date(NEW.fecha, '+1 day')), NEW.fecha),
+                    0
+                )
+                ON CONFLICT (inicio) DO UPDATE SET fin = excluded.fin;
+                DELETE FROM rachas WHERE inicio = date(NEW.fecha, '+1 day');
+                UPDATE rachas SET dias = CAST(julianday(fin) - julianday(inicio) AS INTEGER) + 1
+                WHERE inicio = (SELECT MAX(inicio) FROM rachas WHERE inicio <= NEW.fecha);
+            END
+        ''')
+
+        # Día sin gastos: la racha que lo contenía se parte en dos (o se acorta, o desaparece)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_rachas_dia_delete AFTER DELETE ON dias_registro
+            BEGIN
+                INSERT INTO rachas (inicio, fin, dias)
+                SELECT date(OLD.fecha, '+1 day'), fin, CAST(julianday(fin) - julianday(OLD.fecha) AS INTEGER) FROM rachas
+                WHERE inicio = (SELECT MAX(inicio) FROM rachas WHERE inicio <= OLD.fecha) AND fin > OLD.fecha;
+                UPDATE rachas SET fin = date(OLD.fecha, '-1 day'),
+                                  dias = CAST(julianday(OLD.fecha) - julianday(inicio) AS INTEGER)
+                WHERE inicio = (SELECT MAX(inicio) FROM rachas WHERE inicio < OLD.fecha) AND fin >= OLD.fecha;
+                DELETE FROM rachas WHERE inicio = OLD.fecha;
+            END
+        ''')
+
+    def reconstruir_estado_logros(self):
+        """Recalcula dias_registro, rachas y estado_logros desde cero a partir de gastos"""
+        with self.transaccion():
+            cursor = self.conn.cursor()
+            cursor.execute('DELETE FROM estado_logros')
+            cursor.execute('DELETE FROM dias_registro')
+            cursor.execute('''
+                INSERT INTO dias_registro (fecha, cantidad)
+                SELECT substr(fecha, 1, 10), COUNT(*) FROM gastos GROUP BY substr(fecha, 1, 10)
+            ''')
+            # Lo que hayan dejado los triggers de dias_registro se descarta y se recalcula de una vez
+            cursor.execute('DELETE FROM rachas')
+            # Islas de días consecutivos: día - número de fila es constante dentro de cada racha
+            cursor.execute('''
+                INSERT INTO rachas (inicio, fin, dias)
+                SELECT MIN(fecha), MAX(fecha), COUNT(*) FROM (
+                    SELECT fecha, julianday(fecha) - ROW_NUMBER() OVER (ORDER BY fecha) AS isla
+                    FROM dias_registro
+                )
+                GROUP BY isla
+            ''')
+            cursor.execute("INSERT INTO estado_logros (clave, valor) SELECT 'total_gastos', COUNT(*) FROM gastos")
+
+    def crear_alertas_enviadas(self):
+        """Registro de alertas ya emitidas para no repetirlas (por tipo, referencia, período y nivel)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alertas_enviadas (
+                tipo TEXT NOT NULL,
+                referencia TEXT NOT NULL,
+                periodo TEXT NOT NULL,
+                nivel TEXT NOT NULL,
+                fecha TEXT NOT NULL,
+                PRIMARY KEY (tipo, referencia, periodo, nivel)
+            ) WITHOUT ROWID
+        ''')
+        # Los presupuestos que ya avisaron quedan registrados para no volver a alertar el mismo
+        # umbral en su mes (el mensaje trae la categoría y si fue excedido o el aviso del 90%)
+        cursor.execute('''
+            INSERT OR IGNORE INTO alertas_enviadas (tipo, referencia, periodo, nivel, fecha)
+            SELECT 'presupuesto', p.id, p.mes,
+                   CASE WHEN instr(a.mensaje, 'excedido') > 0 THEN '100' ELSE '90' END,
+                   MIN(substr(a.fecha, 1, 10))
+            FROM alertas a
+            JOIN presupuestos p ON p.mes = substr(a.fecha, 1, 7)
+                AND instr(a.mensaje, 'Presupuesto ' || char(39) || p.categoria || char(39)) > 0
+            WHERE a.tipo = 'presupuesto'
+            GROUP BY p.id, 4
+        ''')
+        # Solo se descartan las copias exactas (misma alerta, fecha y estado); el resto es historial
+        cursor.execute('''
+            DELETE FROM alertas
+            WHERE id NOT IN (SELECT MIN(id) FROM alertas GROUP BY tipo, mensaje, nivel, fecha, leida)
+        ''')
+
+    def crear_estadisticas_gastos(self):
+        """Media y varianza de los gastos por categoría/moneda, actualizadas por triggers (Welford)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS estadisticas_gastos (
+                categoria TEXT NOT NULL,
+                moneda TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                media REAL NOT NULL,
+                m2 REAL NOT NULL,
+                PRIMARY KEY (categoria, moneda)
+            ) WITHOUT ROWID
+        ''')
+        self.crear_triggers_estadisticas_gastos()
+        self.reconstruir_estadisticas_gastos()
+
+    def crear_triggers_estadisticas_gastos(self):
+        """Triggers de gastos que suman y restan cada monto a estadisticas_gastos"""
+        cursor = self.conn.cursor()
+        # En un UPDATE ... SET las expresiones ven los valores previos de la fila
+        agregar = '''
+            INSERT INTO estadisticas_gastos (categoria, moneda, n, media, m2)
+            VALUES (NEW.categoria, COALESCE(NEW.moneda, 'ARS'), 1, NEW.monto, 0)
+            ON CONFLICT (categoria, moneda) DO UPDATE SET
+                n = n + 1,
+                media = media + (excluded.media - media) / (n + 1),
+                m2 = m2 + (excluded.media - media) * (excluded.media - media - (excluded.media - media) / (n + 1));
+        '''
+        quitar = '''
+            UPDATE estadisticas_gastos SET
+                n = n - 1,
+                media = CASE WHEN n > 1 THEN (media * n - OLD.monto) / (n - 1) ELSE 0 END,
+                m2 = CASE WHEN n > 1
+                          THEN MAX(m2 - (OLD.monto - media) * (OLD.monto - (media * n - OLD.monto) / (n - 1)), 0)
+                          ELSE 0 END
+            WHERE categoria = OLD.categoria AND moneda = COALESCE(OLD.moneda, 'ARS');
+            DELETE FROM estadisticas_gastos
+            WHERE categoria = OLD.categoria AND moneda = COALESCE(OLD.moneda, 'ARS') AND n <= 0;
+        '''
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_estadisticas_gastos_insert AFTER INSERT ON gastos BEGIN {agregar} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_estadisticas_gastos_delete AFTER DELETE ON gastos BEGIN {quitar} END')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_estadisticas_gastos_update
+            AFTER UPDATE OF categoria, moneda, monto ON gastos
+            BEGIN {quitar} {agregar} END
+        ''')
+
+    def reconstruir_estadisticas_gastos(self):
+        """Recalcula estadisticas_gastos desde cero a partir de gastos"""
+        cursor = self.conn.cursor()
+        filas = cursor.execute("SELECT categoria, COALESCE(moneda, 'ARS'), CAST(monto AS INTEGER) FROM gastos").fetchall()
+        with self.transaccion():
+            cursor.execute('DELETE FROM estadisticas_gastos')
+            if not filas:
+                return
+            claves, montos = zip(*((f'{categoria}\x1f{moneda}', monto) for categoria, moneda, monto in filas))
+            grupos, codigos = np.unique(np.asarray(claves, dtype=object), return_inverse=True)
+            montos = np.asarray(montos, dtype=float)
+            n = np.bincount(codigos, minlength=len(grupos))
+            medias = np.bincount(codigos, weights=montos, minlength=len(grupos)) / n
+            m2 = np.bincount(codigos, weights=(montos - medias[codigos]) ** 2, minlength=len(grupos))
+            cursor.executemany(
+                'INSERT INTO estadisticas_gastos (categoria, moneda, n, media, m2) VALUES (?, ?, ?, ?, ?)',
+                [(*clave.split('\x1f'), int(cant), float(media), float(cuadrados))
+                 for clave, cant, media, cuadrados in zip(grupos.tolist(), n, medias, m2)])
+
+    def crear_versiones_datos(self):
+        """Contador de cambios por tabla, incrementado por triggers, para invalidar caches"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS versiones_datos (
+                tabla TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        for tabla in self.TABLAS_VERSIONADAS:
+            cursor.execute('INSERT OR IGNORE INTO versiones_datos (tabla, version) VALUES (?, 0)', (tabla,))
+            for evento in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_version_{tabla}_{evento.lower()} AFTER {evento} ON {tabla}
+                    BEGIN
+                        UPDATE versiones_datos SET version = version + 1 WHERE tabla = '{tabla}';
+                    END
+                ''')
+
+    def versionar_reglas_geofence(self):
+        """Agrega a versiones_datos las tablas versionadas después (reglas_geofence)"""
+        self.crear_versiones_datos()
+
+    def version_datos(self, *tablas):
+        """Versiones actuales de las tablas pedidas; cambian con cada INSERT/UPDATE/DELETE"""
+        cursor = self.conn_lectura.cursor()
+        cursor.execute(f'SELECT tabla, version FROM versiones_datos WHERE tabla IN ({", ".join("?" * len(tablas))})', tablas)
+        versiones = dict(cursor.fetchall())
+        return tuple(versiones.get(tabla, 0) for tabla in tablas)
+
+    def unificar_finscore_diario(self):
+        """Deja un solo FinScore por día (el último calculado) y lo garantiza con un índice único"""
+        cursor = self.conn.cursor()
+        cursor.execute('DELETE FROM finscore_historico WHERE id NOT IN (SELECT MAX(id) FROM finscore_historico GROUP BY fecha)')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_finscore_fecha ON finscore_historico(fecha)')
+
+    def crear_balances_splitwise(self):
+        """Índices de Splitwise y saldo por grupo/participante mantenido por triggers"""
+        cursor = self.conn.cursor()
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_gastos_splitwise_grupo ON gastos_splitwise(grupo_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_divisiones_splitwise_gasto ON divisiones_splitwise(gasto_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pagos_splitwise_grupo ON pagos_splitwise(grupo_id)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS balances_splitwise (
+                grupo_id INTEGER NOT NULL,
+                participante TEXT NOT NULL,
+                balance DINERO NOT NULL DEFAULT 0,
+                PRIMARY KEY (grupo_id, participante)
+            ) WITHOUT ROWID
+        ''')
+
+        sumar, pago = self._sql_sumar_balance, self._sql_pago_balance
+
+        def division(fila, signo):
+            # Una división impaga: quien debe resta y quien pagó el gasto suma
+            origen = 'FROM gastos_splitwise g'
+            condicion = f'g.id = {fila}.gasto_id AND g.pagado_por != {fila}.participante AND COALESCE({fila}.pagado, 0) = 0'
+            return (sumar('g.grupo_id', f'{fila}.participante', f'{-signo} * {fila}.monto_debe', origen, condicion)
+                    + sumar('g.grupo_id', 'g.pagado_por', f'{signo} * {fila}.monto_debe', origen, condicion))
+
+        triggers = {
+            'trg_balances_division_insert': ('AFTER INSERT ON divisiones_splitwise', division('NEW', 1)),
+            'trg_balances_division_delete': ('AFTER DELETE ON divisiones_splitwise', division('OLD', -1)),
+            'trg_balances_division_update': (
+                'AFTER UPDATE OF gasto_id, participante, monto_debe, pagado ON divisiones_splitwise',
+                division('OLD', -1) + division('NEW', 1)),
+            'trg_balances_pago_insert': ('AFTER INSERT ON pagos_splitwise', pago('NEW', 1)),
+            'trg_balances_pago_delete': ('AFTER DELETE ON pagos_splitwise', pago('OLD', -1)),
+        }
+        for nombre, (evento, cuerpo) in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {nombre} {evento} BEGIN {cuerpo} END')
+        self.reconstruir_balances_splitwise()
+
+    def completar_triggers_splitwise(self):
+        """Triggers de balances_splitwise para pagos editados y gastos editados o borrados"""
+        sumar, pago = self._sql_sumar_balance, self._sql_pago_balance
+
+        def gasto(fila, signo):
+            # Las divisiones impagas del gasto con el grupo y pagador de esta versión de la fila;
+            # sin claves foráneas activas, borrar el gasto deja las divisiones huérfanas y sin efecto
+            origen = 'FROM divisiones_splitwise d'
+            condicion = f'd.gasto_id = {fila}.id AND d.participante != {fila}.pagado_por AND COALESCE(d.pagado, 0) = 0'
+            return (sumar(f'{fila}.grupo_id', 'd.participante', f'{-signo} * d.monto_debe', origen, condicion)
+                    + sumar(f'{fila}.grupo_id', f'{fila}.pagado_por', f'{signo} * d.monto_debe', origen, condicion))
+
+        triggers = {
+            'trg_balances_pago_update': (
+                'AFTER UPDATE OF grupo_id, de_quien, para_quien, monto ON pagos_splitwise',
+                pago('OLD', -1) + pago('NEW', 1)),
+            'trg_balances_gasto_update': (
+                'AFTER UPDATE OF id, grupo_id, pagado_por ON gastos_splitwise',
+                gasto('OLD', -1) + gasto('NEW', 1)),
+            'trg_balances_gasto_delete': ('AFTER DELETE ON gastos_splitwise', gasto('OLD', -1)),
+        }
+        cursor = self.conn.cursor()
+        for nombre, (evento, cuerpo) in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {nombre} {evento} BEGIN {cuerpo} END')
+        # Corrige los saldos que hayan quedado desfasados por ediciones sin trigger
+        self.reconstruir_balances_splitwise()
+
+    @staticmethod
+    def _sql_sumar_balance(grupo, participante, importe, origen='', condicion='1'):
+        """Sentencia de trigger que suma importe al saldo de (grupo, participante)"""
+        return f'''
+            INSERT INTO balances_splitwise (grupo_id, participante, balance)
+            SELECT {grupo}, {participante}, {importe} {origen} WHERE {condicion}
+            ON CONFLICT (grupo_id, participante) DO UPDATE SET balance = balance + excluded.balance;
+        '''
+
+    @classmethod
+    def _sql_pago_balance(cls, fila, signo):
+        """Efecto de un pago: quien paga suma y quien recibe resta"""
+        return (cls._sql_sumar_balance(f'{fila}.grupo_id', f'{fila}.de_quien', f'{signo} * {fila}.monto')
+                + cls._sql_sumar_balance(f'{fila}.grupo_id', f'{fila}.para_quien', f'{-signo} * {fila}.monto'))
+
+    def reconstruir_balances_splitwise(self):
+        """Recalcula balances_splitwise desde cero con la consulta agrupada"""
+        with self.transaccion():
+            cursor = self.conn.cursor()
+            cursor.execute('DELETE FROM balances_splitwise')
+            cursor.execute(f'''
+                INSERT INTO balances_splitwise (grupo_id, participante, balance)
+                SELECT grupo_id, participante, SUM(importe) FROM ({self.MOVIMIENTOS_SPLITWISE})
+                GROUP BY grupo_id, participante
+            ''')
+
+    def crear_busqueda_gastos(self):
+        """Índice FTS5 sobre descripción y notas de gastos (contenido externo, sincronizado por triggers)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS gastos_fts USING fts5(
+                descripcion, notas,
+                content='gastos', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''')
+        agregar = "INSERT INTO gastos_fts (rowid, descripcion, notas) VALUES (NEW.id, NEW.descripcion, NEW.notas);"
+        quitar = ("INSERT INTO gastos_fts (gastos_fts, rowid, descripcion, notas) "
+                  "VALUES ('delete', OLD.id, OLD.descripcion, OLD.notas);")
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_fts_gastos_insert AFTER INSERT ON gastos BEGIN {agregar} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_fts_gastos_delete AFTER DELETE ON gastos BEGIN {quitar} END')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_fts_gastos_update AFTER UPDATE OF descripcion, notas ON gastos
+            BEGIN {quitar} {agregar} END
+        ''')
+        cursor.execute("INSERT INTO gastos_fts (gastos_fts) VALUES ('rebuild')")
+
+    def recodificar_geohash_ubicaciones(self):
+        """Recalcula los geohash guardados con el formato viejo e indexa la columna"""
+        cursor = self.conn.cursor()
+        filas = cursor.execute('SELECT id, latitud, longitud FROM ubicaciones_gastos WHERE latitud IS NOT NULL AND longitud IS NOT NULL').fetchall()
+        cursor.executemany('UPDATE ubicaciones_gastos SET geohash = ? WHERE id = ?',
+                           [(geohash_codificar(lat, lon), id_ubicacion) for id_ubicacion, lat, lon in filas])
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ubicaciones_geohash ON ubicaciones_gastos(geohash)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ubicaciones_gasto ON ubicaciones_gastos(gasto_id)')
+
+    def convertir_montos_a_centavos(self):
+        """
+        Reconstruye las tablas con importes para guardarlos como centavos enteros.
+        SQLite no permite cambiar el tipo de una columna, así que cada tabla se copia
+        a una nueva con las columnas COLUMNAS_DINERO declaradas DINERO.
+        """
+        cursor = self.conn.cursor()
+        for tabla, columnas in self.COLUMNAS_DINERO.items():
+            sql = cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (tabla,)).fetchone()[0]
+            for columna in columnas:
+                sql = re.sub(rf'(\b{columna}\s+)REAL\b', r'\1DINERO', sql)
+            nueva = f'{tabla}_centavos'
+            sql = re.sub(rf'^CREATE TABLE\s+(IF NOT EXISTS\s+)?"?{tabla}"?', f'CREATE TABLE {nueva}', sql.strip())
+
+            todas = [fila[1] for fila in cursor.execute(f'PRAGMA table_info({tabla})')]
+            seleccion = ', '.join(f'CAST(ROUND({c} * 100) AS INTEGER)' if c in columnas else c for c in todas)
+            secuencia = cursor.execute('SELECT seq FROM sqlite_sequence WHERE name=?', (tabla,)).fetchone()
+
+            cursor.execute(sql)
+            cursor.execute(f'INSERT INTO {nueva} ({", ".join(todas)}) SELECT {seleccion} FROM {tabla}')
+            cursor.execute(f'DROP TABLE {tabla}')
+            cursor.execute(f'ALTER TABLE {nueva} RENAME TO {tabla}')
+            if secuencia:
+                # Conservar el AUTOINCREMENT para no reutilizar ids de filas borradas
+                cursor.execute('DELETE FROM sqlite_sequence WHERE name=?', (tabla,))
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (tabla, secuencia[0]))
+
+        # DROP TABLE se lleva los índices y triggers de gastos
+        self.crear_indices_gastos()
+        self.crear_triggers_resumen_mensual()
+
+    def crear_tabla_cotizaciones(self):
+        """Historial de cotizaciones: cada consulta exitosa a una fuente queda registrada"""
+        cursor = self.conn.cursor()
+        # Versiones viejas tenían cotizaciones(fecha, tipo, compra, venta): se aparta
+        # como cotizaciones_legacy y sus filas pasan a la tabla nueva como de dolarapi
+        heredadas = {fila[1] for fila in cursor.execute('PRAGMA table_info(cotizaciones)')}
+        if heredadas and 'fuente' not in heredadas:
+            cursor.execute('ALTER TABLE cotizaciones RENAME TO cotizaciones_legacy')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cotizaciones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha_hora TEXT NOT NULL,
+                fuente TEXT NOT NULL,
+                moneda TEXT NOT NULL,
+                compra REAL,
+                venta REAL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cotizaciones_fuente_moneda ON cotizaciones(fuente, moneda, fecha_hora)')
+        if heredadas and 'fuente' not in heredadas:
+            cursor.execute('''
+                INSERT INTO cotizaciones (fecha_hora, fuente, moneda, compra, venta)
+                SELECT fecha, 'dolarapi', tipo, compra, venta FROM cotizaciones_legacy ORDER BY id
+            ''')
+
+    def obtener_totales_categoria(self, mes, moneda=None):
+        """Totales del mes por categoría ({categoria: total}); moneda=None suma todas"""
+        cursor = self.conn_lectura.cursor()
+        if moneda:
+            cursor.execute('''
+                SELECT categoria, SUM(total) FROM resumen_mensual
+                WHERE mes = ? AND moneda = ?
+                GROUP BY categoria
+            ''', (mes, moneda))
+        else:
+            cursor.execute('SELECT categoria, SUM(total) FROM resumen_mensual WHERE mes = ? GROUP BY categoria', (mes,))
+        return {categoria: Dinero(total) for categoria, total in cursor.fetchall()}
+
+    def obtener_total_categoria(self, mes, categoria, moneda='ARS'):
+        """Total del mes para una categoría y moneda"""
+        cursor = self.conn_lectura.cursor()
+        cursor.execute('''
+            SELECT COALESCE(SUM(total), 0) FROM resumen_mensual
+            WHERE mes = ? AND categoria = ? AND moneda = ?
+        ''', (mes, categoria, moneda))
+        return Dinero(cursor.fetchone()[0])
+
+    def obtener_total_mes(self, mes, moneda='ARS'):
+        """Total del mes en una moneda"""
+        cursor = self.conn_lectura.cursor()
+        cursor.execute('SELECT COALESCE(SUM(total), 0) FROM resumen_mensual WHERE mes = ? AND moneda = ?', (mes, moneda))
+        return Dinero(cursor.fetchone()[0])
+
+    def conversor_monedas(self):
+        """ConversorMonedas armado con el historial de cotizaciones (se rearma si llegaron nuevas)"""
+        cursor = self.conn_lectura.cursor()
+        version = cursor.execute('SELECT MAX(id) FROM cotizaciones').fetchone()[0]
+        if getattr(self, '_conversor', None) is None or self._conversor[0] != version:
+            self._conversor = (version, ConversorMonedas.desde_db(self))
+        return self._conversor[1]
+
+    def obtener_totales_normalizados(self, mes, destino='ARS'):
+        """Totales del mes por categoría con todos los gastos convertidos a `destino`.
+
+        Lo que ya está en `destino` sale de resumen_mensual; solo los gastos en otras
+        monedas se leen fila por fila y se convierten con la tasa de su fecha.
+        Los de monedas sin cotización conocida quedan afuera.
+        """
+        totales = self.obtener_totales_categoria(mes, destino)
+
+        cursor = self.conn_lectura.cursor()
+        cursor.execute('''
+            SELECT categoria, fecha, moneda, monto FROM gastos
+            WHERE fecha >= ? AND fecha < ? AND moneda != ?
+        ''', (*rango_mes(mes), destino))
+        filas = cursor.fetchall()
+        if not filas:
+            return totales
+
+        categorias, fechas, monedas, montos = zip(*filas)
+        convertidos, validos = self.conversor_monedas().convertir_centavos(
+            [m.centavos for m in montos], monedas, fechas, destino)
+        nombres, codigos = np.unique(np.asarray(categorias, dtype=object)[validos], return_inverse=True)
+        sumas = np.bincount(codigos, weights=convertidos[validos], minlength=len(nombres))
+        for categoria, suma in zip(nombres.tolist(), sumas):
+            totales[categoria] = totales.get(categoria, Dinero(0)) + Dinero(int(round(suma)))
+        return totales
 
     def agregar_gasto(self, fecha, categoria, monto, moneda, descripcion, cuenta, notas=''):
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO gastos (fecha, categoria, monto, moneda, descripcion, cuenta, notas)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (fecha, categoria, monto, moneda, descripcion, cuenta, notas))
-        self.conn.commit()
+        ''', (fecha, categoria, Dinero.desde(monto), moneda, descripcion, cuenta, notas))
+        self._confirmar()
+        return cursor.lastrowid
 
-    def obtener_gastos(self, mes=None):
-        cursor = self.conn.cursor()
+    def agregar_gastos_lote(self, gastos, tamano_lote=500):
+        """
+        Inserta muchos gastos en una sola transacción usando executemany.
+        Cada gasto es un dict con las claves de agregar_gasto (fecha, categoria, monto,
+        moneda, descripcion, cuenta, notas) y opcionalmente 'tags' (lista de textos) y
+        'ubicacion' (dict con lat, lon y opcionalmente lugar y comercio).
+        Devuelve la lista de ids asignados, en el mismo orden.
+        """
+        if tamano_lote <= 0:
+            raise ValueError(f"tamano_lote debe ser positivo: {tamano_lote}")
+
+        ids = []
+        iterador = iter(gastos)
+        with self.transaccion():
+            cursor = self.conn.cursor()
+            while True:
+                lote = list(islice(iterador, tamano_lote))
+                if not lote:
+                    break
+
+                cursor.executemany('''
+                    INSERT INTO gastos (fecha, categoria, monto, moneda, descripcion, cuenta, notas)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', [(g['fecha'], g['categoria'], Dinero.desde(g['monto']), g.get('moneda', 'ARS'),
+                       g.get('descripcion', ''), g['cuenta'], g.get('notas', '')) for g in lote])
+
+                # Con AUTOINCREMENT y la transacción abierta los ids del lote son consecutivos
+                ultimo_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+                ids_lote = range(ultimo_id - len(lote) + 1, ultimo_id + 1)
+                ids.extend(ids_lote)
+
+                tags = [(gasto_id, tag) for gasto_id, g in zip(ids_lote, lote) for tag in g.get('tags') or ()]
+                if tags:
+                    cursor.executemany('INSERT INTO tags (gasto_id, tag) VALUES (?, ?)', tags)
+
+                ubicaciones = [
+                    (gasto_id, u['lat'], u['lon'], geohash_codificar(u['lat'], u['lon']),
+                     u.get('lugar', ''), u.get('comercio', ''))
+                    for gasto_id, u in ((gasto_id, g.get('ubicacion')) for gasto_id, g in zip(ids_lote, lote))
+                    if u
+                ]
+                if ubicaciones:
+                    cursor.executemany('''
+                        INSERT INTO ubicaciones_gastos (gasto_id, latitud, longitud, geohash, lugar_nombre, comercio)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', ubicaciones)
+
+        return ids
+
+    def obtener_gastos(self, mes=None) -> list[Gasto]:
         if mes:
-            cursor.execute('SELECT * FROM gastos WHERE strftime("%Y-%m", fecha) = ? ORDER BY fecha DESC', (mes,))
+            cursor = self._consultar(Gasto, f'SELECT {columnas(Gasto)} FROM gastos WHERE fecha >= ? AND fecha < ? ORDER BY fecha DESC', rango_mes(mes), lectura=True)
         else:
-            cursor.execute('SELECT * FROM gastos ORDER BY fecha DESC')
+            cursor = self._consultar(Gasto, f'SELECT {columnas(Gasto)} FROM gastos ORDER BY fecha DESC', lectura=True)
         return cursor.fetchall()
 
+    # Filtros admitidos por iterar_gastos/pagina_gastos: clave -> condición SQL
+    FILTROS_GASTOS = {
+        'id': 'id = ?',
+        'desde': 'fecha >= ?',
+        'hasta': 'fecha < ?',
+        'categoria': 'categoria = ?',
+        'cuenta': 'cuenta = ?',
+        'moneda': 'moneda = ?',
+    }
+
+    def _condiciones_gastos(self, filtros):
+        """Arma las condiciones WHERE y sus parámetros a partir de un dict de filtros"""
+        condiciones, parametros = [], []
+        periodo, parametros_periodo = [], []
+        texto = None
+        for clave, valor in (filtros or {}).items():
+            if valor is None:
+                continue
+            if clave == 'mes':
+                periodo.append('fecha >= ? AND fecha < ?')
+                parametros_periodo.extend(rango_mes(valor))
+            elif clave in ('desde', 'hasta'):
+                periodo.append(self.FILTROS_GASTOS[clave])
+                parametros_periodo.append(valor)
+            elif clave == 'texto':
+                texto = consulta_fts(valor)
+            elif clave in self.FILTROS_GASTOS:
+                condiciones.append(self.FILTROS_GASTOS[clave])
+                parametros.append(valor)
+            else:
+                raise ValueError(f"Filtro de gastos desconocido: {clave}")
+        condiciones[:0], parametros[:0] = periodo, parametros_periodo
+
+        if texto:
+            sql = 'SELECT rowid FROM gastos_fts WHERE gastos_fts MATCH ?'
+            parametros.append(texto)
+            if periodo:
+                # Acotar el índice a los ids del período evita juntar todas las coincidencias
+                # de una palabra común en toda la historia
+                where = ' AND '.join(periodo)
+                sql += f' AND rowid BETWEEN (SELECT MIN(id) FROM gastos WHERE {where}) AND (SELECT MAX(id) FROM gastos WHERE {where})'
+                parametros.extend(parametros_periodo * 2)
+            condiciones.append(f'id IN ({sql})')
+        return condiciones, parametros
+
+    def iterar_gastos(self, filtros=None, tamano_lote=1000, ascendente=False):
+        """Recorre los gastos de a lotes con fetchmany, sin cargar todo el historial en memoria"""
+        condiciones, parametros = self._condiciones_gastos(filtros)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        orden = 'ASC' if ascendente else 'DESC'
+        cursor = self._consultar(Gasto, f'SELECT {columnas(Gasto)} FROM gastos {where} ORDER BY fecha {orden}, id {orden}',
+                                 parametros, lectura=True)
+        try:
+            while True:
+                lote = cursor.fetchmany(tamano_lote)
+                if not lote:
+                    break
+                yield from lote
+        finally:
+            cursor.close()
+
+    def pagina_gastos(self, despues_de=None, limite=100, filtros=None) -> list[Gasto]:
+        """Página de gastos (más recientes primero) a partir de la clave (fecha, id) del último gasto mostrado"""
+        condiciones, parametros = self._condiciones_gastos(filtros)
+        if despues_de is not None:
+            fecha, id_gasto = despues_de
+            condiciones.append('(fecha, id) < (?, ?)')
+            parametros.extend((fecha, id_gasto))
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        cursor = self._consultar(Gasto, f'SELECT {columnas(Gasto)} FROM gastos {where} ORDER BY fecha DESC, id DESC LIMIT ?',
+                                 (*parametros, limite), lectura=True)
+        return cursor.fetchall()
+
+    def contar_gastos(self, filtros=None):
+        """Cantidad de gastos que cumplen los filtros"""
+        condiciones, parametros = self._condiciones_gastos(filtros)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        cursor = self.conn_lectura.cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM gastos {where}', parametros)
+        return cursor.fetchone()[0]
+
+    def buscar_gastos(self, texto, filtros=None, limite=50) -> list[Gasto]:
+        """Gastos cuya descripción o notas contienen las palabras de `texto` (la última como prefijo),
+        los más relevantes primero (bm25, la descripción pesa el doble que las notas)"""
+        consulta = consulta_fts(texto)
+        if not consulta:
+            return []
+        condiciones, parametros = self._condiciones_gastos(filtros)
+        filtro = ''.join(f' AND {condicion}' for condicion in condiciones)
+        cursor = self._consultar(Gasto, f'''
+            SELECT {columnas(Gasto, 'g.')} FROM gastos_fts
+            JOIN gastos g ON g.id = gastos_fts.rowid
+            WHERE gastos_fts MATCH ?{filtro}
+            ORDER BY bm25(gastos_fts, 2.0, 1.0), g.fecha DESC
+            LIMIT ?
+        ''', (consulta, *parametros, limite), lectura=True)
+        return cursor.fetchall()
+
+    def obtener_gasto(self, id_gasto) -> Optional[Gasto]:
+        cursor = self._consultar(Gasto, f'SELECT {columnas(Gasto)} FROM gastos WHERE id=?', (id_gasto,), lectura=True)
+        return cursor.fetchone()
+
     def eliminar_gasto(self, id_gasto):
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM gastos WHERE id=?', (id_gasto,))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_categorias(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM categorias ORDER BY nombre')
+    def obtener_categorias(self) -> list[Categoria]:
+        cursor = self._consultar(Categoria, f'SELECT {columnas(Categoria)} FROM categorias ORDER BY nombre')
         return cursor.fetchall()
 
     def agregar_categoria(self, nombre, color, icono='❓'):
         cursor = self.conn.cursor()
         cursor.execute('INSERT INTO categorias (nombre, color, icono) VALUES (?, ?, ?)', (nombre, color, icono))
-        self.conn.commit()
+        self._confirmar()
 
     def eliminar_categoria(self, id_cat):
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM categorias WHERE id=?', (id_cat,))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_cuentas(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM cuentas ORDER BY nombre')
+    def obtener_cuentas(self) -> list[Cuenta]:
+        cursor = self._consultar(Cuenta, f'SELECT {columnas(Cuenta)} FROM cuentas ORDER BY nombre')
         return cursor.fetchall()
 
     def guardar_sueldo_mes(self, mes, monto, bonos=0):
         cursor = self.conn.cursor()
-        cursor.execute('INSERT OR REPLACE INTO sueldos (mes, monto, bonos) VALUES (?, ?, ?)', (mes, monto, bonos))
-        self.conn.commit()
+        cursor.execute('INSERT OR REPLACE INTO sueldos (mes, monto, bonos) VALUES (?, ?, ?)', (mes, Dinero.desde(monto), Dinero.desde(bonos)))
+        self._confirmar()
 
-    def obtener_sueldo_mes(self, mes):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM sueldos WHERE mes=?', (mes,))
+    def obtener_sueldo_mes(self, mes) -> Optional[Sueldo]:
+        cursor = self._consultar(Sueldo, f'SELECT {columnas(Sueldo)} FROM sueldos WHERE mes=?', (mes,))
         return cursor.fetchone()
 
     def agregar_meta(self, nombre, monto_objetivo, fecha_objetivo, moneda='ARS', icono='🎯'):
@@ -703,15 +2325,14 @@ class Database:
         cursor.execute('''
             INSERT INTO metas_ahorro (nombre, monto_objetivo, fecha_inicio, fecha_objetivo, moneda, icono)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (nombre, monto_objetivo, fecha_inicio, fecha_objetivo, moneda, icono))
-        self.conn.commit()
+        ''', (nombre, Dinero.desde(monto_objetivo), fecha_inicio, fecha_objetivo, moneda, icono))
+        self._confirmar()
 
-    def obtener_metas(self, activas=True):
-        cursor = self.conn.cursor()
+    def obtener_metas(self, activas=True) -> list[MetaAhorro]:
         if activas:
-            cursor.execute('SELECT * FROM metas_ahorro WHERE completada=0 ORDER BY fecha_objetivo')
+            cursor = self._consultar(MetaAhorro, f'SELECT {columnas(MetaAhorro)} FROM metas_ahorro WHERE completada=0 ORDER BY fecha_objetivo')
         else:
-            cursor.execute('SELECT * FROM metas_ahorro ORDER BY id DESC')
+            cursor = self._consultar(MetaAhorro, f'SELECT {columnas(MetaAhorro)} FROM metas_ahorro ORDER BY id DESC')
         return cursor.fetchall()
 
     def agregar_tarjeta(self, nombre, banco, limite, dia_cierre, dia_vencimiento):
@@ -719,30 +2340,28 @@ class Database:
         cursor.execute('''
             INSERT INTO tarjetas (nombre, banco, limite, dia_cierre, dia_vencimiento)
             VALUES (?, ?, ?, ?, ?)
-        ''', (nombre, banco, limite, dia_cierre, dia_vencimiento))
-        self.conn.commit()
+        ''', (nombre, banco, Dinero.desde(limite), dia_cierre, dia_vencimiento))
+        self._confirmar()
 
-    def obtener_tarjetas(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM tarjetas WHERE activa=1 ORDER BY nombre')
+    def obtener_tarjetas(self) -> list[Tarjeta]:
+        cursor = self._consultar(Tarjeta, f'SELECT {columnas(Tarjeta)} FROM tarjetas WHERE activa=1 ORDER BY nombre')
         return cursor.fetchall()
 
     def eliminar_tarjeta(self, id_tarjeta):
         cursor = self.conn.cursor()
         cursor.execute('UPDATE tarjetas SET activa=0 WHERE id=?', (id_tarjeta,))
-        self.conn.commit()
+        self._confirmar()
 
     def agregar_recurrente(self, nombre, categoria, monto, moneda, cuenta, frecuencia, dia_mes):
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO transacciones_recurrentes (nombre, categoria, monto, moneda, cuenta, frecuencia, dia_mes)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (nombre, categoria, monto, moneda, cuenta, frecuencia, dia_mes))
-        self.conn.commit()
+        ''', (nombre, categoria, Dinero.desde(monto), moneda, cuenta, frecuencia, dia_mes))
+        self._confirmar()
 
-    def obtener_recurrentes(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM transacciones_recurrentes WHERE activa=1 ORDER BY nombre')
+    def obtener_recurrentes(self) -> list[Recurrente]:
+        cursor = self._consultar(Recurrente, f'SELECT {columnas(Recurrente)} FROM transacciones_recurrentes WHERE activa=1 ORDER BY nombre')
         return cursor.fetchall()
 
     def ejecutar_recurrentes(self):
@@ -752,7 +2371,8 @@ class Database:
 
         recurrentes = self.obtener_recurrentes()
         for rec in recurrentes:
-            id_rec, nombre, cat, monto, moneda, cuenta, freq, dia, activa, ultima = rec[:10]
+            id_rec, nombre, cat, monto, moneda, cuenta = rec.id, rec.nombre, rec.categoria, rec.monto, rec.moneda, rec.cuenta
+            freq, dia, ultima = rec.frecuencia, rec.dia_mes, rec.ultima_ejecucion
 
             debe_ejecutar = False
             if ultima is None:
@@ -765,31 +2385,30 @@ class Database:
                     debe_ejecutar = True
 
             if debe_ejecutar:
-                self.agregar_gasto(hoy.isoformat(), cat, monto, moneda, f"{nombre} (Recurrente)", cuenta)
-                cursor.execute('UPDATE transacciones_recurrentes SET ultima_ejecucion=? WHERE id=?',
-                             (hoy.isoformat(), id_rec))
-                self.conn.commit()
+                # El gasto y la marca de ejecución se confirman juntos
+                with self.transaccion():
+                    self.agregar_gasto(hoy.isoformat(), cat, monto, moneda, f"{nombre} (Recurrente)", cuenta)
+                    cursor.execute('UPDATE transacciones_recurrentes SET ultima_ejecucion=? WHERE id=?',
+                                 (hoy.isoformat(), id_rec))
 
     def agregar_presupuesto(self, categoria, mes, limite):
         cursor = self.conn.cursor()
         cursor.execute('INSERT OR REPLACE INTO presupuestos (categoria, mes, limite) VALUES (?, ?, ?)',
-                      (categoria, mes, limite))
-        self.conn.commit()
+                      (categoria, mes, Dinero.desde(limite)))
+        self._confirmar()
 
-    def obtener_presupuesto(self, categoria, mes):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM presupuestos WHERE categoria=? AND mes=?', (categoria, mes))
+    def obtener_presupuesto(self, categoria, mes) -> Optional[Presupuesto]:
+        cursor = self._consultar(Presupuesto, f'SELECT {columnas(Presupuesto)} FROM presupuestos WHERE categoria=? AND mes=?', (categoria, mes))
         return cursor.fetchone()
 
-    def obtener_todos_presupuestos(self, mes):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM presupuestos WHERE mes=?', (mes,))
+    def obtener_todos_presupuestos(self, mes) -> list[Presupuesto]:
+        cursor = self._consultar(Presupuesto, f'SELECT {columnas(Presupuesto)} FROM presupuestos WHERE mes=?', (mes,))
         return cursor.fetchall()
 
     def agregar_tag(self, gasto_id, tag):
         cursor = self.conn.cursor()
         cursor.execute('INSERT INTO tags (gasto_id, tag) VALUES (?, ?)', (gasto_id, tag))
-        self.conn.commit()
+        self._confirmar()
 
     def obtener_tags(self, gasto_id):
         cursor = self.conn.cursor()
@@ -802,12 +2421,11 @@ class Database:
         cursor.execute('''
             INSERT INTO cuentas_por_pagar (nombre, categoria, monto, moneda, dia_vencimiento, notas)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (nombre, categoria, monto, moneda, dia_venc, notas))
-        self.conn.commit()
+        ''', (nombre, categoria, Dinero.desde(monto), moneda, dia_venc, notas))
+        self._confirmar()
 
-    def obtener_cuentas_por_pagar(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM cuentas_por_pagar WHERE activa=1 ORDER BY dia_vencimiento')
+    def obtener_cuentas_por_pagar(self) -> list[CuentaPorPagar]:
+        cursor = self._consultar(CuentaPorPagar, f'SELECT {columnas(CuentaPorPagar)} FROM cuentas_por_pagar WHERE activa=1 ORDER BY dia_vencimiento')
         return cursor.fetchall()
 
     def verificar_vencimientos(self):
@@ -817,19 +2435,16 @@ class Database:
         dia_actual = hoy.day
 
         cuentas = self.obtener_cuentas_por_pagar()
-        for cuenta in cuentas:
-            id_cuenta, nombre, cat, monto, moneda, dia_venc, activa, ultima_alerta = cuenta[:8]
-
-            dias_para_venc = dia_venc - dia_actual
-            if dias_para_venc <= 3 and dias_para_venc >= 0:
-                # Verificar si ya se alertó este mes
-                if ultima_alerta != hoy.strftime('%Y-%m'):
-                    mensaje = f"⚠️ Vence {nombre}: ${monto:,.0f} {moneda} en {dias_para_venc} día(s)"
-                    self.crear_alerta('vencimiento', mensaje, 'warning')
-                    cursor.execute('UPDATE cuentas_por_pagar SET ultima_alerta=? WHERE id=?',
-                                 (hoy.strftime('%Y-%m'), id_cuenta))
-
-        self.conn.commit()
+        with self.transaccion():
+            for cuenta in cuentas:
+                dias_para_venc = cuenta.dia_vencimiento - dia_actual
+                if dias_para_venc <= 3 and dias_para_venc >= 0:
+                    # Verificar si ya se alertó este mes
+                    if cuenta.ultima_alerta != hoy.strftime('%Y-%m'):
+                        mensaje = f"⚠️ Vence {cuenta.nombre}: ${cuenta.monto:,.0f} {cuenta.moneda} en {dias_para_venc} día(s)"
+                        self.crear_alerta('vencimiento', mensaje, 'warning')
+                        cursor.execute('UPDATE cuentas_por_pagar SET ultima_alerta=? WHERE id=?',
+                                     (hoy.strftime('%Y-%m'), cuenta.id))
 
     # === ALERTAS ===
     def crear_alerta(self, tipo, mensaje, nivel='info'):
@@ -839,61 +2454,126 @@ class Database:
             INSERT INTO alertas (tipo, mensaje, fecha, nivel)
             VALUES (?, ?, ?, ?)
         ''', (tipo, mensaje, fecha, nivel))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_alertas(self, solo_no_leidas=True):
+    def crear_alerta_unica(self, tipo, referencia, periodo, nivel, mensaje, nivel_alerta='info'):
+        """Crea la alerta solo si no se emitió antes para (tipo, referencia, periodo, nivel); True si la creó"""
         cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT OR IGNORE INTO alertas_enviadas (tipo, referencia, periodo, nivel, fecha)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (tipo, str(referencia), periodo, str(nivel), datetime.date.today().isoformat()))
+        if cursor.rowcount == 0:
+            return False
+        self.crear_alerta(tipo, mensaje, nivel_alerta)
+        return True
+
+    def obtener_alertas(self, solo_no_leidas=True) -> list[Alerta]:
         if solo_no_leidas:
-            cursor.execute('SELECT * FROM alertas WHERE leida=0 ORDER BY fecha DESC LIMIT 10')
+            cursor = self._consultar(Alerta, f'SELECT {columnas(Alerta)} FROM alertas WHERE leida=0 ORDER BY fecha DESC LIMIT 10')
         else:
-            cursor.execute('SELECT * FROM alertas ORDER BY fecha DESC LIMIT 50')
+            cursor = self._consultar(Alerta, f'SELECT {columnas(Alerta)} FROM alertas ORDER BY fecha DESC LIMIT 50')
         return cursor.fetchall()
 
     def marcar_alerta_leida(self, id_alerta):
         cursor = self.conn.cursor()
         cursor.execute('UPDATE alertas SET leida=1 WHERE id=?', (id_alerta,))
-        self.conn.commit()
+        self._confirmar()
+
+    # Umbrales de alerta de presupuesto: (porcentaje, nivel de la alerta), de mayor a menor
+    UMBRALES_PRESUPUESTO = ((100, 'danger'), (90, 'warning'))
 
     def verificar_presupuestos(self, mes):
-        """Verifica si algún presupuesto está cerca del límite"""
+        """Evalúa todos los presupuestos del mes y alerta una sola vez por umbral cruzado"""
         presupuestos = self.obtener_todos_presupuestos(mes)
-        gastos = self.obtener_gastos(mes)
-
-        for pres in presupuestos:
-            id_pres, categoria, mes_pres, limite = pres
-            gasto_actual = sum(g[3] for g in gastos if g[2] == categoria and g[4] == 'ARS')
-
-            pct = (gasto_actual / limite * 100) if limite > 0 else 0
-
-            if pct >= 90 and pct < 100:
-                mensaje = f"⚠️ Presupuesto '{categoria}' al {pct:.0f}%: ${gasto_actual:,.0f} de ${limite:,.0f}"
-                self.crear_alerta('presupuesto', mensaje, 'warning')
-            elif pct >= 100:
-                mensaje = f"🚨 ¡Presupuesto '{categoria}' excedido! {pct:.0f}%: ${gasto_actual:,.0f} de ${limite:,.0f}"
-                self.crear_alerta('presupuesto', mensaje, 'danger')
-
-    def verificar_gastos_inusuales(self, mes):
-        """Detecta incrementos inusuales en categorías"""
-        import calendar
-
-        hoy = datetime.date.today()
-        mes_anterior = (hoy.replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
-
-        gastos_actual = self.obtener_gastos(mes)
-        gastos_anterior = self.obtener_gastos(mes_anterior)
-
-        categorias = set([g[2] for g in gastos_actual])
-
-        for cat in categorias:
-            total_actual = sum(g[3] for g in gastos_actual if g[2] == cat and g[4] == 'ARS')
-            total_anterior = sum(g[3] for g in gastos_anterior if g[2] == cat and g[4] == 'ARS')
+        if not presupuestos:
+            return
+        # Una sola lectura agregada para todos los presupuestos
+        totales = self.obtener_totales_normalizados(mes, 'ARS')
+
+        with self.transaccion():
+            for pres in presupuestos:
+                categoria, limite = pres.categoria, pres.limite
+                gasto_actual = totales.get(categoria, Dinero(0))
+
+                pct = (gasto_actual / limite * 100) if limite > 0 else 0
+                umbral = next(((u, nivel) for u, nivel in self.UMBRALES_PRESUPUESTO if pct >= u), None)
+                if umbral is None:
+                    continue
+
+                u, nivel = umbral
+                if u >= 100:
+                    mensaje = f"🚨 ¡Presupuesto '{categoria}' excedido! {pct:.0f}%: ${gasto_actual:,.0f} de ${limite:,.0f}"
+                else:
+                    mensaje = f"⚠️ Presupuesto '{categoria}' al {pct:.0f}%: ${gasto_actual:,.0f} de ${limite:,.0f}"
+                self.crear_alerta_unica('presupuesto', pres.id, mes, u, mensaje, nivel)
+
+    # Detección de anomalías: puntaje a partir del cual se alerta y mínimo de historia exigido
+    Z_GASTO_INUSUAL = 3.0
+    Z_MES_INUSUAL = 3.5
+    MINIMO_GASTOS_ANOMALIA = 10
+    MINIMO_MESES_ANOMALIA = 4
+    VENTANA_MESES_ANOMALIA = 12
+
+    def verificar_gastos_inusuales(self, mes, moneda='ARS'):
+        """Alerta gastos y totales mensuales atípicos frente a la historia de cada categoría"""
+        with self.transaccion():
+            self._verificar_meses_inusuales(mes, moneda)
+            self._verificar_gastos_atipicos(mes)
+
+    def _verificar_meses_inusuales(self, mes, moneda):
+        """Total del mes por categoría contra la mediana/MAD de los meses anteriores"""
+        meses = meses_anteriores(mes, self.VENTANA_MESES_ANOMALIA)
+        cursor = self.conn_lectura.cursor()
+        cursor.execute('''
+            SELECT categoria, mes, SUM(total) FROM resumen_mensual
+            WHERE moneda = ? AND mes >= ? AND mes < ?
+            GROUP BY categoria, mes
+        ''', (moneda, meses[0], mes))
+        filas = cursor.fetchall()
+        if not filas:
+            return
 
-            if total_anterior > 0:
-                incremento = ((total_actual - total_anterior) / total_anterior) * 100
+        categorias, meses_filas, totales = zip(*filas)
+        nombres, indices = np.unique(np.asarray(categorias, dtype=object), return_inverse=True)
+        lineas_base = lineas_base_mensuales(indices, np.searchsorted(meses, meses_filas), totales,
+                                            len(nombres), len(meses))
+        actuales_mes = self.obtener_totales_categoria(mes, moneda)
+        actuales = np.array([actuales_mes.get(c, Dinero(0)).centavos for c in nombres.tolist()], dtype=float)
+        puntajes = lineas_base.puntajes(actuales)
+
+        for i in np.flatnonzero((puntajes >= self.Z_MES_INUSUAL) & (lineas_base.meses >= self.MINIMO_MESES_ANOMALIA)):
+            categoria = nombres[i]
+            actual, habitual = Dinero(int(actuales[i])), Dinero(int(round(lineas_base.mediana[i])))
+            mensaje = f"📊 Gasto en '{categoria}' fuera de lo habitual este mes: ${actual:,.0f} vs ${habitual:,.0f} de mediana"
+            self.crear_alerta_unica('anomalia', categoria, mes, 'mensual', mensaje, 'info')
+
+    def _verificar_gastos_atipicos(self, mes):
+        """Gastos del mes contra la media/desvío del resto de su categoría (z-score)"""
+        cursor = self.conn_lectura.cursor()
+        cursor.execute('''
+            SELECT g.categoria, g.descripcion, g.moneda, CAST(g.monto AS INTEGER), e.n, e.media, e.m2
+            FROM gastos g
+            JOIN estadisticas_gastos e ON e.categoria = g.categoria AND e.moneda = COALESCE(g.moneda, 'ARS')
+            WHERE g.fecha >= ? AND g.fecha < ? AND e.n > ?
+        ''', (*rango_mes(mes), self.MINIMO_GASTOS_ANOMALIA))
+        filas = cursor.fetchall()
+        if not filas:
+            return
 
-                if incremento >= 25:
-                    mensaje = f"📊 Gasto en '{cat}' aumentó +{incremento:.0f}% este mes (${total_actual:,.0f} vs ${total_anterior:,.0f})"
-                    self.crear_alerta('anomalia', mensaje, 'info')
+        categorias, descripciones, monedas, montos, n, medias, m2 = zip(*filas)
+        puntajes, medias_resto = puntajes_sin_propio(np.array(montos, dtype=float), np.array(n, dtype=float),
+                                                     np.array(medias), np.array(m2))
+        # Una alerta por categoría y mes: la del gasto más extremo
+        peores = {}
+        for i in np.flatnonzero(puntajes >= self.Z_GASTO_INUSUAL):
+            if categorias[i] not in peores or puntajes[i] > puntajes[peores[categorias[i]]]:
+                peores[categorias[i]] = i
+        for i in peores.values():
+            monto, promedio = Dinero(montos[i]), Dinero(int(round(medias_resto[i])))
+            mensaje = (f"🔎 Gasto inusual en '{categorias[i]}': ${monto:,.0f} {monedas[i]} ({descripciones[i]}), "
+                       f"promedio ${promedio:,.0f}")
+            self.crear_alerta_unica('anomalia_gasto', categorias[i], mes, 'z', mensaje, 'info')
 
     # === DEUDAS COMPARTIDAS ===
     def agregar_deuda(self, nombre, monto_total, con_quien, tipo, fecha_venc=None, notas=''):
@@ -902,15 +2582,14 @@ class Database:
         cursor.execute('''
             INSERT INTO deudas_compartidas (nombre, monto_total, con_quien, tipo, fecha_creacion, fecha_vencimiento, notas)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (nombre, monto_total, con_quien, tipo, fecha_creacion, fecha_venc, notas))
-        self.conn.commit()
+        ''', (nombre, Dinero.desde(monto_total), con_quien, tipo, fecha_creacion, fecha_venc, notas))
+        self._confirmar()
 
-    def obtener_deudas(self, saldadas=False):
-        cursor = self.conn.cursor()
+    def obtener_deudas(self, saldadas=False) -> list[Deuda]:
         if saldadas:
-            cursor.execute('SELECT * FROM deudas_compartidas ORDER BY fecha_creacion DESC')
+            cursor = self._consultar(Deuda, f'SELECT {columnas(Deuda)} FROM deudas_compartidas ORDER BY fecha_creacion DESC')
         else:
-            cursor.execute('SELECT * FROM deudas_compartidas WHERE saldada=0 ORDER BY fecha_creacion DESC')
+            cursor = self._consultar(Deuda, f'SELECT {columnas(Deuda)} FROM deudas_compartidas WHERE saldada=0 ORDER BY fecha_creacion DESC')
         return cursor.fetchall()
 
     def actualizar_pago_deuda(self, id_deuda, monto_pago):
@@ -919,12 +2598,12 @@ class Database:
         deuda = cursor.fetchone()
         if deuda:
             total, pagado = deuda
-            nuevo_pagado = pagado + monto_pago
+            nuevo_pagado = pagado + Dinero.desde(monto_pago)
             saldada = 1 if nuevo_pagado >= total else 0
 
             cursor.execute('UPDATE deudas_compartidas SET monto_pagado=?, saldada=? WHERE id=?',
                          (nuevo_pagado, saldada, id_deuda))
-            self.conn.commit()
+            self._confirmar()
 
     # === GAMIFICACIÓN ===
     def obtener_config(self, clave):
@@ -936,11 +2615,10 @@ class Database:
     def actualizar_config(self, clave, valor):
         cursor = self.conn.cursor()
         cursor.execute('INSERT OR REPLACE INTO configuracion (clave, valor) VALUES (?, ?)', (clave, valor))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_logros(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM logros ORDER BY desbloqueado DESC, id')
+    def obtener_logros(self) -> list[Logro]:
+        cursor = self._consultar(Logro, f'SELECT {columnas(Logro)} FROM logros ORDER BY desbloqueado DESC, id')
         return cursor.fetchall()
 
     def verificar_logros(self):
@@ -950,8 +2628,13 @@ class Database:
 
         cursor = self.conn.cursor()
 
+        # Contadores y rachas los mantienen los triggers de crear_estado_logros: leerlos no depende
+        # del tamaño del historial
+        cursor.execute("SELECT valor FROM estado_logros WHERE clave = 'total_gastos'")
+        fila = cursor.fetchone()
+        total_gastos = fila[0] if fila else 0
+
         # Logro: Primer Paso
-        total_gastos = len(self.obtener_gastos())
         if total_gastos >= 1:
             self.actualizar_progreso_logro('🎯 Primer Paso', 1)
 
@@ -960,21 +2643,10 @@ class Database:
             self.actualizar_progreso_logro('📊 Organizador', total_gastos)
 
         # Logro: Constante (7 días seguidos)
-        gastos = self.obtener_gastos()
-        if gastos:
-            fechas = sorted(set([g[1] for g in gastos]))
-            racha = 1
-            max_racha = 1
-            for i in range(1, len(fechas)):
-                fecha_ant = datetime.datetime.strptime(fechas[i-1], '%Y-%m-%d').date()
-                fecha_act = datetime.datetime.strptime(fechas[i], '%Y-%m-%d').date()
-                if (fecha_act - fecha_ant).days == 1:
-                    racha += 1
-                    max_racha = max(max_racha, racha)
-                else:
-                    racha = 1
-            if max_racha >= 7:
-                self.actualizar_progreso_logro('💪 Constante', max_racha)
+        cursor.execute('SELECT MAX(dias) FROM rachas')
+        max_racha = cursor.fetchone()[0] or 0
+        if max_racha >= 7:
+            self.actualizar_progreso_logro('💪 Constante', max_racha)
 
         # Verificar logros desbloqueados
         cursor.execute('SELECT COUNT(*) FROM logros WHERE desbloqueado=1')
@@ -982,6 +2654,16 @@ class Database:
         if total_desbloqueados >= 5:
             self.actualizar_progreso_logro('🎮 Maestro', total_desbloqueados)
 
+    def obtener_rachas(self):
+        """(racha actual, racha máxima) en días seguidos con gastos; la actual sigue viva si terminó ayer"""
+        cursor = self.conn_lectura.cursor()
+        hoy = datetime.date.today()
+        cursor.execute('SELECT MAX(dias) FROM rachas WHERE fin IN (?, ?)',
+                       (hoy.isoformat(), (hoy - timedelta(days=1)).isoformat()))
+        actual = cursor.fetchone()[0] or 0
+        cursor.execute('SELECT MAX(dias) FROM rachas')
+        return actual, cursor.fetchone()[0] or 0
+
     def actualizar_progreso_logro(self, nombre, progreso):
         cursor = self.conn.cursor()
         cursor.execute('SELECT id, progreso_objetivo, desbloqueado FROM logros WHERE nombre=?', (nombre,))
@@ -995,13 +2677,13 @@ class Database:
                     UPDATE logros SET desbloqueado=1, fecha_desbloqueo=?, progreso_actual=?
                     WHERE id=?
                 ''', (fecha, progreso, id_logro))
-                self.conn.commit()
+                self._confirmar()
 
                 # Crear alerta de logro desbloqueado
                 self.crear_alerta('logro', f'🎉 ¡Logro desbloqueado! {nombre}', 'success')
             else:
                 cursor.execute('UPDATE logros SET progreso_actual=? WHERE id=?', (progreso, id_logro))
-                self.conn.commit()
+                self._confirmar()
 
     # === REGLAS DE CONTEXTO ===
     def agregar_regla_contexto(self, nombre, tipo_trigger, condicion, accion, parametros=''):
@@ -1010,14 +2692,13 @@ class Database:
             INSERT INTO reglas_contexto (nombre, tipo_trigger, condicion, accion, parametros)
             VALUES (?, ?, ?, ?, ?)
         ''', (nombre, tipo_trigger, condicion, accion, parametros))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_reglas_contexto(self, solo_activas=False):
-        cursor = self.conn.cursor()
+    def obtener_reglas_contexto(self, solo_activas=False) -> list[ReglaContexto]:
         if solo_activas:
-            cursor.execute('SELECT * FROM reglas_contexto WHERE activa=1 ORDER BY nombre')
+            cursor = self._consultar(ReglaContexto, f'SELECT {columnas(ReglaContexto)} FROM reglas_contexto WHERE activa=1 ORDER BY nombre')
         else:
-            cursor.execute('SELECT * FROM reglas_contexto ORDER BY nombre')
+            cursor = self._consultar(ReglaContexto, f'SELECT {columnas(ReglaContexto)} FROM reglas_contexto ORDER BY nombre')
         return cursor.fetchall()
 
     def ejecutar_reglas_contexto(self, contexto):
@@ -1070,7 +2751,7 @@ class Database:
                     self.ejecutar_accion_regla(accion, params)
                     cursor.execute('UPDATE reglas_contexto SET ultima_ejecucion=? WHERE id=?',
                                  (hoy, id_regla))
-                    self.conn.commit()
+                    self._confirmar()
 
     def ejecutar_accion_regla(self, accion, parametros):
         """Ejecuta la acción de una regla"""
@@ -1083,33 +2764,31 @@ class Database:
     # === GEOLOCALIZACIÓN ===
     def agregar_ubicacion_gasto(self, gasto_id, lat, lon, lugar='', comercio=''):
         cursor = self.conn.cursor()
-        geohash = self.calcular_geohash(lat, lon, precision=7)
         cursor.execute('''
             INSERT INTO ubicaciones_gastos (gasto_id, latitud, longitud, geohash, lugar_nombre, comercio)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (gasto_id, lat, lon, geohash, lugar, comercio))
-        self.conn.commit()
-
-    def calcular_geohash(self, lat, lon, precision=7):
-        """Calcula geohash simplificado"""
-        # Implementación básica de geohash
-        lat_code = int((lat + 90) * 10000)
-        lon_code = int((lon + 180) * 10000)
-        return f"{lat_code:07d}{lon_code:08d}"[:precision]
-
-    def obtener_gastos_por_ubicacion(self, lat, lon, radio_metros=500):
-        """Obtiene gastos cerca de una ubicación"""
-        cursor = self.conn.cursor()
-        geohash_centro = self.calcular_geohash(lat, lon, precision=5)
-
-        cursor.execute('''
-            SELECT g.*, u.lugar_nombre, u.comercio
-            FROM gastos g
-            JOIN ubicaciones_gastos u ON g.id = u.gasto_id
-            WHERE u.geohash LIKE ?
+        ''', (gasto_id, lat, lon, geohash_codificar(lat, lon), lugar, comercio))
+        self._confirmar()
+
+    def obtener_gastos_por_ubicacion(self, lat, lon, radio_metros=500) -> list[GastoUbicado]:
+        """Obtiene gastos a menos de `radio_metros` de una ubicación, los más recientes primero"""
+        # Un rango del índice por celda ('{' es el carácter siguiente a 'z'), después el
+        # rectángulo descarta lo que sobra de las celdas y la distancia exacta, las esquinas
+        celdas = geohash_celdas_radio(lat, lon, radio_metros)
+        lat_min, lat_max, lon_min, lon_max = caja_radio(lat, lon, radio_metros)
+        condicion_lon = 'AND u.longitud BETWEEN ? AND ?' if -180 <= lon_min and lon_max <= 180 else ''
+        valores = ', '.join('(?, ?)' for _ in celdas)
+        cursor = self._consultar(GastoUbicado, f'''
+            WITH celdas (desde, hasta) AS (VALUES {valores})
+            SELECT {columnas(Gasto, 'g.')}, u.lugar_nombre, u.comercio, u.latitud, u.longitud
+            FROM celdas
+            JOIN ubicaciones_gastos u ON u.geohash >= celdas.desde AND u.geohash < celdas.hasta
+            JOIN gastos g ON g.id = u.gasto_id
+            WHERE u.latitud BETWEEN ? AND ? {condicion_lon}
             ORDER BY g.fecha DESC
-        ''', (geohash_centro + '%',))
-        return cursor.fetchall()
+        ''', [*(limite for celda in celdas for limite in (celda, celda + '{')),
+              lat_min, lat_max, *((lon_min, lon_max) if condicion_lon else ())], lectura=True)
+        return [g for g in cursor.fetchall() if distancia_metros(lat, lon, g.latitud, g.longitud) <= radio_metros]
 
     def agregar_regla_geofence(self, nombre, lat, lon, radio, categoria='', cuenta=''):
         cursor = self.conn.cursor()
@@ -1117,38 +2796,50 @@ class Database:
             INSERT INTO reglas_geofence (nombre, latitud, longitud, radio_metros, categoria_sugerida, cuenta_sugerida)
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (nombre, lat, lon, radio, categoria, cuenta))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_reglas_geofence(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM reglas_geofence WHERE activa=1')
+    def obtener_reglas_geofence(self, solo_activas=True) -> list[ReglaGeofence]:
+        if solo_activas:
+            cursor = self._consultar(ReglaGeofence, f'SELECT {columnas(ReglaGeofence)} FROM reglas_geofence WHERE activa=1')
+        else:
+            cursor = self._consultar(ReglaGeofence, f'SELECT {columnas(ReglaGeofence)} FROM reglas_geofence ORDER BY nombre')
         return cursor.fetchall()
 
-    def sugerir_categoria_por_ubicacion(self, lat, lon):
-        """Sugiere categoría basada en reglas de geofence"""
-        reglas = self.obtener_reglas_geofence()
-
-        for regla in reglas:
-            id_r, nombre, lat_r, lon_r, radio, cat_sug, cuenta_sug, activa = regla
-
-            # Calcular distancia (fórmula Haversine simplificada)
-            import math
-            R = 6371000  # Radio de la Tierra en metros
-
-            lat1, lon1 = math.radians(lat), math.radians(lon)
-            lat2, lon2 = math.radians(lat_r), math.radians(lon_r)
-
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
+    def indice_geofence(self):
+        """IndiceGeofence de las reglas activas (se rearma si cambiaron las reglas)"""
+        version = self.version_datos('reglas_geofence')
+        if getattr(self, '_indice_geofence', None) is None or self._indice_geofence[0] != version:
+            self._indice_geofence = (version, IndiceGeofence(self.obtener_reglas_geofence()))
+        return self._indice_geofence[1]
 
-            a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-            distancia = R * c
+    @staticmethod
+    def _sugerencia_geofence(regla):
+        return {'categoria': regla.categoria_sugerida, 'cuenta': regla.cuenta_sugerida, 'lugar': regla.nombre}
 
-            if distancia <= radio:
-                return {'categoria': cat_sug, 'cuenta': cuenta_sug, 'lugar': nombre}
-
-        return None
+    def sugerir_categoria_por_ubicacion(self, lat, lon):
+        """Sugiere categoría según la geocerca activa más cercana que contiene la ubicación"""
+        regla = self.indice_geofence().buscar(lat, lon)
+        return self._sugerencia_geofence(regla) if regla else None
+
+    def sugerir_categorias_por_ubicaciones(self, latitudes, longitudes):
+        """sugerir_categoria_por_ubicacion para muchas ubicaciones a la vez (None donde no hay)"""
+        indice = self.indice_geofence()
+        return [self._sugerencia_geofence(indice.reglas[i]) if i >= 0 else None
+                for i in indice.buscar_lote(latitudes, longitudes).tolist()]
+
+    def sugerencias_ubicaciones_gastos(self):
+        """Sugerencia de geocerca para cada gasto con ubicación guardada: {gasto_id: sugerencia}"""
+        cursor = self.conn_lectura.cursor()
+        cursor.execute('''
+            SELECT gasto_id, latitud, longitud FROM ubicaciones_gastos
+            WHERE latitud IS NOT NULL AND longitud IS NOT NULL
+        ''')
+        filas = cursor.fetchall()
+        if not filas:
+            return {}
+        ids, latitudes, longitudes = zip(*filas)
+        sugerencias = self.sugerir_categorias_por_ubicaciones(latitudes, longitudes)
+        return {gasto_id: sugerencia for gasto_id, sugerencia in zip(ids, sugerencias) if sugerencia}
 
     # === AHORRO AUTOMÁTICO (Inspirado en Plum) ===
     def crear_regla_ahorro_auto(self, nombre, tipo_regla, modo_agresividad='moderado', meta_id=None, config=None):
@@ -1163,14 +2854,13 @@ class Database:
             INSERT INTO reglas_ahorro_auto (nombre, tipo_regla, modo_agresividad, meta_destino_id, configuracion, activa)
             VALUES (?, ?, ?, ?, ?, 1)
         ''', (nombre, tipo_regla, modo_agresividad, meta_id, config_json))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_reglas_ahorro_auto(self, solo_activas=True):
-        cursor = self.conn.cursor()
+    def obtener_reglas_ahorro_auto(self, solo_activas=True) -> list[ReglaAhorro]:
         if solo_activas:
-            cursor.execute('SELECT * FROM reglas_ahorro_auto WHERE activa=1 ORDER BY nombre')
+            cursor = self._consultar(ReglaAhorro, f'SELECT {columnas(ReglaAhorro)} FROM reglas_ahorro_auto WHERE activa=1 ORDER BY nombre')
         else:
-            cursor.execute('SELECT * FROM reglas_ahorro_auto ORDER BY nombre')
+            cursor = self._consultar(ReglaAhorro, f'SELECT {columnas(ReglaAhorro)} FROM reglas_ahorro_auto ORDER BY nombre')
         return cursor.fetchall()
 
     def ejecutar_ahorro_redondeo(self, monto_gasto, regla_id, modo='moderado'):
@@ -1183,8 +2873,9 @@ class Database:
             'bestia': 100     # Redondeo a los 100 pesos
         }
 
-        mult = multiplicadores.get(modo, 10)
-        redondeo = math.ceil(monto_gasto / mult) * mult
+        monto_gasto = Dinero.desde(monto_gasto)
+        mult = multiplicadores.get(modo, 10) * 100  # en centavos
+        redondeo = Dinero(-(-monto_gasto.centavos // mult) * mult)
         diferencia = redondeo - monto_gasto
 
         if diferencia > 0:
@@ -1207,7 +2898,7 @@ class Database:
         ''', (fecha_str, fecha_str))
 
         resultado = cursor.fetchone()
-        ingreso = resultado[0] if resultado else None
+        ingreso = Dinero(resultado[0]) if resultado and resultado[0] else None
         return ingreso and abs(ingreso) > 10000  # Umbral configurable
 
     def aplicar_ahorro_payday(self, regla_id, modo='moderado'):
@@ -1247,7 +2938,7 @@ class Database:
             SET monto_ahorrado_total = monto_ahorrado_total + ?,
                 ultima_ejecucion = ?
             WHERE id = ?
-        ''', (monto, datetime.date.today().isoformat(), regla_id))
+        ''', (Dinero.desde(monto), datetime.date.today().isoformat(), regla_id))
 
         # Si hay meta destino, actualizar
         cursor.execute('SELECT meta_destino_id FROM reglas_ahorro_auto WHERE id=?', (regla_id,))
@@ -1259,9 +2950,9 @@ class Database:
                 UPDATE metas_ahorro
                 SET monto_actual = monto_actual + ?
                 WHERE id = ?
-            ''', (monto, meta_id))
+            ''', (Dinero.desde(monto), meta_id))
 
-        self.conn.commit()
+        self._confirmar()
 
     # === SUSCRIPCIONES (Inspirado en Emma) ===
     def crear_suscripcion(self, nombre, monto, frecuencia, dia_cobro=None, categoria=None, proveedor=None):
@@ -1287,16 +2978,15 @@ class Database:
             INSERT INTO suscripciones (nombre, categoria, monto, frecuencia, dia_cobro,
                                       fecha_inicio, fecha_proximo_cobro, proveedor, activa)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
-        ''', (nombre, categoria, monto, frecuencia, dia_cobro, fecha_inicio,
+        ''', (nombre, categoria, Dinero.desde(monto), frecuencia, dia_cobro, fecha_inicio,
               proximo.isoformat() if proximo else None, proveedor))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_suscripciones(self, solo_activas=True):
-        cursor = self.conn.cursor()
+    def obtener_suscripciones(self, solo_activas=True) -> list[Suscripcion]:
         if solo_activas:
-            cursor.execute('SELECT * FROM suscripciones WHERE activa=1 ORDER BY nombre')
+            cursor = self._consultar(Suscripcion, f'SELECT {columnas(Suscripcion)} FROM suscripciones WHERE activa=1 ORDER BY nombre')
         else:
-            cursor.execute('SELECT * FROM suscripciones ORDER BY nombre')
+            cursor = self._consultar(Suscripcion, f'SELECT {columnas(Suscripcion)} FROM suscripciones ORDER BY nombre')
         return cursor.fetchall()
 
     def calcular_gasto_suscripciones_mensual(self):
@@ -1306,124 +2996,189 @@ class Database:
             SELECT SUM(
                 CASE frecuencia
                     WHEN 'mensual' THEN monto
-                    WHEN 'anual' THEN monto / 12
+                    WHEN 'anual' THEN monto / 12.0
                     WHEN 'semanal' THEN monto * 4.33
                     ELSE 0
                 END
             ) FROM suscripciones WHERE activa=1
         ''')
         resultado = cursor.fetchone()[0]
-        return resultado if resultado else 0
+        return Dinero(round(resultado)) if resultado else Dinero(0)
 
     def detectar_suscripciones_no_usadas(self):
         """
         Detecta suscripciones que podrían no estar usándose
-        (sin gastos recientes en esa categoría/proveedor)
+        (sin gastos en los últimos 60 días en su categoría ni que la nombren)
         """
-        cursor = self.conn.cursor()
-        suscripciones = self.obtener_suscripciones()
-        no_usadas = []
-
-        for susc in suscripciones:
-            id_s, nombre, cat, monto, moneda, freq = susc[:6]
-
-            # Buscar gastos recientes relacionados (últimos 60 días)
-            cursor.execute('''
-                SELECT COUNT(*) FROM gastos
-                WHERE fecha >= date('now', '-60 days')
-                AND (descripcion LIKE ? OR categoria = ?)
-            ''', (f'%{nombre}%', cat))
-
-            count = cursor.fetchone()[0]
-            if count == 0:
-                no_usadas.append((nombre, monto, moneda))
-
-        return no_usadas
+        desde = (datetime.date.today() - timedelta(days=60)).isoformat()
+        cursor = self.conn_lectura.cursor()
+        # El nombre va como frase de FTS5 (comillas duplicadas) contra descripción y notas
+        cursor.execute('''
+            SELECT s.nombre, s.monto, s.moneda FROM suscripciones s
+            WHERE s.activa = 1
+              AND NOT EXISTS (SELECT 1 FROM gastos g WHERE g.categoria = s.categoria AND g.fecha >= ?)
+              AND NOT EXISTS (
+                  SELECT 1 FROM gastos_fts JOIN gastos g ON g.id = gastos_fts.rowid
+                  WHERE gastos_fts MATCH '"' || replace(s.nombre, '"', '""') || '"'
+                    AND gastos_fts.rowid >= (SELECT MIN(id) FROM gastos WHERE fecha >= ?)
+                    AND g.fecha >= ?
+              )
+            ORDER BY s.nombre
+        ''', (desde, desde, desde))
+        return cursor.fetchall()
 
     # === FINSCORE (Inspirado en Fintonic) ===
     def calcular_finscore(self):
         """
-        Calcula puntuación de salud financiera (0-1000)
-        Basado en:
-        - Ahorro mensual (30%)
-        - Cumplimiento de presupuestos (25%)
-        - Control de deudas (25%)
-        - Consistencia/racha (20%)
+        Puntuación de salud financiera de hoy (0-1000), ver puntuar_finscore.
+        Se recalcula solo si cambiaron gastos, presupuestos o deudas (o el día) y
+        guarda una sola foto por día en finscore_historico.
         """
-        cursor = self.conn.cursor()
-        puntuacion = 0
-
-        # 1. Ahorro mensual (0-300 puntos)
-        mes_actual = datetime.date.today().strftime('%Y-%m')
-        cursor.execute('SELECT SUM(monto) FROM gastos WHERE fecha LIKE ? AND monto < 0', (f'{mes_actual}%',))
-        ingresos = abs(cursor.fetchone()[0] or 0)
-
-        cursor.execute('SELECT SUM(monto) FROM gastos WHERE fecha LIKE ? AND monto > 0', (f'{mes_actual}%',))
-        gastos = cursor.fetchone()[0] or 0
-
-        if ingresos > 0:
-            tasa_ahorro = (ingresos - gastos) / ingresos
-            puntos_ahorro = min(300, int(tasa_ahorro * 1000))
-            puntuacion += max(0, puntos_ahorro)
-
-        # 2. Cumplimiento presupuestos (0-250 puntos)
-        cursor.execute('SELECT COUNT(*) FROM presupuestos WHERE mes=?', (mes_actual,))
-        cant_presupuestos = cursor.fetchone()[0]
+        hoy = datetime.date.today().isoformat()
+        clave = (hoy, self.version_datos(*self.ENTRADAS_FINSCORE))
+        if getattr(self, '_finscore', None) is not None and self._finscore[0] == clave:
+            return self._finscore[1]
+
+        diarios = self.finscores_diarios(hoy, hoy)
+        with self.transaccion():
+            self._guardar_finscores(diarios, reemplazar=True)
+        puntuacion = int(diarios.puntuacion[0])
+        self._finscore = (clave, puntuacion)
+        return puntuacion
 
-        if cant_presupuestos > 0:
-            cursor.execute('''
-                SELECT p.categoria, p.limite,
-                       COALESCE(SUM(g.monto), 0) as gastado
-                FROM presupuestos p
-                LEFT JOIN gastos g ON g.categoria = p.categoria
-                    AND g.fecha LIKE ?
-                WHERE p.mes = ?
-                GROUP BY p.categoria, p.limite
-            ''', (f'{mes_actual}%', mes_actual))
-
-            cumplidos = 0
-            for cat, limite, gastado in cursor.fetchall():
-                if gastado <= limite:
-                    cumplidos += 1
-
-            puntos_presupuesto = int((cumplidos / cant_presupuestos) * 250)
-            puntuacion += puntos_presupuesto
-
-        # 3. Control de deudas (0-250 puntos)
-        cursor.execute('SELECT SUM(monto_total - monto_pagado) FROM deudas_compartidas WHERE saldada=0')
-        deudas = cursor.fetchone()[0] or 0
-
-        if ingresos > 0:
-            ratio_deuda = min(1, deudas / ingresos)
-            puntos_deuda = int((1 - ratio_deuda) * 250)
-            puntuacion += puntos_deuda
+    def finscores_diarios(self, desde, hasta):
+        """FinScore de cada día de [desde, hasta] calculado en bloque con lo que hay hoy en la base"""
+        desde, hasta = np.datetime64(desde, 'D'), np.datetime64(hasta, 'D')
+        # Hace falta el mes completo del primer día y la ventana de la racha
+        inicio = min(desde.astype('datetime64[M]').astype('datetime64[D]'), desde - (DIAS_RACHA_FINSCORE - 1))
+        dias = np.arange(inicio, hasta + 1)
+        meses = dias.astype('datetime64[M]')
+        n = len(dias)
+        cursor = self.conn_lectura.cursor()
+
+        # Ingresos (montos negativos) y gastos por día, y neto por día y categoría
+        cursor.execute('''
+            SELECT substr(fecha, 1, 10), categoria,
+                   SUM(CASE WHEN monto < 0 THEN -monto ELSE 0 END),
+                   SUM(CASE WHEN monto > 0 THEN monto ELSE 0 END),
+                   SUM(monto)
+            FROM gastos
+            WHERE fecha >= ? AND fecha < ?
+            GROUP BY 1, 2
+        ''', (str(inicio), str(hasta + 1)))
+        filas = cursor.fetchall()
+        if filas:
+            fechas, categorias, ingresos, gastos, netos = zip(*filas)
+            indices = (np.array(fechas, dtype='datetime64[D]') - inicio).astype(int)
+            ingresos = np.bincount(indices, weights=ingresos, minlength=n)
+            gastos = np.bincount(indices, weights=gastos, minlength=n)
         else:
-            puntuacion += 125  # Puntos base si no hay ingresos registrados
+            categorias = netos = indices = ()
+            ingresos = gastos = np.zeros(n)
+        ingresos, gastos = acumulado_mensual(ingresos, meses), acumulado_mensual(gastos, meses)
 
-        # 4. Racha y consistencia (0-200 puntos)
+        # Presupuestos cumplidos: lo gastado en el mes hasta cada día contra el límite
         cursor.execute('''
-            SELECT COUNT(DISTINCT DATE(fecha)) FROM gastos
-            WHERE fecha >= date('now', '-30 days')
-        ''')
-        dias_con_registro = cursor.fetchone()[0] or 0
-        puntos_racha = int((dias_con_registro / 30) * 200)
-        puntuacion += puntos_racha
-
-        # Guardar en histórico
+            SELECT mes, categoria, CAST(limite AS INTEGER) FROM presupuestos
+            WHERE mes >= ? AND mes <= ?
+        ''', (str(inicio)[:7], str(hasta)[:7]))
+        presupuestos = cursor.fetchall()
+        cumplidos, cantidad = np.zeros(n), np.zeros(n)
+        if presupuestos:
+            columnas_cat = {categoria: j for j, categoria in enumerate({p[1] for p in presupuestos})}
+            por_categoria = np.zeros((n, len(columnas_cat)))
+            for indice, categoria, neto in zip(indices, categorias, netos):
+                if categoria in columnas_cat:
+                    por_categoria[indice, columnas_cat[categoria]] += neto
+            por_categoria = acumulado_mensual(por_categoria, meses)
+            for mes, categoria, limite in presupuestos:
+                en_mes = meses == np.datetime64(mes, 'M')
+                cantidad[en_mes] += 1
+                cumplidos[en_mes] += por_categoria[en_mes, columnas_cat[categoria]] <= limite
+
+        # Deudas pendientes: cada deuda cuenta desde el día en que se creó
         cursor.execute('''
-            INSERT INTO finscore_historico (fecha, puntuacion, ahorro_mensual, gasto_promedio, deudas_totales, racha_dias)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (datetime.date.today().isoformat(), puntuacion, ingresos - gastos, gastos, deudas, dias_con_registro))
-        self.conn.commit()
+            SELECT COALESCE(substr(fecha_creacion, 1, 10), ?), CAST(monto_total - monto_pagado AS INTEGER)
+            FROM deudas_compartidas WHERE saldada = 0
+        ''', (str(inicio),))
+        deudas = np.zeros(n)
+        filas = cursor.fetchall()
+        if filas:
+            creacion, pendientes = zip(*filas)
+            indices = np.maximum((np.array(creacion, dtype='datetime64[D]') - inicio).astype(int), 0)
+            vigentes = indices < n
+            deudas = np.cumsum(np.bincount(indices[vigentes], weights=np.array(pendientes, dtype=float)[vigentes],
+                                           minlength=n))
+
+        # Días con al menos un gasto en la ventana que termina en cada día
+        cursor.execute('SELECT fecha FROM dias_registro WHERE fecha >= ? AND fecha < ?', (str(inicio), str(hasta + 1)))
+        registrados = np.zeros(n + 1)
+        filas = cursor.fetchall()
+        if filas:
+            registrados[1:] = np.bincount((np.array([f[0] for f in filas], dtype='datetime64[D]') - inicio).astype(int),
+                                          minlength=n)
+        acumulados = np.cumsum(registrados)
+        racha = acumulados[1:] - acumulados[np.maximum(np.arange(1, n + 1) - DIAS_RACHA_FINSCORE, 0)]
+
+        puntuacion = puntuar_finscore(ingresos, gastos, cumplidos, cantidad, deudas, racha)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cumplimiento = np.where(cantidad > 0, cumplidos / cantidad, np.nan)
+        elegidos = dias >= desde
+        return FinScoresDiarios(dias[elegidos], puntuacion[elegidos], (ingresos - gastos)[elegidos], gastos[elegidos],
+                                deudas[elegidos], cumplimiento[elegidos], racha[elegidos].astype(int))
+
+    def _guardar_finscores(self, diarios, reemplazar=False):
+        """Guarda una foto por día; sin `reemplazar` solo completa los días que faltan"""
+        filas = [(str(dia), int(puntuacion), int(ahorro), int(gasto), int(deuda),
+                  None if np.isnan(cumplimiento) else float(cumplimiento), int(racha))
+                 for dia, puntuacion, ahorro, gasto, deuda, cumplimiento, racha in zip(*diarios)]
+        conflicto = '''
+            ON CONFLICT (fecha) DO UPDATE SET
+                puntuacion = excluded.puntuacion, ahorro_mensual = excluded.ahorro_mensual,
+                gasto_promedio = excluded.gasto_promedio, deudas_totales = excluded.deudas_totales,
+                cumplimiento_presupuestos = excluded.cumplimiento_presupuestos, racha_dias = excluded.racha_dias
+        ''' if reemplazar else 'ON CONFLICT (fecha) DO NOTHING'
+        cursor = self.conn.cursor()
+        cursor.executemany(f'''
+            INSERT INTO finscore_historico (fecha, puntuacion, ahorro_mensual, gasto_promedio, deudas_totales,
+                                            cumplimiento_presupuestos, racha_dias)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            {conflicto}
+        ''', filas)
+        return cursor.rowcount
+
+    def rellenar_finscore_historico(self, desde, hasta=None):
+        """Completa en un solo cálculo los días de [desde, hasta] sin FinScore guardado"""
+        hasta = hasta or datetime.date.today().isoformat()
+        cursor = self.conn_lectura.cursor()
+        cursor.execute('SELECT COUNT(*) FROM finscore_historico WHERE fecha >= ? AND fecha <= ?', (desde, hasta))
+        dias = (datetime.date.fromisoformat(hasta) - datetime.date.fromisoformat(desde)).days + 1
+        if cursor.fetchone()[0] >= dias:
+            return 0
+        diarios = self.finscores_diarios(desde, hasta)
+        with self.transaccion():
+            return self._guardar_finscores(diarios)
+
+    def obtener_finscore_historico(self, dias=90) -> list[FinScore]:
+        """FinScore de los últimos `dias` días (completando los que falten), del más viejo al más nuevo"""
+        desde = (datetime.date.today() - timedelta(days=dias - 1)).isoformat()
+        self.rellenar_finscore_historico(desde)
+        cursor = self._consultar(FinScore, f'''
+            SELECT {columnas(FinScore)} FROM finscore_historico WHERE fecha >= ? ORDER BY fecha
+        ''', (desde,), lectura=True)
+        return cursor.fetchall()
 
-        return puntuacion
+    def obtener_ultimo_finscore(self) -> Optional[FinScore]:
+        """La foto de FinScore más reciente"""
+        cursor = self._consultar(FinScore, f'''
+            SELECT {columnas(FinScore)} FROM finscore_historico ORDER BY fecha DESC LIMIT 1
+        ''', lectura=True)
+        return cursor.fetchone()
 
     def obtener_finscore_actual(self):
         """Obtiene el FinScore más reciente"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT puntuacion FROM finscore_historico ORDER BY fecha DESC LIMIT 1')
-        resultado = cursor.fetchone()
-        return resultado[0] if resultado else None
+        ultimo = self.obtener_ultimo_finscore()
+        return ultimo.puntuacion if ultimo else None
 
     # === SPLITWISE ===
     def crear_grupo_splitwise(self, nombre, descripcion='', tipo='general', icono='👥'):
@@ -1433,16 +3188,15 @@ class Database:
             INSERT INTO grupos_splitwise (nombre, descripcion, tipo, fecha_creacion, icono)
             VALUES (?, ?, ?, ?, ?)
         ''', (nombre, descripcion, tipo, datetime.date.today().isoformat(), icono))
-        self.conn.commit()
+        self._confirmar()
         return cursor.lastrowid
 
-    def obtener_grupos_splitwise(self, activos_solo=True):
+    def obtener_grupos_splitwise(self, activos_solo=True) -> list[GrupoSplitwise]:
         """Obtiene todos los grupos de Splitwise"""
-        cursor = self.conn.cursor()
         if activos_solo:
-            cursor.execute('SELECT * FROM grupos_splitwise WHERE activo = 1 ORDER BY fecha_creacion DESC')
+            cursor = self._consultar(GrupoSplitwise, f'SELECT {columnas(GrupoSplitwise)} FROM grupos_splitwise WHERE activo = 1 ORDER BY fecha_creacion DESC')
         else:
-            cursor.execute('SELECT * FROM grupos_splitwise ORDER BY fecha_creacion DESC')
+            cursor = self._consultar(GrupoSplitwise, f'SELECT {columnas(GrupoSplitwise)} FROM grupos_splitwise ORDER BY fecha_creacion DESC')
         return cursor.fetchall()
 
     def agregar_participante_splitwise(self, grupo_id, nombre, email=''):
@@ -1452,12 +3206,11 @@ class Database:
             INSERT INTO participantes_splitwise (grupo_id, nombre, email)
             VALUES (?, ?, ?)
         ''', (grupo_id, nombre, email))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_participantes_grupo(self, grupo_id):
+    def obtener_participantes_grupo(self, grupo_id) -> list[ParticipanteSplitwise]:
         """Obtiene todos los participantes de un grupo"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM participantes_splitwise WHERE grupo_id = ?', (grupo_id,))
+        cursor = self._consultar(ParticipanteSplitwise, f'SELECT {columnas(ParticipanteSplitwise)} FROM participantes_splitwise WHERE grupo_id = ?', (grupo_id,))
         return cursor.fetchall()
 
     def agregar_gasto_splitwise(self, grupo_id, descripcion, monto_total, pagado_por,
@@ -1473,7 +3226,7 @@ class Database:
             INSERT INTO gastos_splitwise (grupo_id, descripcion, monto_total, pagado_por,
                                          fecha, categoria, metodo_division, notas)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (grupo_id, descripcion, monto_total, pagado_por,
+        ''', (grupo_id, descripcion, Dinero.desde(monto_total), pagado_por,
               datetime.date.today().isoformat(), categoria, metodo_division, notas))
 
         gasto_id = cursor.lastrowid
@@ -1483,23 +3236,23 @@ class Database:
             # División equitativa entre todos los participantes
             participantes = self.obtener_participantes_grupo(grupo_id)
             if participantes:
-                monto_por_persona = monto_total / len(participantes)
-                divisiones = {p[2]: monto_por_persona for p in participantes}  # p[2] es el nombre
+                # Reparto exacto: los centavos sobrantes van a los primeros
+                partes = Dinero.desde(monto_total).repartir(len(participantes))
+                divisiones = {p.nombre: parte for p, parte in zip(participantes, partes)}
 
         for participante, monto_debe in divisiones.items():
             cursor.execute('''
                 INSERT INTO divisiones_splitwise (gasto_id, participante, monto_debe)
                 VALUES (?, ?, ?)
-            ''', (gasto_id, participante, monto_debe))
+            ''', (gasto_id, participante, Dinero.desde(monto_debe)))
 
-        self.conn.commit()
+        self._confirmar()
         return gasto_id
 
-    def obtener_gastos_grupo(self, grupo_id):
+    def obtener_gastos_grupo(self, grupo_id) -> list[GastoSplitwise]:
         """Obtiene todos los gastos de un grupo"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM gastos_splitwise
+        cursor = self._consultar(GastoSplitwise, f'''
+            SELECT {columnas(GastoSplitwise)} FROM gastos_splitwise
             WHERE grupo_id = ?
             ORDER BY fecha DESC
         ''', (grupo_id,))
@@ -1507,109 +3260,50 @@ class Database:
 
     def calcular_balances_grupo(self, grupo_id):
         """
-        Calcula el balance de cada participante en un grupo
+        Calcula el balance de cada participante en un grupo con una sola consulta agrupada
         Retorna: dict {participante: balance} (positivo = le deben, negativo = debe)
         """
+        balances = {p.nombre: Dinero(0) for p in self.obtener_participantes_grupo(grupo_id)}
         cursor = self.conn.cursor()
-        participantes = self.obtener_participantes_grupo(grupo_id)
-        balances = {p[2]: 0.0 for p in participantes}  # p[2] es el nombre
-
-        # Obtener todos los gastos del grupo
-        gastos = self.obtener_gastos_grupo(grupo_id)
-
-        for gasto in gastos:
-            gasto_id = gasto[0]
-            pagado_por = gasto[4]  # índice del campo pagado_por
-
-            # Obtener divisiones de este gasto
-            cursor.execute('''
-                SELECT participante, monto_debe, pagado
-                FROM divisiones_splitwise
-                WHERE gasto_id = ?
-            ''', (gasto_id,))
-            divisiones = cursor.fetchall()
-
-            for div in divisiones:
-                participante = div[0]
-                monto_debe = div[1]
-                pagado = div[2]
-
-                if not pagado:  # Si no ha pagado su parte
-                    if participante == pagado_por:
-                        # Si el que pagó es el mismo, no se debe a sí mismo
-                        # pero sí le deben los demás
-                        pass
-                    else:
-                        # Este participante debe dinero
-                        balances[participante] -= monto_debe
-                        # El que pagó tiene saldo a favor
-                        balances[pagado_por] += monto_debe
-
-        # Restar los pagos realizados
-        cursor.execute('''
-            SELECT pagador, receptor, monto
-            FROM pagos_splitwise
+        cursor.execute(f'''
+            SELECT participante, SUM(importe) FROM ({self.MOVIMIENTOS_SPLITWISE})
             WHERE grupo_id = ?
+            GROUP BY participante
         ''', (grupo_id,))
-        pagos = cursor.fetchall()
-
-        for pago in pagos:
-            pagador = pago[0]
-            receptor = pago[1]
-            monto = pago[2]
-
-            balances[pagador] += monto  # El que pagó reduce su deuda
-            balances[receptor] -= monto  # El que recibió reduce lo que le deben
-
+        for participante, balance in cursor.fetchall():
+            balances[participante] = Dinero(balance)
         return balances
 
-    def simplificar_deudas_grupo(self, grupo_id):
-        """
-        Simplifica las deudas del grupo usando algoritmo greedy
-        Retorna: lista de tuplas (deudor, acreedor, monto)
-        """
-        balances = self.calcular_balances_grupo(grupo_id)
-
-        # Separar deudores y acreedores
-        deudores = [(nombre, -balance) for nombre, balance in balances.items() if balance < -0.01]
-        acreedores = [(nombre, balance) for nombre, balance in balances.items() if balance > 0.01]
-
-        # Ordenar de mayor a menor
-        deudores.sort(key=lambda x: x[1], reverse=True)
-        acreedores.sort(key=lambda x: x[1], reverse=True)
-
-        transacciones = []
-        i, j = 0, 0
-
-        while i < len(deudores) and j < len(acreedores):
-            deudor, deuda = deudores[i]
-            acreedor, credito = acreedores[j]
-
-            monto_pago = min(deuda, credito)
-
-            if monto_pago > 0.01:  # Ignorar centavos
-                transacciones.append((deudor, acreedor, round(monto_pago, 2)))
-
-            # Actualizar balances
-            deudores[i] = (deudor, deuda - monto_pago)
-            acreedores[j] = (acreedor, credito - monto_pago)
+    def obtener_balances_grupos(self):
+        """Balances guardados de todos los grupos: {grupo_id: {participante: balance}}"""
+        cursor = self.conn_lectura.cursor()
+        cursor.execute('SELECT grupo_id, participante, balance FROM balances_splitwise WHERE balance != 0')
+        balances = {}
+        for grupo_id, participante, balance in cursor.fetchall():
+            balances.setdefault(grupo_id, {})[participante] = balance
+        return balances
 
-            # Avanzar si se saldó
-            if deudores[i][1] < 0.01:
-                i += 1
-            if acreedores[j][1] < 0.01:
-                j += 1
+    def contar_participantes_grupos(self):
+        """Cantidad de participantes por grupo: {grupo_id: cantidad}"""
+        cursor = self.conn_lectura.cursor()
+        cursor.execute('SELECT grupo_id, COUNT(*) FROM participantes_splitwise GROUP BY grupo_id')
+        return dict(cursor.fetchall())
 
-        return transacciones
+    def simplificar_deudas_grupo(self, grupo_id):
+        """
+        Simplifica las deudas del grupo con la menor cantidad de transferencias (ver liquidar_saldos)
+        Retorna: lista de tuplas (deudor, acreedor, monto)
+        """
+        return liquidar_saldos(self.calcular_balances_grupo(grupo_id))
 
     def registrar_pago_splitwise(self, grupo_id, pagador, receptor, monto, notas=''):
         """Registra un pago entre participantes"""
         cursor = self.conn.cursor()
         cursor.execute('''
-            INSERT INTO pagos_splitwise (grupo_id, pagador, receptor, monto, fecha, notas)
+            INSERT INTO pagos_splitwise (grupo_id, de_quien, para_quien, monto, fecha, notas)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (grupo_id, pagador, receptor, monto, datetime.date.today().isoformat(), notas))
-        self.conn.commit()
+        ''', (grupo_id, pagador, receptor, Dinero.desde(monto), datetime.date.today().isoformat(), notas))
+        self._confirmar()
 
     # === BUDDY - PRESUPUESTOS COMPARTIDOS ===
     def crear_presupuesto_compartido(self, nombre, categoria, limite, mes, creado_por, compartido=False, descripcion='', icono='💰'):
@@ -1618,14 +3312,13 @@ class Database:
         cursor.execute('''
             INSERT INTO presupuestos_compartidos (nombre, categoria, limite, mes, compartido, creado_por, fecha_creacion, descripcion, icono)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (nombre, categoria, limite, mes, 1 if compartido else 0, creado_por, datetime.date.today().isoformat(), descripcion, icono))
-        self.conn.commit()
+        ''', (nombre, categoria, Dinero.desde(limite), mes, 1 if compartido else 0, creado_por, datetime.date.today().isoformat(), descripcion, icono))
+        self._confirmar()
         return cursor.lastrowid
 
-    def obtener_presupuestos_compartidos(self):
+    def obtener_presupuestos_compartidos(self) -> list[PresupuestoCompartido]:
         """Obtiene todos los presupuestos compartidos"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM presupuestos_compartidos ORDER BY fecha_creacion DESC')
+        cursor = self._consultar(PresupuestoCompartido, f'SELECT {columnas(PresupuestoCompartido)} FROM presupuestos_compartidos ORDER BY fecha_creacion DESC')
         return cursor.fetchall()
 
     def agregar_participante_presupuesto(self, presupuesto_id, nombre, email='', rol='viewer'):
@@ -1635,17 +3328,16 @@ class Database:
             INSERT INTO participantes_presupuesto (presupuesto_id, nombre, email, rol, fecha_agregado)
             VALUES (?, ?, ?, ?, ?)
         ''', (presupuesto_id, nombre, email, rol, datetime.date.today().isoformat()))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_participantes_presupuesto(self, presupuesto_id):
+    def obtener_participantes_presupuesto(self, presupuesto_id) -> list[ParticipantePresupuesto]:
         """Obtiene los participantes de un presupuesto"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM participantes_presupuesto WHERE presupuesto_id = ? AND activo = 1', (presupuesto_id,))
+        cursor = self._consultar(ParticipantePresupuesto, f'SELECT {columnas(ParticipantePresupuesto)} FROM participantes_presupuesto WHERE presupuesto_id = ? AND activo = 1', (presupuesto_id,))
         return cursor.fetchall()
 
     def calcular_uso_presupuesto_compartido(self, presupuesto_id):
         """Calcula el uso actual de un presupuesto compartido"""
-        cursor = self.conn.cursor()
+        cursor = self.conn_lectura.cursor()
 
         # Obtener info del presupuesto
         cursor.execute('SELECT categoria, mes, limite FROM presupuestos_compartidos WHERE id = ?', (presupuesto_id,))
@@ -1661,17 +3353,17 @@ class Database:
         # Calcular gastos del mes en esa categoría
         if categoria:
             cursor.execute('''
-                SELECT COALESCE(SUM(monto), 0) FROM gastos
-                WHERE strftime('%Y-%m', fecha) = ? AND categoria = ?
+                SELECT COALESCE(SUM(total), 0) FROM resumen_mensual
+                WHERE mes = ? AND categoria = ?
             ''', (mes, categoria))
         else:
             # Si no hay categoría específica, todos los gastos del mes
             cursor.execute('''
-                SELECT COALESCE(SUM(monto), 0) FROM gastos
-                WHERE strftime('%Y-%m', fecha) = ?
+                SELECT COALESCE(SUM(total), 0) FROM resumen_mensual
+                WHERE mes = ?
             ''', (mes,))
 
-        gastado = cursor.fetchone()[0]
+        gastado = Dinero(cursor.fetchone()[0])
         porcentaje = (gastado / limite * 100) if limite > 0 else 0
 
         return gastado, limite, porcentaje
@@ -1684,12 +3376,11 @@ class Database:
             INSERT INTO alertas_configuracion (tipo_alerta, categoria, umbral_porcentaje, activa)
             VALUES (?, ?, ?, ?)
         ''', (tipo_alerta, categoria, umbral_porcentaje, 1 if activa else 0))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_alertas_configuracion(self):
+    def obtener_alertas_configuracion(self) -> list[AlertaConfiguracion]:
         """Obtiene todas las configuraciones de alertas"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM alertas_configuracion WHERE activa = 1')
+        cursor = self._consultar(AlertaConfiguracion, f'SELECT {columnas(AlertaConfiguracion)} FROM alertas_configuracion WHERE activa = 1')
         return cursor.fetchall()
 
     def verificar_alertas_presupuesto(self):
@@ -1704,16 +3395,16 @@ class Database:
         presupuestos = self.obtener_presupuestos_compartidos()
 
         for presup in presupuestos:
-            presup_id = presup[0]
-            nombre = presup[1]
-            categoria = presup[2]
+            presup_id = presup.id
+            nombre = presup.nombre
+            categoria = presup.categoria
 
             gastado, limite, porcentaje = self.calcular_uso_presupuesto_compartido(presup_id)
 
             # Verificar umbrales de alertas
             for config in configs:
-                tipo = config[1]
-                umbral = config[3]
+                tipo = config.tipo_alerta
+                umbral = config.umbral_porcentaje
 
                 if tipo == 'presupuesto_porcentaje' and porcentaje >= umbral:
                     # Verificar si ya se notificó recientemente
@@ -1770,22 +3461,21 @@ class Database:
             INSERT INTO notificaciones_buddy (tipo, titulo, mensaje, categoria, presupuesto_id, nivel, fecha, accion_requerida)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (tipo, titulo, mensaje, categoria, presupuesto_id, nivel, datetime.datetime.now().isoformat(), accion_requerida))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_notificaciones_buddy(self, solo_no_leidas=False):
+    def obtener_notificaciones_buddy(self, solo_no_leidas=False) -> list[NotificacionBuddy]:
         """Obtiene notificaciones de Buddy"""
-        cursor = self.conn.cursor()
         if solo_no_leidas:
-            cursor.execute('SELECT * FROM notificaciones_buddy WHERE leida = 0 ORDER BY fecha DESC LIMIT 50')
+            cursor = self._consultar(NotificacionBuddy, f'SELECT {columnas(NotificacionBuddy)} FROM notificaciones_buddy WHERE leida = 0 ORDER BY fecha DESC LIMIT 50')
         else:
-            cursor.execute('SELECT * FROM notificaciones_buddy ORDER BY fecha DESC LIMIT 100')
+            cursor = self._consultar(NotificacionBuddy, f'SELECT {columnas(NotificacionBuddy)} FROM notificaciones_buddy ORDER BY fecha DESC LIMIT 100')
         return cursor.fetchall()
 
     def marcar_notificacion_leida(self, notif_id):
         """Marca una notificación como leída"""
         cursor = self.conn.cursor()
         cursor.execute('UPDATE notificaciones_buddy SET leida = 1 WHERE id = ?', (notif_id,))
-        self.conn.commit()
+        self._confirmar()
 
     # === BUDDY - TEMAS DE COLORES ===
     def crear_tema_color(self, nombre, primary, secondary, success, danger, warning, info, background, card_bg):
@@ -1796,12 +3486,11 @@ class Database:
                                       warning_color, info_color, background_color, card_bg_color)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (nombre, primary, secondary, success, danger, warning, info, background, card_bg))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_temas_disponibles(self):
+    def obtener_temas_disponibles(self) -> list[TemaColor]:
         """Obtiene todos los temas de colores disponibles"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM temas_colores')
+        cursor = self._consultar(TemaColor, f'SELECT {columnas(TemaColor)} FROM temas_colores')
         return cursor.fetchall()
 
     def activar_tema(self, tema_id):
@@ -1811,15 +3500,39 @@ class Database:
         cursor.execute('UPDATE temas_colores SET activo = 0')
         # Activar el tema seleccionado
         cursor.execute('UPDATE temas_colores SET activo = 1 WHERE id = ?', (tema_id,))
-        self.conn.commit()
+        self._confirmar()
 
-    def obtener_tema_activo(self):
+    def obtener_tema_activo(self) -> Optional[TemaColor]:
         """Obtiene el tema de colores activo"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM temas_colores WHERE activo = 1 LIMIT 1')
+        cursor = self._consultar(TemaColor, f'SELECT {columnas(TemaColor)} FROM temas_colores WHERE activo = 1 LIMIT 1')
         return cursor.fetchone()
 
+    # === COTIZACIONES ===
+    def guardar_cotizaciones(self, fuente, valores, fecha_hora):
+        """Registra una consulta de cotizaciones ({moneda: (compra, venta)})"""
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            'INSERT INTO cotizaciones (fecha_hora, fuente, moneda, compra, venta) VALUES (?, ?, ?, ?, ?)',
+            [(fecha_hora, fuente, moneda, compra, venta) for moneda, (compra, venta) in valores.items()]
+        )
+        self._confirmar()
+
+    def ultimas_cotizaciones(self, fuente):
+        """Última cotización conocida de cada moneda de una fuente: ({moneda: (compra, venta)}, fecha_hora)"""
+        cursor = self.conn_lectura.cursor()
+        # Con MAX(), SQLite toma compra/venta de la misma fila que la fecha máxima
+        cursor.execute('''
+            SELECT moneda, compra, venta, MAX(fecha_hora) FROM cotizaciones
+            WHERE fuente = ?
+            GROUP BY moneda
+        ''', (fuente,))
+        filas = cursor.fetchall()
+        if not filas:
+            return {}, None
+        return {moneda: (compra, venta) for moneda, compra, venta, _ in filas}, max(f[3] for f in filas)
+
     def cerrar(self):
+        self.conn_lectura.close()
         self.conn.close()
 
 
@@ -1833,8 +3546,6 @@ def parsear_gasto_texto(texto, categorias_disponibles):
     - "500 pesos en café"
     - "Almuerzo $350"
     """
-    import re
-
     # Limpiar texto
     texto = texto.lower().strip()
 
@@ -1919,6 +3630,173 @@ def parsear_gasto_texto(texto, categorias_disponibles):
     }
 
 
+# === RED ===
+class CircuitoAbierto(Exception):
+    """El proveedor falló varias veces seguidas y se evita consultarlo por un rato"""
+
+
+class EstadoProveedor:
+    """Timeout, circuit breaker y métricas de latencia de un proveedor HTTP"""
+
+    def __init__(self, nombre, timeout, umbral_fallas=3, enfriamiento=120):
+        self.nombre = nombre
+        self.timeout = timeout
+        self.umbral_fallas = umbral_fallas
+        self.enfriamiento = enfriamiento
+        self.fallas_seguidas = 0
+        self.abierto_hasta = 0.0
+        self.prueba_en_curso = False
+        self.pedidos = 0
+        self.fallas = 0
+        self.latencias_ms = deque(maxlen=100)
+
+    def circuito(self, ahora):
+        if self.fallas_seguidas < self.umbral_fallas:
+            return 'cerrado'
+        return 'abierto' if ahora < self.abierto_hasta or self.prueba_en_curso else 'semiabierto'
+
+    def permite(self, ahora):
+        """Si se puede hacer un pedido; en semiabierto deja pasar uno solo, de prueba"""
+        estado = self.circuito(ahora)
+        if estado == 'semiabierto':
+            # Hasta que la prueba termine el circuito sigue abierto para los demás:
+            # si sale bien se cierra, si falla vuelve a abrirse otro enfriamiento
+            self.prueba_en_curso = True
+        return estado != 'abierto'
+
+    def registrar(self, ok, ms, ahora):
+        self.pedidos += 1
+        self.latencias_ms.append(ms)
+        self.prueba_en_curso = False
+        if ok:
+            self.fallas_seguidas = 0
+        else:
+            self.fallas += 1
+            self.fallas_seguidas += 1
+            if self.fallas_seguidas >= self.umbral_fallas:
+                self.abierto_hasta = ahora + self.enfriamiento
+
+    def metricas(self, ahora):
+        latencias = sorted(self.latencias_ms)
+        return {
+            'pedidos': self.pedidos,
+            'fallas': self.fallas,
+            'latencia_media_ms': sum(latencias) / len(latencias) if latencias else None,
+            'latencia_p95_ms': latencias[int(0.95 * (len(latencias) - 1))] if latencias else None,
+            'circuito': self.circuito(ahora),
+        }
+
+
+class ClienteHTTP:
+    """Cliente JSON compartido por todas las APIs externas.
+
+    Los pedidos corren en un pool chico de hilos, así que se pueden lanzar varios a la
+    vez. Un mismo pedido que ya está en curso no se repite: se comparte su Future.
+    Cada hilo reutiliza su conexión por host (keep-alive). Cada proveedor tiene su
+    timeout y un circuit breaker: tras varias fallas seguidas, los pedidos fallan al
+    instante con CircuitoAbierto hasta que pase el enfriamiento; después pasa un solo
+    pedido de prueba, que lo cierra o lo vuelve a abrir.
+    """
+
+    def __init__(self, max_hilos=4):
+        self.pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix='red')
+        self.lock = threading.Lock()
+        self.en_curso = {}  # (proveedor, url) -> Future
+        self.proveedores = {}
+        self.locales = threading.local()  # conexiones del hilo: (esquema, host) -> HTTPConnection
+
+    def registrar_proveedor(self, nombre, timeout, umbral_fallas=3, enfriamiento=120):
+        self.proveedores[nombre] = EstadoProveedor(nombre, timeout, umbral_fallas, enfriamiento)
+
+    def pedir_json(self, proveedor, url):
+        """Lanza un GET en segundo plano y devuelve un Future con el JSON decodificado"""
+        estado = self.proveedores[proveedor]
+        clave = (proveedor, url)
+        with self.lock:
+            futuro = self.en_curso.get(clave)
+            if futuro is not None:
+                return futuro
+            if not estado.permite(time.monotonic()):
+                futuro = Future()
+                futuro.set_exception(CircuitoAbierto(proveedor))
+                return futuro
+            futuro = self.pool.submit(self._pedir, estado, url)
+            self.en_curso[clave] = futuro
+        futuro.add_done_callback(lambda _: self._terminar(clave))
+        return futuro
+
+    def obtener_json(self, proveedor, url):
+        """GET bloqueante; devuelve None ante cualquier falla (incluido el circuito abierto)"""
+        try:
+            return self.pedir_json(proveedor, url).result()
+        except Exception:
+            return None
+
+    def metricas(self):
+        ahora = time.monotonic()
+        with self.lock:
+            return {nombre: estado.metricas(ahora) for nombre, estado in self.proveedores.items()}
+
+    def _terminar(self, clave):
+        with self.lock:
+            self.en_curso.pop(clave, None)
+
+    def _conexion(self, esquema, host, timeout):
+        conexiones = getattr(self.locales, 'conexiones', None)
+        if conexiones is None:
+            conexiones = self.locales.conexiones = {}
+        conn = conexiones.get((esquema, host))
+        reutilizada = conn is not None
+        if conn is None:
+            clase = http.client.HTTPSConnection if esquema == 'https' else http.client.HTTPConnection
+            conn = conexiones[(esquema, host)] = clase(host, timeout=timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, reutilizada
+
+    def _descartar(self, esquema, host):
+        conn = self.locales.conexiones.pop((esquema, host), None)
+        if conn is not None:
+            conn.close()
+
+    def _pedir(self, estado, url):
+        partes = urllib.parse.urlsplit(url)
+        ruta = partes.path + (f'?{partes.query}' if partes.query else '')
+        inicio = time.perf_counter()
+        ok = False
+        try:
+            while True:
+                conn, reutilizada = self._conexion(partes.scheme, partes.netloc, estado.timeout)
+                try:
+                    conn.request('GET', ruta, headers={'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'})
+                    respuesta = conn.getresponse()
+                    cuerpo = respuesta.read()
+                    break
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    # El servidor cerró la conexión keep-alive: se reintenta una vez con una nueva
+                    self._descartar(partes.scheme, partes.netloc)
+                    if not reutilizada:
+                        raise
+                except Exception:
+                    self._descartar(partes.scheme, partes.netloc)
+                    raise
+            if respuesta.status != 200:
+                raise OSError(f"{estado.nombre}: HTTP {respuesta.status}")
+            datos = json.loads(cuerpo.decode())
+            ok = True
+            return datos
+        finally:
+            with self.lock:
+                estado.registrar(ok, (time.perf_counter() - inicio) * 1000, time.monotonic())
+
+
+RED = ClienteHTTP()
+RED.registrar_proveedor('open-meteo', timeout=4)
+RED.registrar_proveedor('dolarapi', timeout=5)
+RED.registrar_proveedor('exchangerate', timeout=5)
+
+
 # === APIs DE CONTEXTO ===
 def obtener_clima(ciudad='Buenos Aires'):
     """Obtiene información del clima usando API pública"""
@@ -1935,13 +3813,9 @@ def obtener_clima(ciudad='Buenos Aires'):
         lat, lon = coords.get(ciudad, coords['Buenos Aires'])
 
         url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'Mozilla/5.0')
-
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode())
+        data = RED.obtener_json('open-meteo', url)
 
-        if 'current_weather' in data:
+        if data and 'current_weather' in data:
             temp = data['current_weather']['temperature']
             windspeed = data['current_weather']['windspeed']
             weathercode = data['current_weather']['weathercode']
@@ -1968,7 +3842,7 @@ def obtener_clima(ciudad='Buenos Aires'):
                 'condicion': condicion,
                 'ciudad': ciudad
             }
-    except:
+    except (KeyError, TypeError):
         return None
 
 def obtener_contexto_actual():
@@ -2002,64 +3876,771 @@ def obtener_contexto_actual():
 
 
 # === COTIZACIONES ===
-def obtener_cotizacion_dolar():
-    try:
-        url = "https://dolarapi.com/v1/dolares"
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'Mozilla/5.0')
-        
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode())
-        
-        cotizaciones = {}
-        for item in data:
-            tipo = item.get('nombre', '')
-            if 'Blue' in tipo:
-                cotizaciones['Blue'] = {'compra': item.get('compra', 0), 'venta': item.get('venta', 0)}
-            elif 'Oficial' in tipo:
-                cotizaciones['Oficial'] = {'compra': item.get('compra', 0), 'venta': item.get('venta', 0)}
-        
-        return cotizaciones if cotizaciones else obtener_cotizaciones_respaldo()
-    except:
-        return obtener_cotizaciones_respaldo()
+MONEDAS_CONVERSION = ('USD', 'EUR', 'GBP', 'ARS', 'BRL', 'CLP', 'MXN', 'UYU')
 
 
-def obtener_cotizaciones_respaldo():
-    import random
-    base = 1150
-    var = random.uniform(-10, 10)
-    return {
-        'Blue': {'compra': base + var, 'venta': base + var + 20},
-        'Oficial': {'compra': base - 100 + var, 'venta': base - 90 + var}
-    }
+def parsear_dolarapi(data):
+    """Dólar blue y oficial en ARS: {'Blue': (compra, venta), ...}"""
+    cotizaciones = {}
+    for item in data or []:
+        tipo = item.get('nombre', '')
+        if 'Blue' in tipo:
+            cotizaciones['Blue'] = (item.get('compra', 0), item.get('venta', 0))
+        elif 'Oficial' in tipo:
+            cotizaciones['Oficial'] = (item.get('compra', 0), item.get('venta', 0))
+    return cotizaciones or None
+
+
+def parsear_exchangerate(data):
+    """Unidades de cada moneda por 1 USD: {'EUR': (tasa, tasa), ...}"""
+    rates = (data or {}).get('rates', {})
+    tasas = {moneda: (rates[moneda], rates[moneda]) for moneda in MONEDAS_CONVERSION if moneda in rates}
+    return tasas or None
+
+
+# fuente -> (URL, función que interpreta el JSON); el nombre de la fuente es también su proveedor en RED
+FUENTES_COTIZACION = {
+    'dolarapi': ("https://dolarapi.com/v1/dolares", parsear_dolarapi),
+    'exchangerate': ("https://api.exchangerate-api.com/v4/latest/USD", parsear_exchangerate),
+}
+
+
+def obtener_cotizacion_dolar():
+    url, parsear = FUENTES_COTIZACION['dolarapi']
+    return parsear(RED.obtener_json('dolarapi', url))
 
 
 def obtener_tasas_conversion():
-    """Obtiene tasas de conversión desde API"""
+    url, parsear = FUENTES_COTIZACION['exchangerate']
+    return parsear(RED.obtener_json('exchangerate', url))
+
+
+class ServicioCotizaciones:
+    """Cotizaciones en memoria con vencimiento (TTL), historial en la base y refresco en segundo plano.
+
+    Las lecturas (dolar(), tasas()) nunca salen a la red: devuelven lo último que se
+    consiguió, o lo último guardado en la tabla cotizaciones si no hay conexión.
+    """
+    TTL_SEGUNDOS = 15 * 60
+
+    def __init__(self, ttl=TTL_SEGUNDOS):
+        self.ttl = ttl
+        self.cache = {}  # fuente -> (instante monotonic, fecha_hora, {moneda: (compra, venta)})
+        self.lock = threading.Lock()
+        self.detener = threading.Event()
+        self.al_actualizar = None
+
+    def cargar_historial(self, db):
+        """Arranca con las últimas cotizaciones guardadas (vencidas, para que se refresquen)"""
+        for fuente in FUENTES_COTIZACION:
+            valores, fecha_hora = db.ultimas_cotizaciones(fuente)
+            if valores:
+                with self.lock:
+                    self.cache.setdefault(fuente, (float('-inf'), fecha_hora, valores))
+
+    def valores(self, fuente):
+        with self.lock:
+            entrada = self.cache.get(fuente)
+        return entrada[2] if entrada else {}
+
+    def fecha_hora(self, fuente):
+        with self.lock:
+            entrada = self.cache.get(fuente)
+        return entrada[1] if entrada else None
+
+    def dolar(self):
+        """{'Blue': {'compra', 'venta'}, 'Oficial': {...}} desde la caché"""
+        return {tipo: {'compra': compra, 'venta': venta} for tipo, (compra, venta) in self.valores('dolarapi').items()}
+
+    def tasas(self):
+        """Unidades de cada moneda por 1 USD desde la caché ({} si nunca hubo datos)"""
+        tasas = {moneda: venta for moneda, (_, venta) in self.valores('exchangerate').items()}
+        if tasas:
+            tasas['USD'] = 1.0
+        return tasas
+
+    def vencida(self, fuente):
+        with self.lock:
+            entrada = self.cache.get(fuente)
+        return entrada is None or time.monotonic() - entrada[0] >= self.ttl
+
+    def refrescar(self, forzar=False):
+        """Consulta por red las fuentes vencidas y guarda lo obtenido; devuelve las fuentes actualizadas"""
+        pendientes = [fuente for fuente in FUENTES_COTIZACION if forzar or self.vencida(fuente)]
+        if not pendientes:
+            return []
+
+        # Todas las fuentes se consultan a la vez
+        futuros = {fuente: RED.pedir_json(fuente, FUENTES_COTIZACION[fuente][0]) for fuente in pendientes}
+
+        actualizadas = []
+        db = Database()
+        try:
+            for fuente, futuro in futuros.items():
+                try:
+                    valores = FUENTES_COTIZACION[fuente][1](futuro.result())
+                except Exception:
+                    valores = None
+                if not valores:
+                    continue  # sin conexión: se sigue usando lo último conocido
+                fecha_hora = datetime.datetime.now().isoformat(timespec='seconds')
+                db.guardar_cotizaciones(fuente, valores, fecha_hora)
+                with self.lock:
+                    self.cache[fuente] = (time.monotonic(), fecha_hora, valores)
+                actualizadas.append(fuente)
+        finally:
+            db.cerrar()
+
+        if actualizadas and self.al_actualizar:
+            self.al_actualizar(actualizadas)
+        return actualizadas
+
+    def refrescar_en_segundo_plano(self, forzar=False):
+        threading.Thread(target=self.refrescar, args=(forzar,), daemon=True).start()
+
+    def iniciar(self, al_actualizar=None):
+        """Refresca ahora y luego cada TTL en un hilo; al_actualizar(fuentes) se llama desde ese hilo"""
+        self.al_actualizar = al_actualizar
+
+        def ciclo():
+            while not self.detener.is_set():
+                try:
+                    self.refrescar()
+                except Exception as e:
+                    print(f"⚠️ Error refrescando cotizaciones: {e}")
+                self.detener.wait(self.ttl)
+
+        threading.Thread(target=ciclo, daemon=True).start()
+
+    def parar(self):
+        self.detener.set()
+
+
+class ConversorMonedas:
+    """Convierte importes entre monedas con la tasa vigente en la fecha de cada gasto.
+
+    Por cada moneda guarda una tabla ordenada de días y unidades por 1 USD (la última
+    cotización de cada día). La tasa de una fecha es la del último día cotizado hasta
+    esa fecha (o la primera conocida, si la fecha es anterior a todo el historial).
+    """
+
+    def __init__(self, tablas):
+        self.tablas = tablas  # moneda -> (días datetime64[D] ordenados, unidades por USD)
+
+    @classmethod
+    def desde_db(cls, db, fuente='exchangerate'):
+        cursor = db.conn_lectura.cursor()
+        # Con MAX(), SQLite toma la venta de la última cotización de cada día
+        cursor.execute('''
+            SELECT moneda, substr(fecha_hora, 1, 10) AS dia, venta, MAX(fecha_hora) FROM cotizaciones
+            WHERE fuente = ? AND venta > 0
+            GROUP BY moneda, dia
+            ORDER BY moneda, dia
+        ''', (fuente,))
+        filas = {}
+        for moneda, dia, venta, _ in cursor.fetchall():
+            filas.setdefault(moneda, ([], []))
+            filas[moneda][0].append(dia)
+            filas[moneda][1].append(venta)
+        tablas = {moneda: (np.array(dias, dtype='datetime64[D]'), np.array(tasas, dtype=float))
+                  for moneda, (dias, tasas) in filas.items()}
+        return cls(tablas)
+
+    def convertible(self, moneda):
+        return moneda == 'USD' or moneda in self.tablas
+
+    def tasas_en(self, moneda, fechas):
+        """Unidades de `moneda` por 1 USD vigentes en cada fecha (array datetime64[D])"""
+        if moneda == 'USD':
+            return np.ones(len(fechas))
+        dias, tasas = self.tablas[moneda]
+        indices = np.searchsorted(dias, fechas, side='right') - 1
+        return tasas[np.clip(indices, 0, len(tasas) - 1)]
+
+    def convertir_centavos(self, centavos, monedas, fechas, destino):
+        """Convierte arrays paralelos de centavos/monedas/fechas a `destino`.
+        Devuelve (centavos convertidos, máscara de filas convertibles)."""
+        centavos = np.asarray(centavos, dtype=np.int64)
+        monedas = np.asarray(monedas, dtype=object)
+        fechas = np.asarray(fechas, dtype='datetime64[D]')
+        resultado = np.zeros(len(centavos), dtype=np.int64)
+        valido = np.zeros(len(centavos), dtype=bool)
+        if not self.convertible(destino):
+            return resultado, monedas == destino
+
+        for moneda in set(monedas.tolist()):
+            filas = monedas == moneda
+            if moneda == destino:
+                resultado[filas] = centavos[filas]
+            elif self.convertible(moneda):
+                factor = self.tasas_en(destino, fechas[filas]) / self.tasas_en(moneda, fechas[filas])
+                resultado[filas] = np.rint(centavos[filas] * factor).astype(np.int64)
+            else:
+                continue
+            valido[filas] = True
+        return resultado, valido
+
+
+# === ANOMALÍAS ===
+class LineaBaseMensual(NamedTuple):
+    """Mediana, MAD y desvío medio absoluto de los totales mensuales de cada categoría"""
+    mediana: np.ndarray
+    mad: np.ndarray
+    desvio_medio: np.ndarray
+    meses: np.ndarray  # meses con historia de cada categoría
+
+    def puntajes(self, valores):
+        """Puntaje z modificado (Iglewicz-Hoaglin); con MAD 0 se escala con el desvío medio"""
+        escala = np.where(self.mad > 0, self.mad / 0.6745, self.desvio_medio * 1.253314)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            puntajes = (valores - self.mediana) / escala
+        return np.where(escala > 0, puntajes, 0.0)
+
+
+def lineas_base_mensuales(filas, columnas, totales, cantidad_filas, cantidad_meses):
+    """
+    Arma la matriz categorías × meses con los totales dados en coordenadas (filas, columnas)
+    y calcula la línea base de cada fila de una vez. Los meses sin gastos cuentan como 0
+    desde el primer mes con gastos de la categoría; los anteriores no cuentan.
+    """
+    filas = np.asarray(filas)
+    columnas = np.asarray(columnas)
+    matriz = np.zeros((cantidad_filas, cantidad_meses))
+    matriz[filas, columnas] = totales
+    primero = np.full(cantidad_filas, cantidad_meses)
+    np.minimum.at(primero, filas, columnas)
+    matriz[np.arange(cantidad_meses) < primero[:, None]] = np.nan
+
+    mediana = np.nanmedian(matriz, axis=1)
+    desvios = np.abs(matriz - mediana[:, None])
+    return LineaBaseMensual(mediana, np.nanmedian(desvios, axis=1), np.nanmean(desvios, axis=1),
+                            cantidad_meses - primero)
+
+
+def puntajes_sin_propio(montos, n, medias, m2):
+    """
+    Z-score de cada monto contra las estadísticas (Welford) de su grupo quitándolo a él mismo,
+    para que un gasto extremo no infle la media y el desvío con que se lo compara.
+    Devuelve (puntajes, medias del resto).
+    """
+    n_resto = n - 1
+    medias_resto = (medias * n - montos) / n_resto
+    m2_resto = np.maximum(m2 - (montos - medias) * (montos - medias_resto), 0)
+    desvio = np.sqrt(m2_resto / np.maximum(n_resto - 1, 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        puntajes = (montos - medias_resto) / desvio
+    return np.where(desvio > 0, puntajes, 0.0), medias_resto
+
+
+# === FINSCORE ===
+# Días hacia atrás (incluido el propio) que mira la componente de racha
+DIAS_RACHA_FINSCORE = 30
+
+
+class FinScoresDiarios(NamedTuple):
+    """Componentes del FinScore por día, como arrays paralelos (importes en centavos)"""
+    dias: np.ndarray
+    puntuacion: np.ndarray
+    ahorro: np.ndarray
+    gastos: np.ndarray
+    deudas: np.ndarray
+    cumplimiento: np.ndarray  # fracción de presupuestos cumplidos, NaN si no hay
+    racha: np.ndarray
+
+
+def acumulado_mensual(valores, meses):
+    """Suma acumulada por filas (una por día) que vuelve a empezar cada mes"""
+    acumulado = np.cumsum(valores, axis=0)
+    previo = np.concatenate([np.zeros_like(acumulado[:1]), acumulado[:-1]])
+    primer_dia = np.maximum.accumulate(np.where(np.r_[True, meses[1:] != meses[:-1]], np.arange(len(meses)), 0))
+    return acumulado - previo[primer_dia]
+
+
+def puntuar_finscore(ingresos, gastos, cumplidos, presupuestos, deudas, dias_con_registro):
+    """
+    Puntuación de salud financiera (0-1000) para arrays de componentes:
+    - Ahorro mensual (0-300): tasa de ahorro del mes
+    - Cumplimiento de presupuestos (0-250)
+    - Control de deudas (0-250): deuda pendiente contra ingresos (125 si no hay ingresos)
+    - Consistencia/racha (0-200): días con registro de los últimos DIAS_RACHA_FINSCORE
+    """
+    con_ingresos = ingresos > 0
+    base = np.where(con_ingresos, ingresos, 1)
+    ahorro = np.where(con_ingresos, np.clip(np.trunc((ingresos - gastos) / base * 1000), 0, 300), 0)
+    cumplimiento = np.where(presupuestos > 0, np.trunc(cumplidos / np.maximum(presupuestos, 1) * 250), 0)
+    deuda = np.where(con_ingresos, np.trunc((1 - np.minimum(1, deudas / base)) * 250), 125)
+    racha = np.trunc(dias_con_registro / DIAS_RACHA_FINSCORE * 200)
+    return (ahorro + cumplimiento + deuda + racha).astype(int)
+
+
+# === LIQUIDACIÓN DE DEUDAS ===
+# Hasta cuántas personas con saldo se busca el mínimo exacto (2^n estados)
+MAXIMO_LIQUIDACION_EXACTA = 20
+# Tiempo máximo (segundos) de la búsqueda heurística en grupos más grandes
+PRESUPUESTO_LIQUIDACION_S = 0.05
+
+
+def liquidar_saldos(balances, maximo_exacto=MAXIMO_LIQUIDACION_EXACTA, presupuesto_s=PRESUPUESTO_LIQUIDACION_S):
+    """
+    Transferencias (deudor, acreedor, monto) que saldan `balances` ({nombre: Dinero}).
+
+    Un conjunto de saldos que suma cero se salda con (personas - 1) transferencias, así
+    que el mínimo total es n - (máxima cantidad de subconjuntos disjuntos que suman cero).
+    Hasta `maximo_exacto` personas esa partición se busca exacta; con más, se separan
+    primero pares y tríos que se cancelan dentro de `presupuesto_s` segundos.
+    """
+    pendientes = [(nombre, balance.centavos) for nombre, balance in balances.items() if balance]
+    if not pendientes:
+        return []
+    nombres, saldos = zip(*pendientes)
+
+    if len(saldos) <= maximo_exacto:
+        grupos = grupos_suma_cero(saldos)
+    else:
+        grupos = grupos_suma_cero_heuristicos(saldos, maximo_exacto, presupuesto_s)
+
+    transacciones = []
+    for grupo in grupos:
+        transacciones.extend(saldar_grupo([nombres[i] for i in grupo], [saldos[i] for i in grupo]))
+    return transacciones
+
+
+def saldar_grupo(nombres, saldos):
+    """Salda un grupo pareando siempre al mayor deudor con el mayor acreedor (a lo sumo n - 1 pagos)"""
+    deudores = sorted(((n, -s) for n, s in zip(nombres, saldos) if s < 0), key=lambda x: x[1], reverse=True)
+    acreedores = sorted(((n, s) for n, s in zip(nombres, saldos) if s > 0), key=lambda x: x[1], reverse=True)
+
+    transacciones = []
+    i, j = 0, 0
+    while i < len(deudores) and j < len(acreedores):
+        deudor, deuda = deudores[i]
+        acreedor, credito = acreedores[j]
+
+        monto_pago = min(deuda, credito)
+        transacciones.append((deudor, acreedor, Dinero(monto_pago)))
+
+        deudores[i] = (deudor, deuda - monto_pago)
+        acreedores[j] = (acreedor, credito - monto_pago)
+
+        # Avanzar si se saldó (los importes son exactos, en centavos)
+        if not deudores[i][1]:
+            i += 1
+        if not acreedores[j][1]:
+            j += 1
+
+    return transacciones
+
+
+def grupos_suma_cero(saldos):
+    """
+    Partición de los índices de `saldos` en la mayor cantidad de grupos que suman cero
+    (el último puede no sumar cero si el total no da cero). DP sobre máscaras de bits:
+    mejor[m] = max_i mejor[m sin i] + (suma[m] == 0), calculado por capas de igual tamaño.
+    """
+    n = len(saldos)
+    estados = 1 << n
+    sumas = np.zeros(estados, dtype=np.int64)
+    tamanos = np.zeros(estados, dtype=np.int8)
+    for i, saldo in enumerate(saldos):
+        sumas[1 << i:1 << (i + 1)] = sumas[:1 << i] + saldo
+        tamanos[1 << i:1 << (i + 1)] = tamanos[:1 << i] + 1
+    cero = (sumas == 0).astype(np.int8)
+
+    mejor = np.zeros(estados, dtype=np.int8)
+    orden = np.argsort(tamanos, kind='stable')
+    cortes = np.cumsum(np.bincount(tamanos, minlength=n + 1))
+    for tamano in range(1, n + 1):
+        capa = orden[cortes[tamano - 1]:cortes[tamano]]
+        maximo = np.zeros(len(capa), dtype=np.int8)
+        for i in range(n):
+            con_i = np.flatnonzero((capa >> i) & 1)
+            maximo[con_i] = np.maximum(maximo[con_i], mejor[capa[con_i] ^ (1 << i)])
+        mejor[capa] = maximo + cero[capa]
+
+    # Reconstrucción: se sacan elementos sin perder óptimo; cada vez que lo que queda suma
+    # cero, lo sacado desde el corte anterior es un grupo
+    grupos, actual, mascara = [], [], estados - 1
+    while mascara:
+        for i in range(n):
+            if mascara >> i & 1 and mejor[mascara ^ (1 << i)] + cero[mascara] == mejor[mascara]:
+                break
+        actual.append(i)
+        mascara ^= 1 << i
+        if sumas[mascara] == 0:
+            grupos.append(actual)
+            actual = []
+    return grupos
+
+
+def grupos_suma_cero_heuristicos(saldos, maximo_exacto, presupuesto_s):
+    """Separa pares y tríos que se cancelan hasta agotar el tiempo; el resto queda en un grupo
+    (o se parte exacto si ya entra en `maximo_exacto`)"""
+    limite = time.perf_counter() + presupuesto_s
+    libres = set(range(len(saldos)))
+    por_saldo = {}
+    for i, saldo in enumerate(saldos):
+        por_saldo.setdefault(saldo, []).append(i)
+
+    def tomar(saldo, excluidos=()):
+        for k in por_saldo.get(saldo, ()):
+            if k in libres and k not in excluidos:
+                return k
+        return None
+
+    grupos = []
+    for i in range(len(saldos)):
+        if i in libres:
+            k = tomar(-saldos[i], (i,))
+            if k is not None:
+                libres -= {i, k}
+                grupos.append([i, k])
+
+    for i in sorted(libres):
+        if time.perf_counter() > limite:
+            break
+        for j in sorted(libres):
+            if i in libres and j > i and j in libres:
+                k = tomar(-(saldos[i] + saldos[j]), (i, j))
+                if k is not None:
+                    libres -= {i, j, k}
+                    grupos.append([i, j, k])
+
+    resto = sorted(libres)
+    if len(resto) <= maximo_exacto:
+        grupos.extend([resto[i] for i in grupo] for grupo in grupos_suma_cero([saldos[i] for i in resto]))
+    elif resto:
+        grupos.append(resto)
+    return grupos
+
+
+def benchmark_liquidacion(tamanos=(4, 8, 12, 16, 20, 40, 100), repeticiones=5, semilla=0):
+    """Compara transferencias y tiempo contra el pareo directo (mayor deudor/mayor acreedor)"""
+    import random
+    aleatorio = random.Random(semilla)
+    print(f"{'personas':>8} {'directo':>8} {'óptimo':>8} {'ms':>9}")
+    for tamano in tamanos:
+        directo = optimo = 0
+        segundos = 0.0
+        for _ in range(repeticiones):
+            # Subgrupos que se cancelan entre sí, como en viajes con gastos por sub-grupo
+            saldos = []
+            while len(saldos) < tamano:
+                cantidad = min(aleatorio.randint(2, 4), tamano - len(saldos))
+                partes = [aleatorio.randint(-50000, 50000) for _ in range(cantidad - 1)]
+                saldos += partes + [-sum(partes)]
+            aleatorio.shuffle(saldos)
+            balances = {f'p{i}': Dinero(saldo) for i, saldo in enumerate(saldos)}
+
+            directo += len(saldar_grupo(list(balances), saldos))
+            inicio = time.perf_counter()
+            optimo += len(liquidar_saldos(balances))
+            segundos += time.perf_counter() - inicio
+        print(f"{tamano:>8} {directo / repeticiones:>8.1f} {optimo / repeticiones:>8.1f} "
+              f"{segundos / repeticiones * 1000:>9.1f}")
+
+
+# === BACKUPS ===
+# Páginas copiadas por paso (~4 MB con páginas de 4 KiB): entre paso y paso
+# la base queda libre para escribir y se informa el progreso
+PAGINAS_POR_PASO_BACKUP = 1024
+
+
+class BackupCorrupto(Exception):
+    """La copia no pasó PRAGMA integrity_check"""
+
+
+def copiar_base(destino, al_progresar=None, paginas_por_paso=PAGINAS_POR_PASO_BACKUP, origen=None):
+    """Copia consistente de la base (RUTA_DB si no se indica `origen`) en `destino` con la API
+    de backup de SQLite, verificada con integrity_check.
+
+    Se puede hacer con la base abierta y en uso: copia la foto de la base al empezar. Se
+    escribe en un temporal que solo toma el nombre final si la copia está sana.
+    al_progresar(copiadas, total) se llama después de cada paso.
+    """
+    destino = Path(destino)
+    temporal = destino.with_name(destino.name + '.tmp')
+    temporal.unlink(missing_ok=True)
+    origen = sqlite3.connect(f"{Path(origen or RUTA_DB).resolve().as_uri()}?mode=ro", uri=True, isolation_level=None)
     try:
-        url = "https://api.exchangerate-api.com/v4/latest/USD"
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'Mozilla/5.0')
-        
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode())
-        
-        rates = data.get('rates', {})
-        return {
-            'USD': 1.0,
-            'EUR': rates.get('EUR', 0.92),
-            'GBP': rates.get('GBP', 0.79),
-            'BRL': rates.get('BRL', 5.0),
-            'ARS': rates.get('ARS', 1000.0),
-            'CLP': rates.get('CLP', 900.0),
-            'MXN': rates.get('MXN', 17.0),
-            'UYU': rates.get('UYU', 39.0)
-        }
-    except:
-        return {
-            'USD': 1.0, 'EUR': 0.92, 'GBP': 0.79, 'BRL': 5.0,
-            'ARS': 1000.0, 'CLP': 900.0, 'MXN': 17.0, 'UYU': 39.0
-        }
+        # Una transacción de lectura abierta fija la foto de la base (WAL): lo que se
+        # confirme durante la copia no la reinicia y queda para el próximo backup
+        origen.execute('BEGIN')
+        origen.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        copia = sqlite3.connect(str(temporal))
+        try:
+            progreso = None
+            if al_progresar:
+                progreso = lambda estado, restantes, total: al_progresar(total - restantes, total)
+            origen.backup(copia, pages=paginas_por_paso, progress=progreso)
+            resultado = [fila[0] for fila in copia.execute('PRAGMA integrity_check')]
+        finally:
+            copia.close()
+        if resultado != ['ok']:
+            raise BackupCorrupto('; '.join(resultado[:5]))
+        os.replace(temporal, destino)
+    finally:
+        origen.close()
+        temporal.unlink(missing_ok=True)
+    return destino
+
+
+class ServicioBackups:
+    """Backups en línea en un hilo aparte, de a uno por vez, para no congelar la UI mientras se copia"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hilo = None
+
+    def en_curso(self):
+        return self.hilo is not None and self.hilo.is_alive()
+
+    def iniciar(self, tarea, al_terminar=None):
+        """Corre tarea() (copiar_base, AlmacenBackups.guardar...) en un hilo; False si ya hay una en curso.
+
+        al_terminar(resultado, error) se llama desde ese hilo.
+        """
+        def trabajo():
+            resultado = error = None
+            try:
+                resultado = tarea()
+            except Exception as e:
+                error = e
+            if al_terminar:
+                al_terminar(resultado, error)
+
+        with self.lock:
+            if self.en_curso():
+                return False
+            self.hilo = threading.Thread(target=trabajo, daemon=True)
+            self.hilo.start()
+            return True
+
+
+# Trozo de la base que se guarda como un objeto: 16 páginas de 4 KiB (múltiplo de
+# cualquier tamaño de página de SQLite, así un cambio no desplaza los trozos vecinos)
+TAMANO_TROZO_BACKUP = 64 * 1024
+# Retención: la instantánea más nueva de cada uno de los últimos N días, semanas y meses
+RETENCION_BACKUPS = {'diarios': 7, 'semanales': 4, 'mensuales': 12}
+# Copias completas que dejaban las versiones anteriores en RUTA_BACKUPS (al cerrar y manuales)
+PATRON_COPIAS_SUELTAS = re.compile(r'(?:gastos_auto|auto|backup)_(\d{8})(?:_(\d{6}))?\.db')
+
+
+class Instantanea(NamedTuple):
+    nombre: str
+    fecha: datetime.datetime
+    tamano: int               # bytes de la base restaurada
+    trozos: tuple             # sha256 de cada trozo, en orden
+
+
+def seleccionar_retencion(fechas, diarios=7, semanales=4, mensuales=12):
+    """Fechas que se conservan: la más nueva de cada uno de los últimos días, semanas ISO y meses con backups"""
+    conservar = set()
+    periodos = ((diarios, lambda f: f.date()),
+                (semanales, lambda f: f.isocalendar()[:2]),
+                (mensuales, lambda f: (f.year, f.month)))
+    for cantidad, periodo in periodos:
+        vistos = set()
+        for fecha in sorted(fechas, reverse=True):
+            clave = periodo(fecha)
+            if clave in vistos:
+                continue
+            if len(vistos) == cantidad:
+                break
+            vistos.add(clave)
+            conservar.add(fecha)
+    return conservar
+
+
+class AlmacenBackups:
+    """Instantáneas comprimidas de la base, partidas en trozos direccionados por contenido.
+
+    Cada trozo se guarda una sola vez, comprimido con zlib, en objetos/<sha256[:2]>/<sha256>:
+    lo que no cambió entre una instantánea y otra no vuelve a ocupar lugar. Cada instantánea
+    es un JSON en instantaneas/ con la lista ordenada de sus trozos.
+    """
+
+    def __init__(self, ruta=None):
+        self.ruta = Path(ruta or RUTA_BACKUPS / 'almacen')
+        self.objetos = self.ruta / 'objetos'
+        self.manifiestos = self.ruta / 'instantaneas'
+
+    def _objeto(self, huella):
+        return self.objetos / huella[:2] / huella
+
+    @staticmethod
+    def _escribir(ruta, datos):
+        """Escritura atómica: un corte a mitad de camino no deja archivos a medias"""
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(ruta.name + '.tmp')
+        temporal.write_bytes(datos)
+        os.replace(temporal, ruta)
+
+    def instantaneas(self) -> list[Instantanea]:
+        """Instantáneas guardadas, de la más vieja a la más nueva"""
+        resultado = []
+        for manifiesto in sorted(self.manifiestos.glob('*.json')):
+            datos = json.loads(manifiesto.read_text(encoding='utf-8'))
+            resultado.append(Instantanea(manifiesto.stem, dt.fromisoformat(datos['fecha']),
+                                         datos['tamano'], tuple(datos['trozos'])))
+        return resultado
+
+    def hay_instantanea(self, dia):
+        """Si ya hay una instantánea del día `dia` (date)"""
+        return any(self.manifiestos.glob(f"{dia:%Y%m%d}_*.json"))
+
+    def guardar(self, origen=None, fecha=None, al_progresar=None) -> Instantanea:
+        """Copia la base con copiar_base y guarda sus trozos nuevos y el manifiesto"""
+        fecha = (fecha or dt.now()).replace(microsecond=0)
+        self.ruta.mkdir(parents=True, exist_ok=True)
+        copia = copiar_base(self.ruta / 'copia.db', al_progresar, origen=origen)
+        try:
+            trozos = []
+            with open(copia, 'rb') as f:
+                while trozo := f.read(TAMANO_TROZO_BACKUP):
+                    huella = hashlib.sha256(trozo).hexdigest()
+                    objeto = self._objeto(huella)
+                    if not objeto.exists():
+                        self._escribir(objeto, zlib.compress(trozo, 6))
+                    trozos.append(huella)
+            tamano = copia.stat().st_size
+        finally:
+            copia.unlink(missing_ok=True)
+
+        # El manifiesto va último: si existe, todos sus trozos ya están guardados
+        instantanea = Instantanea(f"{fecha:%Y%m%d_%H%M%S}", fecha, tamano, tuple(trozos))
+        self._escribir(self.manifiestos / f"{instantanea.nombre}.json", json.dumps(
+            {'fecha': fecha.isoformat(), 'tamano': tamano, 'trozos': trozos}).encode('utf-8'))
+        return instantanea
+
+    def restaurar(self, nombre, destino):
+        """Rearma la instantánea `nombre` en `destino`, verificando cada trozo y la base resultante"""
+        instantanea = next((i for i in self.instantaneas() if i.nombre == nombre), None)
+        if instantanea is None:
+            raise FileNotFoundError(f"No existe la instantánea {nombre}")
+
+        destino = Path(destino)
+        temporal = destino.with_name(destino.name + '.tmp')
+        try:
+            with open(temporal, 'wb') as f:
+                for huella in instantanea.trozos:
+                    trozo = zlib.decompress(self._objeto(huella).read_bytes())
+                    if hashlib.sha256(trozo).hexdigest() != huella:
+                        raise BackupCorrupto(f"Trozo dañado: {huella}")
+                    f.write(trozo)
+            conn = sqlite3.connect(str(temporal))
+            try:
+                resultado = [fila[0] for fila in conn.execute('PRAGMA integrity_check')]
+            finally:
+                conn.close()
+            if resultado != ['ok']:
+                raise BackupCorrupto('; '.join(resultado[:5]))
+            os.replace(temporal, destino)
+        finally:
+            temporal.unlink(missing_ok=True)
+        return destino
+
+    def aplicar_retencion(self, diarios=7, semanales=4, mensuales=12):
+        """Borra las instantáneas que no retiene la política y los trozos que quedaron sin usar"""
+        instantaneas = self.instantaneas()
+        conservar = seleccionar_retencion([i.fecha for i in instantaneas], diarios, semanales, mensuales)
+        borradas = [i.nombre for i in instantaneas if i.fecha not in conservar]
+        for nombre in borradas:
+            (self.manifiestos / f"{nombre}.json").unlink()
+        self.recolectar()
+        return borradas
+
+    def recolectar(self):
+        """Borra los trozos que ninguna instantánea usa; devuelve cuántos"""
+        usados = {huella for i in self.instantaneas() for huella in i.trozos}
+        borrados = 0
+        for objeto in self.objetos.glob('*/*'):
+            if objeto.name not in usados:
+                objeto.unlink()
+                borrados += 1
+        return borrados
+
+    def copias_sueltas(self, directorio=None):
+        """Copias completas de versiones anteriores (por defecto junto al almacén), con la fecha de su nombre"""
+        copias = []
+        for archivo in sorted(Path(directorio or self.ruta.parent).glob('*.db')):
+            encontrado = PATRON_COPIAS_SUELTAS.fullmatch(archivo.name)
+            if not encontrado:
+                continue
+            dia, hora = encontrado.groups()
+            try:
+                copias.append((archivo, dt.strptime(dia + (hora or '000000'), '%Y%m%d%H%M%S')))
+            except ValueError:
+                continue
+        return copias
+
+    def importar_copias(self, directorio=None):
+        """Pasa las copias sueltas al almacén, las borra y aplica la retención; devuelve las importadas"""
+        importadas = []
+        for archivo, fecha in self.copias_sueltas(directorio):
+            try:
+                self.guardar(origen=archivo, fecha=fecha)
+            except (BackupCorrupto, sqlite3.DatabaseError) as e:
+                # Una copia ilegible se deja donde está: no se borra nada que no se pudo guardar
+                print(f"⚠️ No se pudo importar {archivo.name}: {e}")
+                continue
+            archivo.unlink()
+            importadas.append(archivo.name)
+        if importadas:
+            self.aplicar_retencion(**RETENCION_BACKUPS)
+        return importadas
+
+    def tamano(self):
+        """Bytes que ocupa el almacén en disco"""
+        return sum(archivo.stat().st_size for archivo in self.ruta.rglob('*') if archivo.is_file())
+
+
+def benchmark_backups(dias=30, filas_iniciales=100000, filas_por_dia=150, semilla=0):
+    """Compara espacio y tiempo del almacén contra una copia completa por día, sobre una base sintética"""
+    import random
+    aleatorio = random.Random(semilla)
+    with tempfile.TemporaryDirectory() as directorio:
+        directorio = Path(directorio)
+        base = directorio / 'gastos.db'
+        conn = configurar_conexion(sqlite3.connect(str(base)))
+        conn.execute('CREATE TABLE gastos (id INTEGER PRIMARY KEY, fecha TEXT, categoria TEXT, '
+                     'monto INTEGER, descripcion TEXT)')
+        conn.execute('CREATE INDEX idx_gastos_fecha ON gastos(fecha)')
+        categorias = [nombre for nombre, _ in CATEGORIAS_DEFAULT]
+
+        def cargar(cantidad, dia):
+            conn.executemany('INSERT INTO gastos (fecha, categoria, monto, descripcion) VALUES (?, ?, ?, ?)', [
+                (dia.isoformat(), aleatorio.choice(categorias), aleatorio.randint(100, 5000000),
+                 f"gasto {aleatorio.randint(1, 10 ** 6)}") for _ in range(cantidad)])
+            conn.commit()
+
+        inicio_datos = datetime.date.today() - timedelta(days=dias)
+        cargar(filas_iniciales, inicio_datos)
+        almacen = AlmacenBackups(directorio / 'almacen')
+        copias = directorio / 'copias'
+        copias.mkdir()
+        ms_copias = ms_almacen = 0.0
+        mb = lambda bytes_: bytes_ / 2 ** 20
+        print(f"{'día':>4} {'base MB':>8} {'copias MB':>10} {'almacén MB':>11} {'ms copia':>9} {'ms almacén':>11}")
+        for numero in range(1, dias + 1):
+            dia = inicio_datos + timedelta(days=numero)
+            cargar(filas_por_dia, dia)
+            conn.execute('UPDATE gastos SET monto = monto + 1 WHERE id = ?', (aleatorio.randint(1, filas_iniciales),))
+            conn.commit()
+
+            inicio = time.perf_counter()
+            copiar_base(copias / f"auto_{dia:%Y%m%d}.db", origen=base)
+            ms_copias += (time.perf_counter() - inicio) * 1000
+            inicio = time.perf_counter()
+            almacen.guardar(origen=base, fecha=dt.combine(dia, datetime.time(23)))
+            almacen.aplicar_retencion(**RETENCION_BACKUPS)
+            ms_almacen += (time.perf_counter() - inicio) * 1000
+
+            if numero % 10 == 0 or numero == dias:
+                print(f"{numero:>4} {mb(base.stat().st_size):>8.1f} "
+                      f"{mb(sum(c.stat().st_size for c in copias.iterdir())):>10.1f} {mb(almacen.tamano()):>11.1f} "
+                      f"{ms_copias / numero:>9.0f} {ms_almacen / numero:>11.0f}")
+        conn.close()
+        print(f"Instantáneas retenidas: {len(almacen.instantaneas())} de {dias}")
 
 
 # === FUNCIONES HELPER PARA UI MODERNA ===
@@ -2146,27 +4727,125 @@ class GestorGastos:
         self.root.geometry("1400x800")
         self.root.configure(bg=COLORES['background'])
 
-        self.db = Database()
+        self.inicio_arranque = time.perf_counter()
+        self.tiempos_inicio = []
+        with self.medir_etapa('base_de_datos'):
+            self.db = Database()
         self.mes_actual = datetime.date.today().strftime('%Y-%m')
         self.cotizaciones = {}
+        self.cotizador = ServicioCotizaciones()
+        self.backups = ServicioBackups()
+        self.almacen_backups = AlmacenBackups()
+        # Las copias completas de versiones anteriores pasan al almacén una sola vez
+        if self.almacen_backups.copias_sueltas():
+            self.backups.iniciar(self.almacen_backups.importar_copias)
+        self.cotizador.cargar_historial(self.db)
         self.vista_actual = 'dashboard'
+        self.contexto_actual = {}
 
-        self.centrar_ventana()
-        self.db.ejecutar_recurrentes()  # Ejecutar transacciones recurrentes al inicio
-        self.db.verificar_vencimientos()  # Verificar vencimientos
-        self.db.verificar_presupuestos(self.mes_actual)  # Verificar presupuestos
-        self.db.verificar_gastos_inusuales(self.mes_actual)  # Detectar gastos inusuales
-        self.db.verificar_logros()  # Verificar logros
-
-        # Contexto y reglas
-        self.contexto_actual = obtener_contexto_actual()
-        self.db.ejecutar_reglas_contexto(self.contexto_actual)
+        # Despachador de la UI: los hilos en segundo plano vuelven por acá
+        self.ui_pendientes = {}
+        self.ui_lock = threading.Lock()
+        self.bombear_ui()
 
-        self.crear_interfaz()
+        self.centrar_ventana()
+        with self.medir_etapa('interfaz'):
+            self.crear_interfaz()
         self.actualizar_cotizaciones()
         self.actualizar_clima()
         self.root.protocol("WM_DELETE_WINDOW", self.al_cerrar)
 
+        # Las verificaciones de inicio corren en segundo plano una vez pintada la ventana
+        threading.Thread(target=self.ejecutar_inicio, daemon=True).start()
+
+    # Intervalo del bombeo de la UI (~60 cuadros por segundo)
+    INTERVALO_UI_MS = 16
+
+    def despachar_ui(self, funcion, *args, clave=None, widget=None):
+        """Encola `funcion(*args)` para el hilo de la UI (se puede llamar desde cualquier hilo)"""
+        # Misma `clave` = misma actualización: la pendiente se reemplaza por la más nueva.
+        # Con `widget`, se descarta si ese widget ya no existe cuando le toca correr.
+        with self.ui_lock:
+            if clave is None:
+                clave = object()
+            self.ui_pendientes[clave] = (funcion, args, widget)
+
+    def bombear_ui(self):
+        """Ejecuta en el hilo de la UI todo lo despachado desde el último cuadro"""
+        with self.ui_lock:
+            pendientes, self.ui_pendientes = self.ui_pendientes, {}
+
+        for funcion, args, widget in pendientes.values():
+            try:
+                if widget is not None and not widget.winfo_exists():
+                    continue
+                funcion(*args)
+            except Exception as e:
+                print(f"⚠️ Error en actualización de UI: {e}")
+
+        self.root.after(self.INTERVALO_UI_MS, self.bombear_ui)
+
+    @contextmanager
+    def medir_etapa(self, nombre):
+        """Registra en tiempos_inicio cuánto tarda una etapa del arranque"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tiempos_inicio.append((nombre, (time.perf_counter() - inicio) * 1000))
+
+    def etapas_inicio(self):
+        """Etapas del arranque en segundo plano: (nombre, función(db, resultados de etapas previas))"""
+        mes = self.mes_actual
+        return (
+            ('recurrentes', lambda db, previos: db.ejecutar_recurrentes()),
+            ('vencimientos', lambda db, previos: db.verificar_vencimientos()),
+            ('presupuestos', lambda db, previos: db.verificar_presupuestos(mes)),
+            ('gastos_inusuales', lambda db, previos: db.verificar_gastos_inusuales(mes)),
+            ('logros', lambda db, previos: db.verificar_logros()),
+            ('contexto', lambda db, previos: obtener_contexto_actual()),
+            ('reglas_contexto', lambda db, previos: db.ejecutar_reglas_contexto(previos.get('contexto') or {})),
+        )
+
+    def ejecutar_inicio(self):
+        """Hilo de arranque: usa su propia conexión y avisa a la UI con despachar_ui"""
+        db = Database()
+        resultados = {}
+        try:
+            for nombre, etapa in self.etapas_inicio():
+                inicio = time.perf_counter()
+                try:
+                    resultados[nombre] = etapa(db, resultados)
+                except Exception as e:
+                    print(f"⚠️ Inicio: falló la etapa {nombre}: {e}")
+                    resultados[nombre] = None
+                self.despachar_ui(self.registrar_etapa_inicio, nombre, resultados[nombre],
+                                  (time.perf_counter() - inicio) * 1000)
+        finally:
+            db.cerrar()
+            self.despachar_ui(self.finalizar_inicio)
+
+    def registrar_etapa_inicio(self, nombre, resultado, ms):
+        self.tiempos_inicio.append((nombre, ms))
+        if nombre == 'contexto':
+            self.contexto_actual = resultado or {}
+
+    def finalizar_inicio(self):
+        """Refresca lo que pudo cambiar en el arranque e imprime los tiempos por etapa"""
+        print(self.reporte_inicio())
+        if self.vista_actual == 'dashboard':
+            self.cambiar_vista('dashboard', self.mostrar_dashboard)
+
+    def reporte_inicio(self):
+        total = (time.perf_counter() - self.inicio_arranque) * 1000
+        lineas = [f"⏱️ Arranque completo en {total:.0f} ms"]
+        lineas += [f"   {nombre:<18} {ms:8.1f} ms" for nombre, ms in self.tiempos_inicio]
+        for proveedor, m in RED.metricas().items():
+            if m['pedidos']:
+                lineas.append(f"   🌐 {proveedor:<15} {m['latencia_media_ms']:8.1f} ms "
+                              f"({m['pedidos']} pedidos, {m['fallas']} fallas, circuito {m['circuito']})")
+        return '\n'.join(lineas)
+
     def centrar_ventana(self):
         self.root.update_idletasks()
         x = (self.root.winfo_screenwidth() // 2) - (1400 // 2)
@@ -2182,6 +4861,7 @@ class GestorGastos:
         menubar.add_cascade(label="📁 Archivo", menu=menu_archivo)
         menu_archivo.add_command(label="Exportar CSV", command=self.exportar_csv)
         menu_archivo.add_command(label="Backup", command=self.hacer_backup)
+        menu_archivo.add_command(label="Restaurar backup...", command=self.ventana_restaurar_backup)
         menu_archivo.add_separator()
         menu_archivo.add_command(label="Salir", command=self.al_cerrar)
 
@@ -2533,15 +5213,11 @@ class GestorGastos:
         comando()
 
     def actualizar_cotizaciones(self):
-        def actualizar():
-            cotiz = obtener_cotizacion_dolar()
-            if cotiz:
-                self.cotizaciones = cotiz
-                texto = f"💱 Blue: ${cotiz['Blue']['venta']:.2f} | Oficial: ${cotiz['Oficial']['venta']:.2f}"
-                self.label_dolar.config(text=texto)
-
-        thread = threading.Thread(target=actualizar, daemon=True)
-        thread.start()
+        """Muestra las cotizaciones conocidas y deja al servicio refrescándolas en segundo plano"""
+        if self.cotizador.dolar():
+            self.mostrar_cotizaciones()
+        self.cotizador.iniciar(al_actualizar=lambda fuentes: self.despachar_ui(
+            self.mostrar_cotizaciones, clave='cotizaciones', widget=self.label_dolar))
 
     def actualizar_clima(self):
         """Actualiza la información del clima en el header"""
@@ -2558,11 +5234,19 @@ class GestorGastos:
                 }.get(clima['condicion'], '🌡️')
 
                 texto = f"{icono_clima} {clima['temperatura']:.0f}°C - {clima['condicion']}"
-                self.label_clima.config(text=texto)
+                self.despachar_ui(self.label_clima.config, {'text': texto}, clave='clima', widget=self.label_clima)
 
         thread = threading.Thread(target=actualizar, daemon=True)
         thread.start()
 
+    def mostrar_cotizaciones(self):
+        cotiz = self.cotizador.dolar()
+        if not cotiz:
+            return
+        self.cotizaciones = cotiz
+        partes = [f"{tipo}: ${cotiz[tipo]['venta']:.2f}" for tipo in ('Blue', 'Oficial') if tipo in cotiz]
+        self.label_dolar.config(text="💱 " + " | ".join(partes))
+
     def ventana_conversion_rapida(self):
         """Ventana emergente para conversión rápida de monedas"""
         v = tk.Toplevel(self.root)
@@ -2629,27 +5313,24 @@ class GestorGastos:
         def convertir(event=None):
             try:
                 monto = float(entry_monto.get().replace(',', '.'))
-                tasas = obtener_tasas_conversion()
+                tasas = self.cotizador.tasas()  # caché: teclear no sale a la red
 
                 if tasas and 'ARS' in tasas:
                     # Convertir desde ARS a otras monedas
                     monto_usd = monto / tasas['ARS']
 
-                    conversiones_vals = {
-                        'usd': monto_usd,
-                        'eur': monto_usd * tasas.get('EUR', 0.92),
-                        'brl': monto_usd * tasas.get('BRL', 5.0),
-                        'clp': monto_usd * tasas.get('CLP', 900),
-                        'mxn': monto_usd * tasas.get('MXN', 17),
-                        'uyu': monto_usd * tasas.get('UYU', 39)
+                    formatos = {
+                        'usd': "🇺🇸 USD (Dólar): ${:,.2f}",
+                        'eur': "🇪🇺 EUR (Euro): €{:,.2f}",
+                        'brl': "🇧🇷 BRL (Real): R${:,.2f}",
+                        'clp': "🇨🇱 CLP (Peso chileno): ${:,.0f}",
+                        'mxn': "🇲🇽 MXN (Peso mexicano): ${:,.2f}",
+                        'uyu': "🇺🇾 UYU (Peso uruguayo): ${:,.2f}",
                     }
-
-                    labels_resultados['usd'].config(text=f"🇺🇸 USD (Dólar): ${conversiones_vals['usd']:,.2f}")
-                    labels_resultados['eur'].config(text=f"🇪🇺 EUR (Euro): €{conversiones_vals['eur']:,.2f}")
-                    labels_resultados['brl'].config(text=f"🇧🇷 BRL (Real): R${conversiones_vals['brl']:,.2f}")
-                    labels_resultados['clp'].config(text=f"🇨🇱 CLP (Peso chileno): ${conversiones_vals['clp']:,.0f}")
-                    labels_resultados['mxn'].config(text=f"🇲🇽 MXN (Peso mexicano): ${conversiones_vals['mxn']:,.2f}")
-                    labels_resultados['uyu'].config(text=f"🇺🇾 UYU (Peso uruguayo): ${conversiones_vals['uyu']:,.2f}")
+                    for codigo, formato in formatos.items():
+                        tasa = tasas.get(codigo.upper())
+                        if tasa:
+                            labels_resultados[codigo].config(text=formato.format(monto_usd * tasa))
 
             except Exception as e:
                 messagebox.showerror("Error", f"Error en conversión: {e}")
@@ -2698,11 +5379,12 @@ class GestorGastos:
             fg=COLORES['text']
         ).pack(pady=10)
         
-        gastos = self.db.obtener_gastos(self.mes_actual)
-        total_ars = sum(g[3] for g in gastos if g[4] == 'ARS')
+        # Todo convertido a ARS con la cotización de la fecha de cada gasto
+        cats = self.db.obtener_totales_normalizados(self.mes_actual, 'ARS')
+        total_ars = sum(cats.values(), Dinero(0))
         
         sueldo_data = self.db.obtener_sueldo_mes(self.mes_actual)
-        sueldo = sueldo_data[2] if sueldo_data else 0
+        sueldo = sueldo_data.monto if sueldo_data else 0
         
         frame_stats = tk.Frame(frame_resumen, bg=COLORES['card_bg'])
         frame_stats.pack(pady=10)
@@ -2713,7 +5395,7 @@ class GestorGastos:
                           COLORES['success'] if sueldo >= total_ars else COLORES['danger'])
         
         # Gráfico CIRCULAR GRANDE (estilo Monefy)
-        if gastos:
+        if cats:
             frame_grafico = tk.Frame(frame_scroll, bg=COLORES['card_bg'], relief=tk.SOLID, bd=1,
                                     highlightbackground=COLORES['border'], highlightthickness=1)
             frame_grafico.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -2725,16 +5407,12 @@ class GestorGastos:
                 bg=COLORES['card_bg']
             ).pack(pady=15)
 
-            # Agrupar por categoría
-            cats = {}
             cat_icons = {}
-            for g in gastos:
-                cats[g[2]] = cats.get(g[2], 0) + g[3]
 
             # Obtener iconos de categorías
             todas_cats = self.db.obtener_categorias()
             for cat in todas_cats:
-                cat_icons[cat[1]] = cat[3] if len(cat) > 3 else '❓'  # nombre -> icono
+                cat_icons[cat.nombre] = cat.icono or '❓'
 
             # Crear figura MÁS GRANDE
             fig = Figure(figsize=(10, 7), facecolor=COLORES['card_bg'])
@@ -2748,7 +5426,7 @@ class GestorGastos:
 
             # Crear pie chart GRANDE con estilo
             wedges, texts, autotexts = ax.pie(
-                cats.values(),
+                [float(monto) for monto in cats.values()],
                 labels=[f"{cat_icons.get(cat, '')} {cat}" for cat in cats.keys()],
                 autopct='%1.1f%%',
                 startangle=90,
@@ -2811,6 +5489,12 @@ class GestorGastos:
             relief=tk.FLAT,
             cursor='hand2'
         ).pack(side=tk.LEFT, padx=10)
+
+        tk.Label(frame_filtros, text="🔎 Buscar:", bg=COLORES['background']).pack(side=tk.LEFT, padx=(15, 5))
+
+        self.entry_buscar_gastos = tk.Entry(frame_filtros, width=30)
+        self.entry_buscar_gastos.pack(side=tk.LEFT, padx=5)
+        self.entry_buscar_gastos.bind('<KeyRelease>', self.programar_busqueda_gastos)
         
         # Tabla
         frame_tabla = tk.Frame(self.frame_contenido)
@@ -2824,7 +5508,14 @@ class GestorGastos:
             self.tree.column(col, width=150 if col != 'Descripción' else 250)
         
         scrollbar = ttk.Scrollbar(frame_tabla, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+
+        def al_desplazar(primero, ultimo):
+            scrollbar.set(primero, ultimo)
+            # Cerca del final de lo cargado: traer la próxima página
+            if float(ultimo) >= 0.9:
+                self.root.after_idle(self.cargar_mas_gastos)
+
+        self.tree.configure(yscrollcommand=al_desplazar)
         
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -2832,23 +5523,90 @@ class GestorGastos:
         self.tree.bind('<Button-3>', self.menu_contextual_gasto)
         self.cargar_gastos()
 
+    # Filas por página de la lista de gastos: lo visible (18) más un margen para scrollear
+    PAGINA_LISTA_GASTOS = 60
+    # Pausa de tipeo tras la cual se aplica la búsqueda en la lista de gastos
+    RETARDO_BUSQUEDA_MS = 150
+
+    def programar_busqueda_gastos(self, event=None):
+        """Recarga la lista cuando se deja de tipear en el buscador (una sola consulta por pausa)"""
+        pendiente = getattr(self, '_busqueda_gastos_pendiente', None)
+        if pendiente:
+            self.root.after_cancel(pendiente)
+        self._busqueda_gastos_pendiente = self.root.after(self.RETARDO_BUSQUEDA_MS, self._aplicar_busqueda_gastos)
+
+    def _aplicar_busqueda_gastos(self):
+        self._busqueda_gastos_pendiente = None
+        if not self.tree.winfo_exists():
+            return
+        lista = getattr(self, 'lista_gastos', None)
+        texto = self.entry_buscar_gastos.get().strip() or None
+        if lista and lista['filtros'].get('texto') == texto:
+            return
+        self.cargar_gastos()
+
     def cargar_gastos(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        """Reinicia la lista de gastos del mes y carga solo la primera página"""
+        self.tree.delete(*self.tree.get_children())
+
+        self.lista_gastos = {
+            'filtros': {'mes': self.combo_mes.get(), 'texto': self.entry_buscar_gastos.get().strip() or None},
+            'claves': [],  # (fecha, id) de cada fila, en el mismo orden que el Treeview
+            'agotada': False,
+            'iconos': {cat.nombre: cat.icono or '❓' for cat in self.db.obtener_categorias()},
+        }
+        self.cargar_mas_gastos()
 
-        mes = self.combo_mes.get()
-        gastos = self.db.obtener_gastos(mes)
+    def cargar_mas_gastos(self):
+        """Agrega la siguiente página de gastos al final de la lista"""
+        lista = getattr(self, 'lista_gastos', None)
+        if not lista or lista['agotada'] or not self.tree.winfo_exists():
+            return
 
-        # Obtener mapa de categorías a iconos
-        cat_icons = {}
-        categorias = self.db.obtener_categorias()
-        for cat in categorias:
-            cat_icons[cat[1]] = cat[3] if len(cat) > 3 else '❓'  # nombre -> icono
+        despues_de = lista['claves'][-1] if lista['claves'] else None
+        gastos = self.db.pagina_gastos(despues_de, self.PAGINA_LISTA_GASTOS, lista['filtros'])
+        if len(gastos) < self.PAGINA_LISTA_GASTOS:
+            lista['agotada'] = True
 
         for g in gastos:
-            icono = cat_icons.get(g[2], '❓')
-            categoria_con_icono = f"{icono} {g[2]}"
-            self.tree.insert('', tk.END, values=(g[1], categoria_con_icono, f"{g[3]:,.2f}", g[4], g[5] or '', g[6]), tags=(g[0],))
+            self.tree.insert('', tk.END, iid=str(g.id), values=self.valores_fila_gasto(g))
+            lista['claves'].append((g.fecha, g.id))
+
+    def valores_fila_gasto(self, g):
+        icono = self.lista_gastos['iconos'].get(g.categoria, '❓')
+        return (g.fecha, f"{icono} {g.categoria}", f"{g.monto:,.2f}", g.moneda, g.descripcion or '', g.cuenta)
+
+    def insertar_gasto_en_lista(self, gasto_id):
+        """Inserta un gasto recién guardado en su posición, sin recargar la lista"""
+        lista = getattr(self, 'lista_gastos', None)
+        if self.vista_actual != 'gastos' or not lista or not self.tree.winfo_exists():
+            return
+
+        desde, hasta = rango_mes(lista['filtros']['mes'])
+        g = self.db.obtener_gasto(gasto_id)
+        if not g or not desde <= g.fecha < hasta:
+            return
+        if lista['filtros']['texto'] and not self.db.contar_gastos({**lista['filtros'], 'id': gasto_id}):
+            return
+
+        clave = (g.fecha, g.id)
+        claves = lista['claves']
+        # Si cae después de lo ya cargado aparecerá al paginar
+        if claves and clave < claves[-1] and not lista['agotada']:
+            return
+
+        posicion = next((i for i, otra in enumerate(claves) if otra < clave), len(claves))
+        self.tree.insert('', posicion, iid=str(g.id), values=self.valores_fila_gasto(g))
+        claves.insert(posicion, clave)
+
+    def quitar_gasto_de_lista(self, gasto_id):
+        """Quita la fila de un gasto eliminado sin recargar la lista"""
+        lista = getattr(self, 'lista_gastos', None)
+        if not lista or not self.tree.winfo_exists() or not self.tree.exists(str(gasto_id)):
+            return
+        posicion = self.tree.index(str(gasto_id))
+        self.tree.delete(str(gasto_id))
+        del lista['claves'][posicion]
 
     def menu_contextual_gasto(self, event):
         item = self.tree.identify_row(event.y)
@@ -2864,10 +5622,10 @@ class GestorGastos:
             return
         
         if messagebox.askyesno("Confirmar", "¿Eliminar este gasto?"):
-            id_gasto = self.tree.item(sel[0])['tags'][0]
+            id_gasto = int(sel[0])
             self.db.eliminar_gasto(id_gasto)
+            self.quitar_gasto_de_lista(id_gasto)
             messagebox.showinfo("Éxito", "Gasto eliminado")
-            self.cargar_gastos()
 
     def mostrar_metas(self):
         """Vista de metas de ahorro"""
@@ -2922,8 +5680,8 @@ class GestorGastos:
             self.crear_widget_meta(meta)
 
     def crear_widget_meta(self, meta):
-        id_meta, nombre, objetivo, actual = meta[:4]
-        fecha_obj, moneda, icono = meta[5], meta[6], meta[7]
+        nombre, objetivo, actual = meta.nombre, meta.monto_objetivo, meta.monto_actual
+        fecha_obj, moneda, icono = meta.fecha_objetivo, meta.moneda, meta.icono
         
         pct = (actual / objetivo * 100) if objetivo > 0 else 0
 
@@ -3028,7 +5786,8 @@ class GestorGastos:
 
     def crear_widget_tarjeta(self, tarjeta):
         """Crea widget visual para una tarjeta"""
-        id_t, nombre, banco, limite, cierre, venc = tarjeta[:6]
+        id_t, nombre, banco, limite = tarjeta.id, tarjeta.nombre, tarjeta.banco, tarjeta.limite
+        cierre, venc = tarjeta.dia_cierre, tarjeta.dia_vencimiento
         
         frame = tk.Frame(self.frame_tarjetas, bg=COLORES['card_bg'], relief=tk.SOLID, bd=1, highlightbackground=COLORES['border'], highlightthickness=1)
         frame.pack(fill=tk.X, pady=8, padx=5)
@@ -3202,7 +5961,8 @@ class GestorGastos:
 
     def crear_widget_recurrente(self, parent, rec):
         """Crea widget para transacción recurrente"""
-        id_rec, nombre, cat, monto, moneda, cuenta, freq, dia = rec[:8]
+        nombre, cat, monto = rec.nombre, rec.categoria, rec.monto
+        moneda, cuenta, freq, dia = rec.moneda, rec.cuenta, rec.frecuencia, rec.dia_mes
 
         frame = tk.Frame(parent, bg=COLORES['card_bg'], relief=tk.SOLID, bd=1, highlightbackground=COLORES['border'], highlightthickness=1)
         frame.pack(fill=tk.X, pady=8, padx=5)
@@ -3260,7 +6020,7 @@ class GestorGastos:
         entry_nombre.pack(fill=tk.X, pady=3)
 
         tk.Label(frame, text="📂 Categoría:", bg=COLORES['background']).pack(anchor='w', pady=3)
-        combo_cat = ttk.Combobox(frame, values=[c[1] for c in self.db.obtener_categorias()], state='readonly')
+        combo_cat = ttk.Combobox(frame, values=[c.nombre for c in self.db.obtener_categorias()], state='readonly')
         if self.db.obtener_categorias():
             combo_cat.set(self.db.obtener_categorias()[0][1])
         combo_cat.pack(fill=tk.X, pady=3)
@@ -3275,7 +6035,7 @@ class GestorGastos:
         combo_moneda.pack(fill=tk.X, pady=3)
 
         tk.Label(frame, text="🏦 Cuenta:", bg=COLORES['background']).pack(anchor='w', pady=3)
-        combo_cuenta = ttk.Combobox(frame, values=[c[1] for c in self.db.obtener_cuentas()], state='readonly')
+        combo_cuenta = ttk.Combobox(frame, values=[c.nombre for c in self.db.obtener_cuentas()], state='readonly')
         if self.db.obtener_cuentas():
             combo_cuenta.set(self.db.obtener_cuentas()[0][1])
         combo_cuenta.pack(fill=tk.X, pady=3)
@@ -3369,16 +6129,18 @@ class GestorGastos:
             ).pack(pady=60)
             return
 
+        totales = self.db.obtener_totales_normalizados(self.mes_actual, 'ARS')
         for pres in presupuestos:
-            self.crear_widget_presupuesto(frame_lista, pres)
+            self.crear_widget_presupuesto(frame_lista, pres, totales)
 
-    def crear_widget_presupuesto(self, parent, pres):
+    def crear_widget_presupuesto(self, parent, pres, totales=None):
         """Crea widget para presupuesto"""
-        id_pres, categoria, mes, limite = pres
+        categoria, mes, limite = pres.categoria, pres.mes, pres.limite
 
-        # Calcular gasto actual
-        gastos = self.db.obtener_gastos(mes)
-        gasto_actual = sum(g[3] for g in gastos if g[2] == categoria and g[4] == 'ARS')
+        # Calcular gasto actual (en ARS, con los gastos en otras monedas convertidos)
+        if totales is None:
+            totales = self.db.obtener_totales_normalizados(mes, 'ARS')
+        gasto_actual = totales.get(categoria, Dinero(0))
 
         pct = (gasto_actual / limite * 100) if limite > 0 else 0
         color_barra = COLORES['success'] if pct < 80 else COLORES['warning'] if pct < 100 else COLORES['danger']
@@ -3446,7 +6208,7 @@ class GestorGastos:
         frame.pack(fill=tk.BOTH, expand=True)
 
         tk.Label(frame, text="📂 Categoría:", bg=COLORES['background']).pack(anchor='w', pady=3)
-        combo_cat = ttk.Combobox(frame, values=[c[1] for c in self.db.obtener_categorias()], state='readonly')
+        combo_cat = ttk.Combobox(frame, values=[c.nombre for c in self.db.obtener_categorias()], state='readonly')
         if self.db.obtener_categorias():
             combo_cat.set(self.db.obtener_categorias()[0][1])
         combo_cat.pack(fill=tk.X, pady=3)
@@ -3605,7 +6367,8 @@ class GestorGastos:
 
         hoy = datetime.date.today()
         for cuenta in cuentas:
-            id_c, nombre, cat, monto, moneda, dia_venc = cuenta[:6]
+            nombre, cat, monto = cuenta.nombre, cuenta.categoria, cuenta.monto
+            moneda, dia_venc = cuenta.moneda, cuenta.dia_vencimiento
 
             frame = tk.Frame(frame_lista, bg=COLORES['card_bg'], relief=tk.SOLID, bd=1, highlightbackground=COLORES['border'], highlightthickness=1)
             frame.pack(fill=tk.X, pady=5, padx=5)
@@ -3677,7 +6440,7 @@ class GestorGastos:
         entry_nombre.pack(fill=tk.X, pady=3)
 
         tk.Label(frame, text="📂 Categoría:", bg=COLORES['background']).pack(anchor='w', pady=3)
-        combo_cat = ttk.Combobox(frame, values=[c[1] for c in self.db.obtener_categorias()], state='readonly')
+        combo_cat = ttk.Combobox(frame, values=[c.nombre for c in self.db.obtener_categorias()], state='readonly')
         if self.db.obtener_categorias():
             combo_cat.set(self.db.obtener_categorias()[0][1])
         combo_cat.pack(fill=tk.X, pady=3)
@@ -3778,7 +6541,8 @@ class GestorGastos:
             return
 
         for deuda in deudas:
-            id_d, nombre, total, pagado, con_quien, tipo = deuda[:6]
+            nombre, total, pagado = deuda.nombre, deuda.monto_total, deuda.monto_pagado
+            con_quien, tipo = deuda.con_quien, deuda.tipo
 
             frame = tk.Frame(frame_lista, bg=COLORES['card_bg'], relief=tk.SOLID, bd=1, highlightbackground=COLORES['border'], highlightthickness=1)
             frame.pack(fill=tk.X, pady=5, padx=5)
@@ -3939,6 +6703,15 @@ class GestorGastos:
         canvas.create_window((0, 0), window=frame_lista, anchor="nw", width=1100)
         canvas.configure(yscrollcommand=scrollbar.set)
 
+        racha_actual, racha_maxima = self.db.obtener_rachas()
+        tk.Label(
+            self.frame_contenido,
+            text=f"🔥 Racha actual: {racha_actual} días seguidos  |  🏅 Mejor racha: {racha_maxima} días",
+            font=('Segoe UI', 10, 'bold'),
+            bg=COLORES['background'],
+            fg=COLORES['text']
+        ).pack(anchor='w', padx=20, pady=(0, 8))
+
         canvas.pack(side="left", fill="both", expand=True, padx=15)
         scrollbar.pack(side="right", fill="y")
 
@@ -4327,9 +7100,7 @@ class GestorGastos:
         canvas.pack(side="left", fill="both", expand=True, padx=15)
         scrollbar.pack(side="right", fill="y")
 
-        cursor = self.db.conn.cursor()
-        cursor.execute('SELECT * FROM reglas_geofence ORDER BY nombre')
-        zonas = cursor.fetchall()
+        zonas = self.db.obtener_reglas_geofence(solo_activas=False)
 
         if not zonas:
             tk.Label(
@@ -4484,12 +7255,12 @@ class GestorGastos:
         entry_radio.insert(0, "100")
 
         tk.Label(frame, text="📂 Categoría sugerida (opcional):", bg=COLORES['background']).pack(anchor='w', pady=3)
-        combo_cat = ttk.Combobox(frame, values=[c[1] for c in self.db.obtener_categorias()],
+        combo_cat = ttk.Combobox(frame, values=[c.nombre for c in self.db.obtener_categorias()],
                                  font=('Segoe UI', 11))
         combo_cat.pack(fill=tk.X, pady=3)
 
         tk.Label(frame, text="💳 Cuenta sugerida (opcional):", bg=COLORES['background']).pack(anchor='w', pady=3)
-        combo_cuenta = ttk.Combobox(frame, values=[c[1] for c in self.db.obtener_tarjetas()],
+        combo_cuenta = ttk.Combobox(frame, values=[c.nombre for c in self.db.obtener_tarjetas()],
                                     font=('Segoe UI', 11))
         combo_cuenta.pack(fill=tk.X, pady=3)
 
@@ -4556,7 +7327,7 @@ class GestorGastos:
         # Info card con total ahorrado
         cursor = self.db.conn.cursor()
         cursor.execute('SELECT SUM(monto_ahorrado_total) FROM reglas_ahorro_auto WHERE activa=1')
-        total_ahorrado = cursor.fetchone()[0] or 0
+        total_ahorrado = Dinero(cursor.fetchone()[0] or 0)
 
         frame_info = tk.Frame(frame_btn, bg=COLORES['info'], relief=tk.RAISED, bd=2)
         frame_info.pack(side=tk.RIGHT, padx=10)
@@ -4917,7 +7688,8 @@ class GestorGastos:
             return
 
         for susc in suscripciones:
-            id_s, nombre, cat, monto, moneda, freq, dia_cobro, fecha_inicio, prox_cobro, activa = susc[:10]
+            id_s, nombre, monto, moneda, freq = susc.id, susc.nombre, susc.monto, susc.moneda, susc.frecuencia
+            prox_cobro, activa = susc.fecha_proximo_cobro, susc.activa
 
             frame = tk.Frame(frame_lista, bg=COLORES['card_bg'], relief=tk.SOLID, bd=1, highlightbackground=COLORES['border'], highlightthickness=1)
             frame.pack(fill=tk.X, pady=5, padx=5)
@@ -5055,7 +7827,7 @@ class GestorGastos:
         entry_dia.pack(fill=tk.X, pady=3)
 
         tk.Label(frame, text="📂 Categoría (opcional):", bg=COLORES['background']).pack(anchor='w', pady=3)
-        combo_cat = ttk.Combobox(frame, values=[c[1] for c in self.db.obtener_categorias()],
+        combo_cat = ttk.Combobox(frame, values=[c.nombre for c in self.db.obtener_categorias()],
                                  font=('Segoe UI', 11))
         combo_cat.pack(fill=tk.X, pady=3)
 
@@ -5167,15 +7939,10 @@ class GestorGastos:
         ).pack(pady=10)
 
         # Obtener detalles del último cálculo
-        cursor = self.db.conn.cursor()
-        cursor.execute('''
-            SELECT ahorro_mensual, gasto_promedio, deudas_totales, racha_dias
-            FROM finscore_historico ORDER BY fecha DESC LIMIT 1
-        ''')
-        detalles = cursor.fetchone()
+        detalles = self.db.obtener_ultimo_finscore()
 
         if detalles:
-            ahorro, gasto, deudas, racha = detalles
+            ahorro, deudas, racha = detalles.ahorro_mensual, detalles.deudas_totales, detalles.racha_dias
 
             componentes = [
                 ("💰 Ahorro Mensual", f"${ahorro:,.0f}", "30% del score", COLORES['success']),
@@ -5217,6 +7984,36 @@ class GestorGastos:
                     pady=10
                 ).pack()
 
+        # Evolución de los últimos 90 días
+        historico = self.db.obtener_finscore_historico(dias=90)
+        if len(historico) > 1:
+            frame_tendencia = tk.Frame(self.frame_contenido, bg=COLORES['card_bg'], relief=tk.SOLID, bd=1,
+                                       highlightbackground=COLORES['border'], highlightthickness=1)
+            frame_tendencia.pack(fill=tk.X, padx=15, pady=10)
+
+            tk.Label(
+                frame_tendencia,
+                text="📈 Evolución del FinScore (90 días)",
+                font=('Segoe UI', 12, 'bold'),
+                bg=COLORES['card_bg']
+            ).pack(pady=(10, 0))
+
+            fig = Figure(figsize=(8, 2.6), facecolor=COLORES['card_bg'])
+            ax = fig.add_subplot(111)
+            fechas = [datetime.date.fromisoformat(f.fecha) for f in historico]
+            ax.plot(fechas, [f.puntuacion for f in historico], color=COLORES['primary'], linewidth=2)
+            ax.fill_between(fechas, [f.puntuacion for f in historico], color=COLORES['primary'], alpha=0.1)
+            ax.set_ylim(0, 1000)
+            ax.set_facecolor(COLORES['card_bg'])
+            ax.grid(True, alpha=0.3)
+            ax.tick_params(labelsize=8)
+            fig.autofmt_xdate()
+            fig.tight_layout()
+
+            canvas_tendencia = FigureCanvasTkAgg(fig, frame_tendencia)
+            canvas_tendencia.draw()
+            canvas_tendencia.get_tk_widget().pack(fill=tk.X, padx=10, pady=10)
+
         # Recomendaciones
         frame_recs = tk.Frame(self.frame_contenido, bg=COLORES['light'], relief=tk.RAISED, bd=2)
         frame_recs.pack(fill=tk.X, padx=15, pady=10)
@@ -5319,15 +8116,18 @@ class GestorGastos:
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+        # Balances y participantes de todos los grupos de una vez
+        balances_grupos = self.db.obtener_balances_grupos()
+        participantes_grupos = self.db.contar_participantes_grupos()
+
         for grupo in grupos:
-            grupo_id = grupo[0]
-            nombre = grupo[1]
-            descripcion = grupo[2]
-            icono = grupo[6] if len(grupo) > 6 else '👥'
+            grupo_id = grupo.id
+            nombre = grupo.nombre
+            descripcion = grupo.descripcion
+            icono = grupo.icono or '👥'
 
-            # Calcular balances del grupo
-            balances = self.db.calcular_balances_grupo(grupo_id)
-            participantes = self.db.obtener_participantes_grupo(grupo_id)
+            balances = balances_grupos.get(grupo_id, {})
+            cantidad_participantes = participantes_grupos.get(grupo_id, 0)
 
             # Tarjeta del grupo
             frame_grupo = tk.Frame(frame_grupos, bg=COLORES['card_bg'], relief=tk.SOLID, bd=1, highlightbackground=COLORES['border'], highlightthickness=1)
@@ -5347,7 +8147,7 @@ class GestorGastos:
 
             tk.Label(
                 frame_grupo_header,
-                text=f"{len(participantes)} personas",
+                text=f"{cantidad_participantes} personas",
                 font=('Segoe UI', 9),
                 bg=COLORES['secondary'],
                 fg='white'
@@ -5369,7 +8169,7 @@ class GestorGastos:
 
             if balances:
                 for participante, balance in balances.items():
-                    if abs(balance) > 0.01:  # Ignorar balances muy pequeños
+                    if balance:  # Importes exactos: 0 significa saldado
                         if balance > 0:
                             texto = f"💚 {participante}: le deben ${balance:,.2f}"
                             color = COLORES['success']
@@ -5652,8 +8452,8 @@ class GestorGastos:
                 ).pack(pady=20)
             else:
                 for p in participantes:
-                    nombre = p[2]
-                    email = p[3]
+                    nombre = p.nombre
+                    email = p.email
 
                     frame_p = tk.Frame(lista_container, bg=COLORES['card_bg'], relief=tk.RAISED, bd=1)
                     frame_p.pack(fill=tk.X, pady=3)
@@ -5725,7 +8525,7 @@ class GestorGastos:
             v.destroy()
             return
 
-        nombres_participantes = [p[2] for p in participantes]
+        nombres_participantes = [p.nombre for p in participantes]
 
         # Formulario con diseño moderno
         form_frame = tk.Frame(frame, bg=COLORES['card_bg'], relief=tk.FLAT, bd=1, highlightbackground=COLORES['border'], highlightthickness=1)
@@ -6053,11 +8853,11 @@ class GestorGastos:
             scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
             for gasto in gastos:
-                descripcion = gasto[2]
-                monto = gasto[3]
-                pagado_por = gasto[4]
-                fecha = gasto[5]
-                categoria = gasto[6] if gasto[6] else ''
+                descripcion = gasto.descripcion
+                monto = gasto.monto_total
+                pagado_por = gasto.pagado_por
+                fecha = gasto.fecha
+                categoria = gasto.categoria or ''
 
                 frame_g = tk.Frame(frame_gastos, bg=COLORES['card_bg'], relief=tk.SOLID, bd=1, highlightbackground=COLORES['border'], highlightthickness=1)
                 frame_g.pack(fill=tk.X, pady=5)
@@ -6192,11 +8992,11 @@ class GestorGastos:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         for presup in presupuestos:
-            presup_id = presup[0]
-            nombre = presup[1]
-            categoria = presup[2] if presup[2] else "General"
-            icono = presup[9] if len(presup) > 9 else '💰'
-            descripcion = presup[8] if len(presup) > 8 and presup[8] else ''
+            presup_id = presup.id
+            nombre = presup.nombre
+            categoria = presup.categoria or "General"
+            icono = presup.icono or '💰'
+            descripcion = presup.descripcion or ''
 
             # Calcular uso
             gastado, limite, porcentaje = self.db.calcular_uso_presupuesto_compartido(presup_id)
@@ -6340,7 +9140,7 @@ class GestorGastos:
         entry_nombre.pack(fill=tk.X, pady=3)
 
         tk.Label(frame, text="📂 Categoría (opcional):", bg=COLORES['background'], font=('Segoe UI', 10, 'bold')).pack(anchor='w', pady=3)
-        categorias = [c[1] for c in self.db.obtener_categorias()]
+        categorias = [c.nombre for c in self.db.obtener_categorias()]
         categorias.insert(0, "Todas las categorías")
         combo_categoria = ttk.Combobox(frame, values=categorias, state='readonly', font=('Segoe UI', 11))
         combo_categoria.set("Todas las categorías")
@@ -6552,9 +9352,9 @@ class GestorGastos:
                 ).pack(pady=20)
             else:
                 for p in participantes:
-                    nombre = p[2]
-                    email = p[3]
-                    rol = p[4]
+                    nombre = p.nombre
+                    email = p.email
+                    rol = p.rol
 
                     frame_p = tk.Frame(lista_container, bg=COLORES['card_bg'], relief=tk.RAISED, bd=1)
                     frame_p.pack(fill=tk.X, pady=3)
@@ -6621,7 +9421,7 @@ class GestorGastos:
 
         def marcar_todas_leidas():
             for notif in notifs_no_leidas:
-                self.db.marcar_notificacion_leida(notif[0])
+                self.db.marcar_notificacion_leida(notif.id)
             self.mostrar_buddy_notificaciones()
 
         if notifs_no_leidas:
@@ -6672,12 +9472,11 @@ class GestorGastos:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         for notif in notifs:
-            notif_id = notif[0]
-            tipo = notif[1]
-            titulo = notif[2]
-            mensaje = notif[3]
-            nivel = notif[6]
-            leida = notif[8]
+            notif_id = notif.id
+            titulo = notif.titulo
+            mensaje = notif.mensaje
+            nivel = notif.nivel
+            leida = notif.leida
 
             # Determinar color según nivel
             nivel_colors = {
@@ -6766,19 +9565,19 @@ class GestorGastos:
         # Obtener temas
         temas = self.db.obtener_temas_disponibles()
         tema_activo = self.db.obtener_tema_activo()
-        tema_activo_id = tema_activo[0] if tema_activo else None
+        tema_activo_id = tema_activo.id if tema_activo else None
 
         # Grid de temas
         frame_temas = tk.Frame(self.frame_contenido, bg=COLORES['background'])
         frame_temas.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
 
         for i, tema in enumerate(temas):
-            tema_id = tema[0]
-            nombre = tema[1]
-            primary = tema[2]
-            success = tema[4]
-            danger = tema[5]
-            bg_color = tema[8]
+            tema_id = tema.id
+            nombre = tema.nombre
+            primary = tema.primary_color
+            success = tema.success_color
+            danger = tema.danger_color
+            bg_color = tema.background_color
 
             # Tarjeta del tema
             frame_tema = tk.Frame(
@@ -6904,7 +9703,7 @@ class GestorGastos:
         entry_monto.pack(side=tk.LEFT, padx=5)
         entry_monto.insert(0, "100")
         
-        monedas = ['USD', 'EUR', 'GBP', 'ARS', 'BRL', 'CLP', 'MXN', 'UYU']
+        monedas = list(MONEDAS_CONVERSION)
         combo_de = ttk.Combobox(frame_de, values=monedas, state='readonly', width=10)
         combo_de.set('USD')
         combo_de.pack(side=tk.LEFT, padx=5)
@@ -6943,7 +9742,10 @@ class GestorGastos:
                 de = combo_de.get()
                 a = combo_a.get()
                 
-                tasas = obtener_tasas_conversion()
+                tasas = self.cotizador.tasas()  # caché: teclear no sale a la red
+                if de not in tasas or a not in tasas:
+                    lbl_tasa.config(text="Sin tasas disponibles todavía (sin conexión)")
+                    return
                 
                 # Convertir a USD primero, luego a moneda destino
                 monto_usd = monto / tasas[de]
@@ -6952,7 +9754,7 @@ class GestorGastos:
                 lbl_resultado.config(text=f"{resultado:,.2f}")
                 
                 tasa = tasas[a] / tasas[de]
-                lbl_tasa.config(text=f"1 {de} = {tasa:.4f} {a}")
+                lbl_tasa.config(text=f"1 {de} = {tasa:.4f} {a}  (tasas del {self.cotizador.fecha_hora('exchangerate')})")
                 
             except Exception as e:
                 messagebox.showerror("Error", f"Error en conversión: {e}")
@@ -7122,7 +9924,7 @@ class GestorGastos:
             texto = entry_texto.get()
 
             if texto.strip():
-                categorias = [c[1] for c in self.db.obtener_categorias()]
+                categorias = [c.nombre for c in self.db.obtener_categorias()]
                 datos_parseados = parsear_gasto_texto(texto, categorias)
 
                 lbl_monto.config(text=f"💰 Monto: ${datos_parseados['monto']:,.0f}")
@@ -7155,9 +9957,9 @@ class GestorGastos:
             try:
                 fecha = datetime.date.today().isoformat()
                 cuentas = self.db.obtener_cuentas()
-                cuenta = cuentas[0][1] if cuentas else '💵 Efectivo'
+                cuenta = cuentas[0].nombre if cuentas else '💵 Efectivo'
 
-                self.db.agregar_gasto(
+                gasto_id = self.db.agregar_gasto(
                     fecha,
                     datos_parseados['categoria'],
                     datos_parseados['monto'],
@@ -7172,8 +9974,7 @@ class GestorGastos:
                 messagebox.showinfo("Éxito", "✅ Gasto registrado con éxito!")
                 v.destroy()
 
-                if self.vista_actual == 'gastos':
-                    self.cargar_gastos()
+                self.insertar_gasto_en_lista(gasto_id)
 
             except Exception as e:
                 messagebox.showerror("Error", f"Error al guardar: {e}")
@@ -7333,7 +10134,7 @@ class GestorGastos:
 
         cat_buttons = {}
         for i, cat in enumerate(categorias):
-            id_cat, nombre_cat, icono = cat[:3]
+            nombre_cat, icono = cat.nombre, cat.icono
 
             def seleccionar_cat(nombre=nombre_cat, icono_cat=icono):
                 categoria_seleccionada.set(nombre)
@@ -7359,8 +10160,8 @@ class GestorGastos:
 
         # Seleccionar primera categoría por defecto
         if categorias:
-            categoria_seleccionada.set(categorias[0][1])
-            cat_buttons[categorias[0][1]].config(relief=tk.SUNKEN, bg=COLORES['primary'])
+            categoria_seleccionada.set(categorias[0].nombre)
+            cat_buttons[categorias[0].nombre].config(relief=tk.SUNKEN, bg=COLORES['primary'])
 
         # Botón de guardar grande
         def guardar_rapido():
@@ -7379,19 +10180,18 @@ class GestorGastos:
 
                 if es_gasto.get():
                     # Es un gasto
-                    self.db.agregar_gasto(fecha, cat, monto, 'ARS', '', 'Efectivo', '')
+                    gasto_id = self.db.agregar_gasto(fecha, cat, monto, 'ARS', '', 'Efectivo', '')
                 else:
                     # Es un ingreso (monto negativo)
-                    self.db.agregar_gasto(fecha, cat, -monto, 'ARS', 'Ingreso', 'Efectivo', '')
+                    gasto_id = self.db.agregar_gasto(fecha, cat, -monto, 'ARS', 'Ingreso', 'Efectivo', '')
 
                 messagebox.showinfo("✅ Listo", f"{'Gasto' if es_gasto.get() else 'Ingreso'} guardado: ${monto:,.0f}")
                 v.destroy()
 
-                if self.vista_actual == 'gastos' or self.vista_actual == 'dashboard':
-                    if self.vista_actual == 'gastos':
-                        self.cargar_gastos()
-                    else:
-                        self.mostrar_dashboard()
+                if self.vista_actual == 'gastos':
+                    self.insertar_gasto_en_lista(gasto_id)
+                elif self.vista_actual == 'dashboard':
+                    self.mostrar_dashboard()
 
             except ValueError:
                 messagebox.showerror("Error", "Monto inválido")
@@ -7411,34 +10211,35 @@ class GestorGastos:
     def ventana_agregar_gasto(self):
         v = tk.Toplevel(self.root)
         v.title("➕ Agregar Gasto")
-        v.geometry("450x550")
+        v.geometry("450x610")
         v.configure(bg=COLORES['background'])
         v.transient(self.root)
         v.grab_set()
         
         v.update_idletasks()
         x = (v.winfo_screenwidth() // 2) - (450 // 2)
-        y = (v.winfo_screenheight() // 2) - (550 // 2)
-        v.geometry(f'450x550+{x}+{y}')
+        y = (v.winfo_screenheight() // 2) - (610 // 2)
+        v.geometry(f'450x610+{x}+{y}')
         
         frame = tk.Frame(v, bg=COLORES['background'], padx=20, pady=20)
         frame.pack(fill=tk.BOTH, expand=True)
         
         campos = [
             ("📅 Fecha:", tk.Entry(frame)),
-            ("📂 Categoría:", ttk.Combobox(frame, values=[c[1] for c in self.db.obtener_categorias()], state='readonly')),
+            ("📂 Categoría:", ttk.Combobox(frame, values=[c.nombre for c in self.db.obtener_categorias()], state='readonly')),
             ("💰 Monto:", tk.Entry(frame)),
             ("💱 Moneda:", ttk.Combobox(frame, values=['ARS', 'USD'], state='readonly')),
             ("📝 Descripción:", tk.Entry(frame)),
-            ("🏦 Cuenta:", ttk.Combobox(frame, values=[c[1] for c in self.db.obtener_cuentas()], state='readonly')),
+            ("🏦 Cuenta:", ttk.Combobox(frame, values=[c.nombre for c in self.db.obtener_cuentas()], state='readonly')),
+            ("🏷️ Tags (separados por coma):", tk.Entry(frame)),
         ]
         
         campos[0][1].insert(0, datetime.date.today().isoformat())
         if self.db.obtener_categorias():
-            campos[1][1].set(self.db.obtener_categorias()[0][1])
+            campos[1][1].set(self.db.obtener_categorias()[0].nombre)
         campos[3][1].set('ARS')
         if self.db.obtener_cuentas():
-            campos[5][1].set(self.db.obtener_cuentas()[0][1])
+            campos[5][1].set(self.db.obtener_cuentas()[0].nombre)
         
         for label, widget in campos:
             tk.Label(frame, text=label, font=('Segoe UI', 9), bg=COLORES['background']).pack(anchor='w', pady=3)
@@ -7457,16 +10258,31 @@ class GestorGastos:
                 descripcion = campos[4][1].get()
                 cuenta = campos[5][1].get()
                 notas = entry_notas.get('1.0', tk.END).strip()
+                tags = [t.strip() for t in campos[6][1].get().split(',') if t.strip()]
                 
                 if not categoria or monto <= 0:
                     messagebox.showwarning("Error", "Datos inválidos")
                     return
                 
-                self.db.agregar_gasto(fecha, categoria, monto, moneda, descripcion, cuenta, notas)
+                # Ubicación actual "lat,lon" si la geolocalización está activa
+                ubicacion = None
+                if self.db.obtener_config('geolocation_activa') == 'true':
+                    try:
+                        lat, lon = (float(x) for x in (self.db.obtener_config('ubicacion_actual') or '').split(','))
+                        ubicacion = (lat, lon)
+                    except ValueError:
+                        pass
+                
+                # Gasto, tags y ubicación en un solo commit
+                with self.db.transaccion():
+                    gasto_id = self.db.agregar_gasto(fecha, categoria, monto, moneda, descripcion, cuenta, notas)
+                    for tag in tags:
+                        self.db.agregar_tag(gasto_id, tag)
+                    if ubicacion:
+                        self.db.agregar_ubicacion_gasto(gasto_id, *ubicacion)
                 messagebox.showinfo("Éxito", "✅ Gasto agregado")
                 v.destroy()
-                if self.vista_actual == 'gastos':
-                    self.cargar_gastos()
+                self.insertar_gasto_en_lista(gasto_id)
             except ValueError:
                 messagebox.showerror("Error", "Monto inválido")
         
@@ -7578,7 +10394,7 @@ class GestorGastos:
         entry_sueldo = tk.Entry(frame)
         sueldo_actual = self.db.obtener_sueldo_mes(self.mes_actual)
         if sueldo_actual:
-            entry_sueldo.insert(0, str(sueldo_actual[2]))
+            entry_sueldo.insert(0, str(sueldo_actual.monto))
         entry_sueldo.pack(fill=tk.X, pady=3)
         
         tk.Label(frame, text="🎁 Bonos:", bg=COLORES['background']).pack(anchor='w', pady=3)
@@ -7660,8 +10476,8 @@ class GestorGastos:
                 return
             
             for cat in cats:
-                id_cat, nombre, color = cat[:3]
-                icono = cat[3] if len(cat) > 3 else '❓'
+                id_cat, nombre, color = cat.id, cat.nombre, cat.color
+                icono = cat.icono or '❓'
                 
                 f = tk.Frame(frame_lista, bg=COLORES['card_bg'], relief=tk.RAISED, bd=1)
                 f.pack(fill=tk.X, pady=4, padx=4)
@@ -7790,8 +10606,7 @@ class GestorGastos:
 
     def exportar_csv(self):
         try:
-            gastos = self.db.obtener_gastos()
-            if not gastos:
+            if not self.db.pagina_gastos(limite=1):
                 messagebox.showwarning("Sin datos", "No hay gastos para exportar")
                 return
             
@@ -7804,21 +10619,106 @@ class GestorGastos:
             if archivo:
                 with open(archivo, 'w', encoding='utf-8-sig') as f:
                     f.write("Fecha,Categoría,Monto,Moneda,Descripción,Cuenta\n")
-                    for g in gastos:
-                        f.write(f"{g[1]},{g[2]},{g[3]},{g[4]},{g[5] or ''},{g[6]}\n")
+                    for g in self.db.iterar_gastos():
+                        f.write(f"{g.fecha},{g.categoria},{g.monto},{g.moneda},{g.descripcion or ''},{g.cuenta}\n")
                 
                 messagebox.showinfo("Éxito", f"✅ Exportado:\n{archivo}")
         except Exception as e:
             messagebox.showerror("Error", f"Error: {e}")
 
     def hacer_backup(self):
-        try:
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            archivo = RUTA_BACKUPS / f"backup_{timestamp}.db"
-            shutil.copy2(RUTA_DB, archivo)
-            messagebox.showinfo("Backup", f"✅ Backup creado:\n{archivo}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error: {e}")
+        """Instantánea en línea en el almacén de backups (en segundo plano), con una ventana de progreso"""
+        if self.backups.en_curso():
+            messagebox.showinfo("Backup", "Ya hay un backup en curso")
+            return
+
+        v = tk.Toplevel(self.root)
+        v.title("💾 Backup")
+        v.geometry("360x110")
+        v.configure(bg=COLORES['background'])
+        v.transient(self.root)
+        v.resizable(False, False)
+
+        tk.Label(v, text="Copiando la base de datos...", font=('Segoe UI', 10),
+                 bg=COLORES['background']).pack(pady=(20, 10))
+        barra = ttk.Progressbar(v, length=300, mode='determinate', maximum=1)
+        barra.pack()
+
+        def terminar(instantanea, error):
+            if v.winfo_exists():
+                v.destroy()
+            if error:
+                messagebox.showerror("Error", f"Error: {error}")
+            else:
+                messagebox.showinfo("Backup", f"✅ Backup creado y verificado:\n"
+                                              f"{instantanea.fecha:%d/%m/%Y %H:%M} (ver Restaurar backup)")
+
+        def al_progresar(copiadas, total):
+            self.despachar_ui(barra.config, {'value': copiadas, 'maximum': total},
+                              clave='backup_progreso', widget=barra)
+
+        def tarea():
+            # Mismo almacén y retención que el backup automático al cerrar
+            instantanea = self.almacen_backups.guardar(al_progresar=al_progresar)
+            self.almacen_backups.aplicar_retencion(**RETENCION_BACKUPS)
+            return instantanea
+
+        self.backups.iniciar(tarea, al_terminar=lambda instantanea, error: self.despachar_ui(terminar, instantanea, error))
+
+    def ventana_restaurar_backup(self):
+        """Lista las instantáneas del almacén de backups y restaura la elegida en un archivo"""
+        instantaneas = self.almacen_backups.instantaneas()[::-1]
+        if not instantaneas:
+            messagebox.showinfo("Backup", "Todavía no hay backups guardados")
+            return
+
+        v = tk.Toplevel(self.root)
+        v.title("♻️ Restaurar backup")
+        v.geometry("420x380")
+        v.configure(bg=COLORES['background'])
+        v.transient(self.root)
+
+        frame = tk.Frame(v, bg=COLORES['background'], padx=20, pady=20)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        tk.Label(frame, text="♻️ Backups guardados", font=('Segoe UI', 14, 'bold'),
+                 bg=COLORES['background']).pack(pady=(0, 10))
+
+        tree = ttk.Treeview(frame, columns=('Fecha', 'Tamaño'), show='headings', height=10)
+        tree.heading('Fecha', text='Fecha')
+        tree.heading('Tamaño', text='Tamaño')
+        tree.column('Fecha', width=200)
+        tree.column('Tamaño', width=120, anchor='e')
+        for instantanea in instantaneas:
+            tree.insert('', tk.END, iid=instantanea.nombre, values=(
+                instantanea.fecha.strftime('%d/%m/%Y %H:%M'), f"{instantanea.tamano / 2 ** 20:.1f} MB"))
+        tree.selection_set(instantaneas[0].nombre)
+        tree.pack(fill=tk.BOTH, expand=True)
+
+        def terminar(destino, error):
+            if error:
+                messagebox.showerror("Error", f"Error: {error}")
+            else:
+                messagebox.showinfo("Backup", f"✅ Backup restaurado en:\n{destino}")
+
+        def restaurar():
+            seleccion = tree.selection()
+            if not seleccion:
+                return
+            nombre = seleccion[0]
+            archivo = filedialog.asksaveasfilename(
+                parent=v,
+                defaultextension=".db",
+                filetypes=[("SQLite", "*.db")],
+                initialfile=f"gastos_{nombre}.db"
+            )
+            if not archivo:
+                return
+            if not self.backups.iniciar(lambda: self.almacen_backups.restaurar(nombre, archivo),
+                                        al_terminar=lambda destino, error: self.despachar_ui(terminar, destino, error)):
+                messagebox.showinfo("Backup", "Ya hay un backup en curso")
+
+        crear_boton_moderno(frame, "💾 Restaurar en...", restaurar).pack(fill=tk.X, pady=(15, 0))
 
     def mostrar_ayuda(self):
         """Sección de ayuda con explicaciones detalladas y ejemplos"""
@@ -8186,20 +11086,48 @@ class GestorGastos:
 
     def al_cerrar(self):
         if messagebox.askyesno("Salir", "¿Cerrar la aplicación?"):
-            try:
-                timestamp = datetime.datetime.now().strftime("%Y%m%d")
-                archivo = RUTA_BACKUPS / f"auto_{timestamp}.db"
-                if not archivo.exists():
-                    shutil.copy2(RUTA_DB, archivo)
-            except:
-                pass
-            
-            self.db.cerrar()
-            self.root.destroy()
+            # La ventana se oculta enseguida; la app termina cuando no queda un backup copiándose
+            self.root.withdraw()
+            self.cotizador.parar()
+            self.cerrar_tras_backup()
+
+    # Cada cuánto se revisa si terminó el backup pendiente al cerrar
+    INTERVALO_CIERRE_MS = 100
+
+    def cerrar_tras_backup(self, backup_pendiente=True):
+        """Guarda la instantánea del día en el almacén si falta (en segundo plano) y después cierra"""
+        if self.backups.en_curso():
+            self.root.after(self.INTERVALO_CIERRE_MS, self.cerrar_tras_backup, backup_pendiente)
+            return
+
+        if backup_pendiente and not self.almacen_backups.hay_instantanea(datetime.date.today()):
+            def tarea():
+                self.almacen_backups.guardar()
+                self.almacen_backups.aplicar_retencion(**RETENCION_BACKUPS)
+
+            def al_terminar(resultado, error):
+                if error:
+                    print(f"⚠️ Error en el backup automático: {error}")
+            self.backups.iniciar(tarea, al_terminar=al_terminar)
+            self.root.after(self.INTERVALO_CIERRE_MS, self.cerrar_tras_backup, False)
+            return
+
+        self.db.cerrar()
+        self.root.destroy()
 
 
 # === PUNTO DE ENTRADA ===
 if __name__ == "__main__":
+    if '--benchmark-liquidacion' in sys.argv:
+        benchmark_liquidacion()
+        sys.exit(0)
+    if '--benchmark-db' in sys.argv:
+        benchmark_conexion()
+        sys.exit(0)
+    if '--benchmark-backups' in sys.argv:
+        benchmark_backups()
+        sys.exit(0)
+
     print("=" * 50)
     print("💰 GESTOR DE GASTOS PERSONAL v3.1")
     print("=" * 50)
@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def base_temporal(tmp_path, monkeypatch):
+    """Apunta RUTA_DB y RUTA_BACKUPS a un directorio temporal (la base aún no existe)"""
+    monkeypatch.setattr(main, 'RUTA_DB', tmp_path / 'gastos.db')
+    monkeypatch.setattr(main, 'RUTA_BACKUPS', tmp_path / 'backups')
+    main.RUTA_BACKUPS.mkdir()
+    return main.RUTA_DB
+
+
+@pytest.fixture
+def db(base_temporal):
+    """Database recién creada sobre una base temporal"""
+    db = main.Database()
+    yield db
+    db.cerrar()
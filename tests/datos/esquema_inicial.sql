@@ -0,0 +1,360 @@
+BEGIN TRANSACTION;
+CREATE TABLE alertas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL,
+                mensaje TEXT NOT NULL,
+                fecha TEXT NOT NULL,
+                leida INTEGER DEFAULT 0,
+                nivel TEXT DEFAULT 'info'
+            );
+INSERT INTO "alertas" VALUES(1,'vencimiento','Vence la tarjeta','2025-01-05',0,'warning');
+INSERT INTO "alertas" VALUES(2,'vencimiento','Vence la tarjeta','2025-01-05',0,'warning');
+INSERT INTO "alertas" VALUES(3,'vencimiento','Vence la tarjeta','2025-02-05',0,'warning');
+CREATE TABLE alertas_configuracion (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo_alerta TEXT NOT NULL,
+                categoria TEXT,
+                umbral_porcentaje INTEGER DEFAULT 80,
+                activa INTEGER DEFAULT 1,
+                frecuencia TEXT DEFAULT 'inmediata',
+                ultima_notificacion TEXT,
+                parametros TEXT
+            );
+INSERT INTO "alertas_configuracion" VALUES(1,'presupuesto_porcentaje',NULL,80,1,'inmediata',NULL,NULL);
+INSERT INTO "alertas_configuracion" VALUES(2,'presupuesto_porcentaje',NULL,90,1,'inmediata',NULL,NULL);
+INSERT INTO "alertas_configuracion" VALUES(3,'presupuesto_porcentaje',NULL,100,1,'inmediata',NULL,NULL);
+CREATE TABLE categorias (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT UNIQUE NOT NULL,
+                color TEXT NOT NULL,
+                icono TEXT DEFAULT '❓',
+                categoria_padre TEXT DEFAULT NULL
+            );
+INSERT INTO "categorias" VALUES(1,'🍕 Comida','#ff6b6b','❓',NULL);
+INSERT INTO "categorias" VALUES(2,'🚗 Transporte','#4ecdc4','❓',NULL);
+INSERT INTO "categorias" VALUES(3,'🏠 Hogar','#45b7d1','❓',NULL);
+INSERT INTO "categorias" VALUES(4,'🛒 Supermercado','#96ceb4','❓',NULL);
+INSERT INTO "categorias" VALUES(5,'💊 Salud','#ff8c94','❓',NULL);
+INSERT INTO "categorias" VALUES(6,'🎮 Entretenimiento','#a29bfe','❓',NULL);
+INSERT INTO "categorias" VALUES(7,'👕 Ropa','#fd79a8','❓',NULL);
+INSERT INTO "categorias" VALUES(8,'📱 Tecnología','#6c5ce7','❓',NULL);
+INSERT INTO "categorias" VALUES(9,'❓ Otros','#95a5a6','❓',NULL);
+INSERT INTO "categorias" VALUES(10,'🐶 Mascotas','#aabbcc','🐶',NULL);
+CREATE TABLE configuracion (
+                clave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL
+            );
+INSERT INTO "configuracion" VALUES('gamificacion_activa','true');
+INSERT INTO "configuracion" VALUES('alertas_activas','true');
+INSERT INTO "configuracion" VALUES('geolocation_activa','false');
+INSERT INTO "configuracion" VALUES('reglas_contexto_activas','true');
+INSERT INTO "configuracion" VALUES('ubicacion_actual','');
+CREATE TABLE cuentas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT UNIQUE NOT NULL,
+                tipo TEXT DEFAULT 'ARS'
+            );
+INSERT INTO "cuentas" VALUES(1,'💵 Efectivo','ARS');
+INSERT INTO "cuentas" VALUES(2,'💳 Débito','ARS');
+INSERT INTO "cuentas" VALUES(3,'💳 Crédito','ARS');
+INSERT INTO "cuentas" VALUES(4,'📱 MercadoPago','ARS');
+INSERT INTO "cuentas" VALUES(5,'🏦 Cuenta Ahorro','ARS');
+CREATE TABLE cuentas_por_pagar (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                monto REAL NOT NULL,
+                moneda TEXT DEFAULT 'ARS',
+                dia_vencimiento INTEGER NOT NULL,
+                activa INTEGER DEFAULT 1,
+                ultima_alerta TEXT,
+                notas TEXT
+            );
+CREATE TABLE deudas_compartidas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                monto_total REAL NOT NULL,
+                monto_pagado REAL DEFAULT 0,
+                con_quien TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                fecha_creacion TEXT NOT NULL,
+                fecha_vencimiento TEXT,
+                saldada INTEGER DEFAULT 0,
+                notas TEXT
+            );
+INSERT INTO "deudas_compartidas" VALUES(1,'Préstamo',10000.5,0.0,'Ana','debo','2026-10-18',NULL,0,'');
+CREATE TABLE divisiones_splitwise (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                gasto_id INTEGER NOT NULL,
+                participante TEXT NOT NULL,
+                monto_debe REAL NOT NULL,
+                pagado INTEGER DEFAULT 0,
+                fecha_pago TEXT,
+                FOREIGN KEY (gasto_id) REFERENCES gastos_splitwise(id)
+            );
+CREATE TABLE finscore_historico (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TEXT NOT NULL,
+                puntuacion INTEGER NOT NULL,
+                ahorro_mensual REAL,
+                gasto_promedio REAL,
+                deudas_totales REAL,
+                cumplimiento_presupuestos REAL,
+                racha_dias INTEGER DEFAULT 0
+            );
+CREATE TABLE gastos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                monto REAL NOT NULL,
+                moneda TEXT DEFAULT 'ARS',
+                descripcion TEXT,
+                cuenta TEXT NOT NULL,
+                notas TEXT
+            );
+INSERT INTO "gastos" VALUES(1,'2025-01-03','🍕 Comida',1235.56,'ARS','super','💵 Efectivo','');
+INSERT INTO "gastos" VALUES(2,'2025-01-15','🍕 Comida',1235.56,'ARS','super','💵 Efectivo','');
+INSERT INTO "gastos" VALUES(3,'2025-02-03','🍕 Comida',1236.56,'ARS','super','💵 Efectivo','');
+INSERT INTO "gastos" VALUES(4,'2025-02-15','🍕 Comida',1236.56,'ARS','super','💵 Efectivo','');
+INSERT INTO "gastos" VALUES(5,'2025-03-03','🍕 Comida',1237.56,'ARS','super','💵 Efectivo','');
+INSERT INTO "gastos" VALUES(6,'2025-03-15','🍕 Comida',1237.56,'ARS','super','💵 Efectivo','');
+INSERT INTO "gastos" VALUES(7,'2025-03-20','🐶 Mascotas',99.99,'USD','veterinaria','💵 Efectivo','');
+CREATE TABLE gastos_splitwise (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                grupo_id INTEGER NOT NULL,
+                descripcion TEXT NOT NULL,
+                monto_total REAL NOT NULL,
+                moneda TEXT DEFAULT 'ARS',
+                pagado_por TEXT NOT NULL,
+                fecha TEXT NOT NULL,
+                categoria TEXT,
+                metodo_division TEXT DEFAULT 'equitativa',
+                notas TEXT,
+                FOREIGN KEY (grupo_id) REFERENCES grupos_splitwise(id)
+            );
+CREATE TABLE grupos_splitwise (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                descripcion TEXT,
+                tipo TEXT DEFAULT 'general',
+                fecha_creacion TEXT NOT NULL,
+                activo INTEGER DEFAULT 1,
+                icono TEXT DEFAULT '👥'
+            );
+CREATE TABLE logros (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT UNIQUE NOT NULL,
+                descripcion TEXT NOT NULL,
+                icono TEXT NOT NULL,
+                desbloqueado INTEGER DEFAULT 0,
+                fecha_desbloqueo TEXT,
+                progreso_actual INTEGER DEFAULT 0,
+                progreso_objetivo INTEGER NOT NULL
+            );
+INSERT INTO "logros" VALUES(1,'🎯 Primer Paso','Registrá tu primer gasto','🎯',0,NULL,0,1);
+INSERT INTO "logros" VALUES(2,'📊 Organizador','Registrá 10 gastos','📊',0,NULL,0,10);
+INSERT INTO "logros" VALUES(3,'💪 Constante','Registrá gastos por 7 días seguidos','💪',0,NULL,0,7);
+INSERT INTO "logros" VALUES(4,'🍕 Sin Delivery','Pasá 7 días sin gastar en delivery','🍕',0,NULL,0,7);
+INSERT INTO "logros" VALUES(5,'💰 Ahorrador','Ahorrá el 20% de tus ingresos','💰',0,NULL,0,20);
+INSERT INTO "logros" VALUES(6,'📈 Analista','Consultá el dashboard 30 veces','📈',0,NULL,0,30);
+INSERT INTO "logros" VALUES(7,'🎮 Maestro','Desbloqueá 5 logros','🎮',0,NULL,0,5);
+INSERT INTO "logros" VALUES(8,'⭐ Leyenda','Desbloqueá todos los logros','⭐',0,NULL,0,10);
+CREATE TABLE metas_ahorro (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                monto_objetivo REAL NOT NULL,
+                monto_actual REAL DEFAULT 0,
+                fecha_inicio TEXT NOT NULL,
+                fecha_objetivo TEXT NOT NULL,
+                moneda TEXT DEFAULT 'ARS',
+                icono TEXT DEFAULT '🎯',
+                completada INTEGER DEFAULT 0
+            );
+CREATE TABLE notificaciones_buddy (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL,
+                titulo TEXT NOT NULL,
+                mensaje TEXT NOT NULL,
+                categoria TEXT,
+                presupuesto_id INTEGER,
+                nivel TEXT DEFAULT 'info',
+                fecha TEXT NOT NULL,
+                leida INTEGER DEFAULT 0,
+                accion_requerida INTEGER DEFAULT 0,
+                FOREIGN KEY (presupuesto_id) REFERENCES presupuestos_compartidos(id)
+            );
+CREATE TABLE pagos_splitwise (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                grupo_id INTEGER NOT NULL,
+                de_quien TEXT NOT NULL,
+                para_quien TEXT NOT NULL,
+                monto REAL NOT NULL,
+                moneda TEXT DEFAULT 'ARS',
+                fecha TEXT NOT NULL,
+                notas TEXT,
+                FOREIGN KEY (grupo_id) REFERENCES grupos_splitwise(id)
+            );
+CREATE TABLE participantes_presupuesto (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                presupuesto_id INTEGER NOT NULL,
+                nombre TEXT NOT NULL,
+                email TEXT,
+                rol TEXT DEFAULT 'viewer',
+                fecha_agregado TEXT NOT NULL,
+                activo INTEGER DEFAULT 1,
+                FOREIGN KEY (presupuesto_id) REFERENCES presupuestos_compartidos(id)
+            );
+CREATE TABLE participantes_splitwise (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                grupo_id INTEGER NOT NULL,
+                nombre TEXT NOT NULL,
+                email TEXT,
+                FOREIGN KEY (grupo_id) REFERENCES grupos_splitwise(id)
+            );
+CREATE TABLE presupuestos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                categoria TEXT NOT NULL,
+                mes TEXT NOT NULL,
+                limite REAL NOT NULL,
+                UNIQUE(categoria, mes)
+            );
+INSERT INTO "presupuestos" VALUES(1,'🍕 Comida','2025-03',5000.0);
+CREATE TABLE presupuestos_compartidos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                categoria TEXT,
+                limite REAL NOT NULL,
+                mes TEXT NOT NULL,
+                moneda TEXT DEFAULT 'ARS',
+                compartido INTEGER DEFAULT 0,
+                creado_por TEXT NOT NULL,
+                fecha_creacion TEXT NOT NULL,
+                descripcion TEXT,
+                icono TEXT DEFAULT '💰'
+            );
+CREATE TABLE reglas_ahorro_auto (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                tipo_regla TEXT NOT NULL,
+                activa INTEGER DEFAULT 1,
+                modo_agresividad TEXT DEFAULT 'moderado',
+                meta_destino_id INTEGER,
+                ultima_ejecucion TEXT,
+                monto_ahorrado_total REAL DEFAULT 0,
+                configuracion TEXT,
+                FOREIGN KEY (meta_destino_id) REFERENCES metas_ahorro(id)
+            );
+CREATE TABLE reglas_contexto (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                tipo_trigger TEXT NOT NULL,
+                condicion TEXT NOT NULL,
+                accion TEXT NOT NULL,
+                parametros TEXT,
+                activa INTEGER DEFAULT 1,
+                ultima_ejecucion TEXT
+            );
+CREATE TABLE reglas_geofence (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                latitud REAL NOT NULL,
+                longitud REAL NOT NULL,
+                radio_metros INTEGER NOT NULL,
+                categoria_sugerida TEXT,
+                cuenta_sugerida TEXT,
+                activa INTEGER DEFAULT 1
+            );
+INSERT INTO "reglas_geofence" VALUES(1,'Super',-34.6,-58.4,300,'🍕 Comida','💵 Efectivo',1);
+CREATE TABLE sueldos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mes TEXT UNIQUE NOT NULL,
+                monto REAL NOT NULL,
+                bonos REAL DEFAULT 0
+            );
+CREATE TABLE suscripciones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                categoria TEXT,
+                monto REAL NOT NULL,
+                moneda TEXT DEFAULT 'ARS',
+                frecuencia TEXT NOT NULL,
+                dia_cobro INTEGER,
+                fecha_inicio TEXT NOT NULL,
+                fecha_proximo_cobro TEXT,
+                activa INTEGER DEFAULT 1,
+                recordatorio_dias_antes INTEGER DEFAULT 3,
+                proveedor TEXT,
+                notas TEXT
+            );
+CREATE TABLE tags (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                gasto_id INTEGER NOT NULL,
+                tag TEXT NOT NULL,
+                FOREIGN KEY (gasto_id) REFERENCES gastos(id)
+            );
+CREATE TABLE tarjetas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT UNIQUE NOT NULL,
+                banco TEXT,
+                limite REAL NOT NULL,
+                dia_cierre INTEGER NOT NULL,
+                dia_vencimiento INTEGER NOT NULL,
+                activa INTEGER DEFAULT 1,
+                color TEXT DEFAULT '#4a90e2'
+            );
+CREATE TABLE temas_colores (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT UNIQUE NOT NULL,
+                primary_color TEXT NOT NULL,
+                secondary_color TEXT NOT NULL,
+                success_color TEXT NOT NULL,
+                danger_color TEXT NOT NULL,
+                warning_color TEXT NOT NULL,
+                info_color TEXT NOT NULL,
+                background_color TEXT NOT NULL,
+                card_bg_color TEXT NOT NULL,
+                activo INTEGER DEFAULT 0
+            );
+INSERT INTO "temas_colores" VALUES(1,'Default','#2563eb','#64748b','#10b981','#ef4444','#f59e0b','#3b82f6','#f8f9fa','#ffffff',1);
+INSERT INTO "temas_colores" VALUES(2,'Dark','#3b82f6','#475569','#22c55e','#f87171','#fb923c','#60a5fa','#1e293b','#0f172a',0);
+INSERT INTO "temas_colores" VALUES(3,'Ocean','#0891b2','#0e7490','#14b8a6','#f43f5e','#f97316','#06b6d4','#ecfeff','#cffafe',0);
+INSERT INTO "temas_colores" VALUES(4,'Forest','#16a34a','#15803d','#22c55e','#dc2626','#ea580c','#4ade80','#f0fdf4','#dcfce7',0);
+INSERT INTO "temas_colores" VALUES(5,'Sunset','#dc2626','#b91c1c','#f97316','#ef4444','#facc15','#fb923c','#fff7ed','#fed7aa',0);
+INSERT INTO "temas_colores" VALUES(6,'Purple','#9333ea','#7c3aed','#a78bfa','#f43f5e','#fb7185','#c084fc','#faf5ff','#f3e8ff',0);
+INSERT INTO "temas_colores" VALUES(7,'Minimal','#000000','#52525b','#059669','#dc2626','#d97706','#0284c7','#ffffff','#f5f5f5',0);
+CREATE TABLE transacciones_recurrentes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                monto REAL NOT NULL,
+                moneda TEXT DEFAULT 'ARS',
+                cuenta TEXT NOT NULL,
+                frecuencia TEXT NOT NULL,
+                dia_mes INTEGER,
+                activa INTEGER DEFAULT 1,
+                ultima_ejecucion TEXT
+            );
+CREATE TABLE ubicaciones_gastos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                gasto_id INTEGER NOT NULL,
+                latitud REAL,
+                longitud REAL,
+                geohash TEXT,
+                lugar_nombre TEXT,
+                comercio TEXT,
+                FOREIGN KEY (gasto_id) REFERENCES gastos(id)
+            );
+INSERT INTO "ubicaciones_gastos" VALUES(1,7,-34.6001,-58.4002,'0553999','Super','Coto');
+DELETE FROM "sqlite_sequence";
+INSERT INTO "sqlite_sequence" VALUES('categorias',10);
+INSERT INTO "sqlite_sequence" VALUES('cuentas',5);
+INSERT INTO "sqlite_sequence" VALUES('logros',8);
+INSERT INTO "sqlite_sequence" VALUES('temas_colores',7);
+INSERT INTO "sqlite_sequence" VALUES('alertas_configuracion',3);
+INSERT INTO "sqlite_sequence" VALUES('gastos',7);
+INSERT INTO "sqlite_sequence" VALUES('presupuestos',1);
+INSERT INTO "sqlite_sequence" VALUES('deudas_compartidas',1);
+INSERT INTO "sqlite_sequence" VALUES('reglas_geofence',1);
+INSERT INTO "sqlite_sequence" VALUES('ubicaciones_gastos',1);
+INSERT INTO "sqlite_sequence" VALUES('alertas',3);
+COMMIT;
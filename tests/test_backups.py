@@ -0,0 +1,103 @@
+import datetime
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import main
+
+COPIAS_REPOSITORIO = Path(__file__).resolve().parent.parent / 'data' / 'backups'
+
+
+def crear_base(ruta, filas=3000):
+    """Base de varios trozos: ~600 KB de texto repartido en filas"""
+    conn = sqlite3.connect(ruta)
+    conn.execute('CREATE TABLE gastos (id INTEGER PRIMARY KEY, descripcion TEXT)')
+    conn.executemany('INSERT INTO gastos (descripcion) VALUES (?)', [(f'gasto {i:05d} ' + 'x' * 180,) for i in range(filas)])
+    conn.commit()
+    conn.close()
+
+
+def descripcion(ruta, id_):
+    conn = sqlite3.connect(ruta)
+    try:
+        assert conn.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+        return conn.execute('SELECT descripcion FROM gastos WHERE id = ?', (id_,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_ida_y_vuelta_con_deduplicacion(tmp_path):
+    base = tmp_path / 'gastos.db'
+    crear_base(base)
+    almacen = main.AlmacenBackups(tmp_path / 'almacen')
+
+    primera = almacen.guardar(origen=base, fecha=datetime.datetime(2025, 3, 1, 23))
+    conn = sqlite3.connect(base)
+    conn.execute("UPDATE gastos SET descripcion = 'cambiado' WHERE id = 1500")
+    conn.commit()
+    conn.close()
+    segunda = almacen.guardar(origen=base, fecha=datetime.datetime(2025, 3, 2, 23))
+
+    # Solo los trozos que cambiaron ocupan lugar otra vez
+    assert len(primera.trozos) > 4
+    nuevos = set(segunda.trozos) - set(primera.trozos)
+    assert 1 <= len(nuevos) <= 2
+    assert len(list(almacen.objetos.glob('*/*'))) == len(set(primera.trozos) | set(segunda.trozos))
+
+    restaurada = almacen.restaurar(primera.nombre, tmp_path / 'primera.db')
+    assert restaurada.stat().st_size == primera.tamano
+    assert descripcion(restaurada, 1500).startswith('gasto 01499')
+    assert descripcion(almacen.restaurar(segunda.nombre, tmp_path / 'segunda.db'), 1500) == 'cambiado'
+
+
+def test_restaurar_trozo_danado(tmp_path):
+    base = tmp_path / 'gastos.db'
+    crear_base(base)
+    almacen = main.AlmacenBackups(tmp_path / 'almacen')
+    instantanea = almacen.guardar(origen=base)
+    objeto = almacen._objeto(instantanea.trozos[-1])
+    objeto.write_bytes(main.zlib.compress(b'\0' * main.TAMANO_TROZO_BACKUP))
+
+    with pytest.raises(main.BackupCorrupto):
+        almacen.restaurar(instantanea.nombre, tmp_path / 'restaurada.db')
+    assert not (tmp_path / 'restaurada.db').exists()
+
+
+def test_retencion_tras_dias_simulados(tmp_path):
+    # Un backup diario a las 23 h del 2024-01-01 al lunes 2025-03-31, con la retención de la app
+    base = tmp_path / 'gastos.db'
+    crear_base(base, filas=10)
+    almacen = main.AlmacenBackups(tmp_path / 'almacen')
+    dia = datetime.date(2024, 1, 1)
+    while dia <= datetime.date(2025, 3, 31):
+        almacen.guardar(origen=base, fecha=datetime.datetime.combine(dia, datetime.time(23)))
+        almacen.aplicar_retencion(**main.RETENCION_BACKUPS)
+        dia += datetime.timedelta(days=1)
+
+    diarios = [f'202503{d}' for d in range(25, 32)]
+    semanales = ['20250323', '20250316']
+    mensuales = ['20240430', '20240531', '20240630', '20240731', '20240831', '20240930',
+                 '20241031', '20241130', '20241231', '20250131', '20250228']
+    assert [i.nombre for i in almacen.instantaneas()] == [f'{d}_230000' for d in sorted(diarios + semanales + mensuales)]
+    # Los trozos de las instantáneas borradas se recolectaron
+    assert almacen.recolectar() == 0
+
+
+def test_importar_copias_sueltas(tmp_path):
+    directorio = tmp_path / 'backups'
+    directorio.mkdir()
+    shutil.copyfile(COPIAS_REPOSITORIO / 'gastos_auto_20251017.db', directorio / 'gastos_auto_20251017.db')
+    crear_base(directorio / 'backup_20251018_101500.db')
+    (directorio / 'auto_20251019.db').write_bytes(b'esto no es una base')
+    crear_base(directorio / 'otra.db')
+    almacen = main.AlmacenBackups(directorio / 'almacen')
+
+    assert almacen.importar_copias() == ['backup_20251018_101500.db', 'gastos_auto_20251017.db']
+    assert sorted(p.name for p in directorio.glob('*.db')) == ['auto_20251019.db', 'otra.db']
+    assert [i.nombre for i in almacen.instantaneas()] == ['20251017_000000', '20251018_101500']
+    assert descripcion(almacen.restaurar('20251018_101500', tmp_path / 'r.db'), 1).startswith('gasto 00000')
+
+    # Una segunda pasada no vuelve a importar nada
+    assert almacen.importar_copias() == []
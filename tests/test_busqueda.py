@@ -0,0 +1,50 @@
+import pytest
+
+GASTOS = {
+    'cafe_leche': ('Café con leche', ''),
+    'cafe_cortado': ('Cafe cortado', ''),
+    'pizza': ('Pizza "La Mezzetta"', ''),
+    'pastas': ("Pastas D'Angelo", ''),
+    'cine': ('Cine AND pochoclos', ''),
+    'regalo': ('Regalo NOT envuelto', ''),
+    'super': ('Supermercado (Coto)', 'compra semanal*'),
+}
+
+
+@pytest.fixture
+def ids(db):
+    return {clave: db.agregar_gasto('2025-01-01', '🍕 Comida', 100, 'ARS', descripcion, 'Efectivo', notas)
+            for clave, (descripcion, notas) in GASTOS.items()}
+
+
+@pytest.mark.parametrize('texto, esperados', [
+    # Acentos: con o sin tilde, en mayúsculas o minúsculas, encuentra lo mismo
+    ('café', {'cafe_leche', 'cafe_cortado'}),
+    ('cafe', {'cafe_leche', 'cafe_cortado'}),
+    ('CAFÉ LECHE', {'cafe_leche'}),
+    ('supermércado', {'super'}),
+    # Comillas, asteriscos, paréntesis y apóstrofos no rompen la consulta
+    ('"', set()),
+    ('"mezzetta', {'pizza'}),
+    ('la mezzetta"', {'pizza'}),
+    ('*', set()),
+    ('super*', {'super'}),
+    ('semanal*', {'super'}),
+    ('(', set()),
+    ('(coto)', {'super'}),
+    ('coto)', {'super'}),
+    ("'", set()),
+    ("d'angelo", {'pastas'}),
+    ("'pastas", {'pastas'}),
+    ('-', set()),
+    ('NEAR(', set()),
+    # Los operadores de FTS5 se buscan como palabras
+    ('AND', {'cine'}),
+    ('cine AND', {'cine'}),
+    ('NOT', {'regalo'}),
+    ('NOT envuelto', {'regalo'}),
+    ('regalo NOT envuelto', {'regalo'}),
+    ('pizza OR cine', set()),
+])
+def test_buscar_texto_especial(db, ids, texto, esperados):
+    assert {g.id for g in db.buscar_gastos(texto)} == {ids[clave] for clave in esperados}
@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+import pytest
+
+from main import Dinero
+
+
+@pytest.mark.parametrize('dinero, numero', [
+    (Dinero(100), 1),
+    (Dinero(150), 1.5),
+    (Dinero(-250), Decimal('-2.50')),
+    (Dinero(10), Decimal('0.1')),
+    (Dinero(0), 0),
+])
+def test_igual_a_numero_con_el_mismo_hash(dinero, numero):
+    assert dinero == numero and numero == dinero
+    assert hash(dinero) == hash(numero)
+    assert len({dinero, numero}) == 1
+
+
+def test_igualdad_exacta_con_float():
+    # 0.1 no es exactamente un décimo: no es igual a 10 centavos
+    assert Dinero(10) != 0.1
+    assert Dinero(100) != 100
+    assert Dinero.desde(0.1) == Dinero(10)
+
+
+@pytest.mark.parametrize('numero', [0.1, 0.05, 0.11, Decimal('0.1'), 1, -0.1])
+def test_orden_coherente_con_la_igualdad(numero):
+    dinero = Dinero(10)
+    menor, igual, mayor = dinero < numero, dinero == numero, dinero > numero
+    assert menor + igual + mayor == 1
+    assert (dinero <= numero) == (menor or igual)
+    assert (dinero >= numero) == (mayor or igual)
+
+
+def test_int_trunca_hacia_cero_sin_float():
+    assert [int(Dinero(c)) for c in (199, -199, -100, 5, 0)] == [1, -1, -1, 0, 0]
+    assert int(Dinero(10 ** 20 + 99)) == 10 ** 18
@@ -0,0 +1,19 @@
+import pytest
+
+
+def gasto(dia, **extra):
+    return dict(fecha=f'2025-01-{dia:02d}', categoria='🍕 Comida', monto=100 + dia, cuenta='Efectivo', **extra)
+
+
+def test_lote_devuelve_ids_en_orden(db):
+    ids = db.agregar_gastos_lote((gasto(dia, tags=['super']) for dia in range(1, 8)), tamano_lote=3)
+    assert len(ids) == 7
+    assert {g.id: g.fecha for g in db.obtener_gastos('2025-01')} == {i: f'2025-01-{d:02d}' for i, d in zip(ids, range(1, 8))}
+    assert db.conn.execute('SELECT COUNT(*) FROM tags').fetchone()[0] == 7
+
+
+@pytest.mark.parametrize('tamano_lote', [0, -1])
+def test_lote_invalido(db, tamano_lote):
+    with pytest.raises(ValueError):
+        db.agregar_gastos_lote([gasto(1)], tamano_lote=tamano_lote)
+    assert db.obtener_gastos() == []
@@ -0,0 +1,41 @@
+import math
+import random
+
+import pytest
+
+import main
+
+
+def test_vector_conocido():
+    # Ejemplo de la descripción original del geohash (Jutlandia, Dinamarca)
+    assert main.geohash_codificar(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert main.geohash_codificar(57.64911, 10.40744) == 'u4pruydqq'
+
+
+def destino(lat, lon, rumbo, metros):
+    """Punto a `metros` de (lat, lon) con rumbo en grados (puede cruzar el polo o el antimeridiano)"""
+    fi, lam, tita, delta = math.radians(lat), math.radians(lon), math.radians(rumbo), metros / main.RADIO_TIERRA_M
+    fi2 = math.asin(math.sin(fi) * math.cos(delta) + math.cos(fi) * math.sin(delta) * math.cos(tita))
+    lam2 = lam + math.atan2(math.sin(tita) * math.sin(delta) * math.cos(fi),
+                            math.cos(delta) - math.sin(fi) * math.sin(fi2))
+    return math.degrees(fi2), (math.degrees(lam2) + 180) % 360 - 180
+
+
+@pytest.mark.parametrize('lat, lon', [
+    (0.0, 179.9999), (0.0, -179.9999), (-33.5, 180.0),   # antimeridiano
+    (89.9999, 0.0), (-89.995, 120.0), (89.7, -179.95),   # polos
+    (57.64911, 10.40744),
+])
+@pytest.mark.parametrize('radio', [50, 2000, 40000])
+def test_radio_contra_fuerza_bruta(db, lat, lon, radio):
+    aleatorio = random.Random(f'{lat},{lon},{radio}')
+    puntos = [destino(lat, lon, aleatorio.uniform(0, 360), aleatorio.uniform(0, 2.5 * radio)) for _ in range(300)]
+    ids = db.agregar_gastos_lote([
+        dict(fecha='2025-01-01', categoria='🍕 Comida', monto=1, moneda='ARS', descripcion='x', cuenta='Efectivo',
+             ubicacion={'lat': p_lat, 'lon': p_lon}) for p_lat, p_lon in puntos])
+
+    esperados = {i for i, (p_lat, p_lon) in zip(ids, puntos) if main.distancia_metros(lat, lon, p_lat, p_lon) <= radio}
+    encontrados = [g.id for g in db.obtener_gastos_por_ubicacion(lat, lon, radio)]
+    assert len(encontrados) == len(set(encontrados))
+    assert set(encontrados) == esperados
+    assert esperados and len(esperados) < len(puntos)
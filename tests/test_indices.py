@@ -0,0 +1,84 @@
+"""Las consultas de gastos por período usan índices (EXPLAIN QUERY PLAN)"""
+import random
+import re
+
+import pytest
+
+MES = '2025-03'
+PERIODO = {'desde': '2025-03-01', 'hasta': '2025-04-01'}
+
+
+@pytest.fixture
+def db_con_gastos(db):
+    aleatorio = random.Random(0)
+    categorias = [c.nombre for c in db.obtener_categorias()][:5]
+    db.agregar_gastos_lote(
+        dict(fecha=f'2025-{aleatorio.randint(1, 12):02d}-{aleatorio.randint(1, 28):02d}',
+             categoria=aleatorio.choice(categorias), monto=aleatorio.randint(100, 9000),
+             cuenta=aleatorio.choice(['💵 Efectivo', '💳 Débito']), descripcion='compra')
+        for _ in range(2000))
+    db.categorias_prueba = categorias
+    return db
+
+
+def planes(db, llamada):
+    """EXPLAIN QUERY PLAN de cada SELECT sobre gastos o resumen_mensual que ejecuta `llamada`"""
+    sentencias = []
+    for conn in (db.conn, db.conn_lectura):
+        conn.set_trace_callback(sentencias.append)
+    try:
+        llamada()
+    finally:
+        for conn in (db.conn, db.conn_lectura):
+            conn.set_trace_callback(None)
+
+    resultado = {}
+    for sql in sentencias:
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            continue
+        if not re.search(r'\bFROM\s+(gastos|resumen_mensual)\b(?!_)', sql):
+            continue
+        resultado[sql] = [fila[3] for fila in db.conn_lectura.execute(f'EXPLAIN QUERY PLAN {sql}')]
+    return resultado
+
+
+def escaneos(plan):
+    """Pasos que recorren gastos o resumen_mensual enteros (sin índice)"""
+    return [paso for paso in plan if re.match(r'SCAN (gastos|g|resumen_mensual)\b(?!.*USING)', paso)]
+
+
+@pytest.mark.parametrize('filtros, indice', [
+    ({}, 'idx_gastos_fecha'),
+    ({'categoria': 0}, 'idx_gastos_categoria_fecha'),
+    ({'cuenta': '💵 Efectivo'}, 'idx_gastos_cuenta_fecha'),
+])
+def test_pagina_del_periodo_usa_indice(db_con_gastos, filtros, indice):
+    db = db_con_gastos
+    filtros = {clave: db.categorias_prueba[valor] if clave == 'categoria' else valor for clave, valor in filtros.items()}
+    consultas = planes(db, lambda: db.pagina_gastos(filtros={**PERIODO, **filtros}))
+    assert consultas
+    for plan in consultas.values():
+        assert any(f'USING INDEX {indice}' in paso or f'USING COVERING INDEX {indice}' in paso for paso in plan), plan
+
+
+def test_gastos_del_mes_usan_idx_gastos_fecha(db_con_gastos):
+    consultas = planes(db_con_gastos, lambda: db_con_gastos.obtener_gastos(MES))
+    assert [plan for plan in consultas.values()] == [['SEARCH gastos USING INDEX idx_gastos_fecha (fecha>? AND fecha<?)']]
+
+
+@pytest.mark.parametrize('llamada', [
+    lambda db: list(db.iterar_gastos({**PERIODO, 'categoria': db.categorias_prueba[1]})),
+    lambda db: db.contar_gastos(PERIODO),
+    lambda db: db.obtener_totales_categoria(MES),
+    lambda db: db.obtener_total_mes(MES),
+    lambda db: db.calcular_finscore(),
+    lambda db: db.finscores_diarios('2025-01-01', '2025-03-01'),
+    lambda db: db.verificar_presupuestos(MES),
+    lambda db: db.verificar_gastos_inusuales(MES),
+    lambda db: db.detectar_suscripciones_no_usadas(),
+])
+def test_consultas_publicas_no_recorren_gastos(db_con_gastos, llamada):
+    for sql, plan in planes(db_con_gastos, lambda: llamada(db_con_gastos)).items():
+        assert not escaneos(plan), (sql, plan)
+        if re.search(r'\bFROM\s+gastos\b(?!_)', sql):
+            assert any('idx_gastos_' in paso or 'PRIMARY KEY' in paso for paso in plan), (sql, plan)
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+import main
+
+
+def minimo_por_fuerza_bruta(saldos):
+    """Mínimo de transferencias por backtracking: cada saldo pendiente se vuelca en otro de signo contrario"""
+    saldos = list(saldos)
+
+    def buscar(inicio):
+        while inicio < len(saldos) and saldos[inicio] == 0:
+            inicio += 1
+        if inicio == len(saldos):
+            return 0
+        mejor = None
+        for k in range(inicio + 1, len(saldos)):
+            if saldos[k] * saldos[inicio] < 0:
+                saldos[k] += saldos[inicio]
+                costo = 1 + buscar(inicio + 1)
+                saldos[k] -= saldos[inicio]
+                mejor = costo if mejor is None else min(mejor, costo)
+        return mejor
+
+    return buscar(0)
+
+
+def saldos_al_azar(aleatorio, n):
+    # Valores chicos y repetidos para que haya muchos subconjuntos que suman cero
+    saldos = [aleatorio.choice([-3, -2, -1, 1, 2, 3]) * aleatorio.choice([100, 250]) for _ in range(n - 1)]
+    return saldos + [-sum(saldos)]
+
+
+@pytest.mark.parametrize('n', range(2, 8))
+def test_liquidacion_minima_contra_fuerza_bruta(n):
+    aleatorio = random.Random(n)
+    for _ in range(60):
+        saldos = saldos_al_azar(aleatorio, n)
+        balances = {f'p{i}': main.Dinero(s) for i, s in enumerate(saldos)}
+
+        transacciones = main.liquidar_saldos(balances)
+
+        assert len(transacciones) == minimo_por_fuerza_bruta(saldos)
+        netos = dict(balances)
+        for deudor, acreedor, monto in transacciones:
+            assert deudor != acreedor and monto > 0
+            netos[deudor] += monto
+            netos[acreedor] -= monto
+        assert all(neto.centavos == 0 for neto in netos.values())
+
+
+@pytest.mark.parametrize('n', range(1, 8))
+def test_grupos_suma_cero_son_particion(n):
+    aleatorio = random.Random(100 + n)
+    for _ in range(60):
+        saldos = saldos_al_azar(aleatorio, n)
+        grupos = main.grupos_suma_cero(saldos)
+        assert sorted(i for grupo in grupos for i in grupo) == list(range(n))
+        assert all(sum(saldos[i] for i in grupo) == 0 for grupo in grupos)
+        # k grupos que se cancelan se saldan con n - k transferencias, y eso es el mínimo
+        assert n - len(grupos) == minimo_por_fuerza_bruta(saldos)
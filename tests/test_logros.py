@@ -0,0 +1,52 @@
+import datetime
+import random
+
+import pytest
+
+TABLAS_LOGROS = ('dias_registro', 'rachas', 'estado_logros')
+
+
+def estado(db):
+    return {tabla: db.conn.execute(f'SELECT * FROM {tabla} ORDER BY 1').fetchall() for tabla in TABLAS_LOGROS}
+
+
+def fecha_al_azar(aleatorio):
+    # Días de enero con huecos para que las rachas se unan y se partan; a veces con hora
+    dia = datetime.date(2025, 1, 1) + datetime.timedelta(days=aleatorio.randrange(25))
+    return f'{dia} 12:30' if aleatorio.random() < 0.2 else dia.isoformat()
+
+
+def test_rachas_a_mano(db):
+    ids = {dia: db.agregar_gasto(f'2025-01-{dia:02d}', '🍕 Comida', 100, 'ARS', 'x', 'Efectivo') for dia in (1, 2, 3, 5, 6)}
+    assert db.conn.execute('SELECT * FROM rachas ORDER BY inicio').fetchall() == [
+        ('2025-01-01', '2025-01-03', 3), ('2025-01-05', '2025-01-06', 2)]
+
+    # Llenar el hueco une las dos rachas; vaciar el día del medio las vuelve a partir
+    cuatro = db.agregar_gasto('2025-01-04', '🍕 Comida', 100, 'ARS', 'x', 'Efectivo')
+    assert db.conn.execute('SELECT * FROM rachas').fetchall() == [('2025-01-01', '2025-01-06', 6)]
+    db.eliminar_gasto(ids[2])
+    assert db.conn.execute('SELECT * FROM rachas ORDER BY inicio').fetchall() == [
+        ('2025-01-01', '2025-01-01', 1), ('2025-01-03', '2025-01-06', 4)]
+    with db.transaccion():
+        db.conn.execute("UPDATE gastos SET fecha = '2025-01-02' WHERE id = ?", (cuatro,))
+    assert db.conn.execute('SELECT * FROM rachas ORDER BY inicio').fetchall() == [
+        ('2025-01-01', '2025-01-03', 3), ('2025-01-05', '2025-01-06', 2)]
+
+
+@pytest.mark.parametrize('semilla', range(5))
+def test_triggers_igualan_reconstruccion(db, semilla):
+    aleatorio = random.Random(semilla)
+    ids = []
+    for _ in range(300):
+        operacion = aleatorio.random()
+        if operacion < 0.5 or not ids:
+            ids.append(db.agregar_gasto(fecha_al_azar(aleatorio), '🍕 Comida', 100, 'ARS', 'x', 'Efectivo'))
+        elif operacion < 0.75:
+            with db.transaccion():
+                db.conn.execute('UPDATE gastos SET fecha = ? WHERE id = ?', (fecha_al_azar(aleatorio), aleatorio.choice(ids)))
+        else:
+            db.eliminar_gasto(ids.pop(aleatorio.randrange(len(ids))))
+
+        incremental = estado(db)
+        db.reconstruir_estado_logros()
+        assert incremental == estado(db)
@@ -0,0 +1,145 @@
+"""Migraciones sobre bases creadas por versiones anteriores de la aplicación"""
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from main import Database, Dinero
+
+DATOS = Path(__file__).parent / 'datos'
+# Base que viene con el repositorio, creada por una versión aún más vieja de la app
+BASE_REPOSITORIO = Path(__file__).resolve().parent.parent / 'data' / 'gastos.db'
+
+
+def restaurar_sql(ruta, archivo):
+    conn = sqlite3.connect(ruta)
+    conn.executescript((DATOS / archivo).read_text(encoding='utf-8'))
+    conn.close()
+
+
+def columnas_tabla(conn, tabla):
+    return {fila[1] for fila in conn.execute(f'PRAGMA table_info({tabla})')}
+
+
+def test_base_nueva_queda_en_la_ultima_version(db):
+    assert db.conn.execute('PRAGMA user_version').fetchone()[0] == len(Database.MIGRACIONES)
+
+
+def test_base_de_la_version_inicial(base_temporal):
+    # Volcado de una base creada por el código anterior al motor de migraciones
+    restaurar_sql(base_temporal, 'esquema_inicial.sql')
+
+    db = Database()
+    try:
+        assert db.conn.execute('PRAGMA user_version').fetchone()[0] == len(Database.MIGRACIONES)
+        gastos = db.obtener_gastos('2025-03')
+        assert len(gastos) == 3
+        assert sum(g.monto for g in gastos if g.moneda == 'ARS') == Dinero.desde(1237.56) * 2
+        assert any(c.nombre == '🐶 Mascotas' and c.categoria_padre is None for c in db.obtener_categorias())
+    finally:
+        db.cerrar()
+
+
+def test_columnas_agregadas_a_tablas_existentes(base_temporal):
+    # Tablas creadas antes de que existieran las COLUMNAS_AGREGADAS
+    conn = sqlite3.connect(base_temporal)
+    conn.execute('CREATE TABLE categorias (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT UNIQUE NOT NULL, '
+                 'color TEXT NOT NULL, icono TEXT)')
+    conn.execute("INSERT INTO categorias (nombre, color) VALUES ('Viejas', '#000000')")
+    conn.commit()
+    conn.close()
+
+    db = Database()
+    try:
+        for tabla, columna, _ in Database.COLUMNAS_AGREGADAS:
+            assert columna in columnas_tabla(db.conn, tabla)
+        assert [c.categoria_padre for c in db.obtener_categorias() if c.nombre == 'Viejas'] == [None]
+    finally:
+        db.cerrar()
+
+    # Al día: abrirla otra vez no vuelve a migrar
+    db = Database()
+    try:
+        assert db.conn.execute('PRAGMA user_version').fetchone()[0] == len(Database.MIGRACIONES)
+    finally:
+        db.cerrar()
+
+
+def test_limpieza_de_alertas_repetidas(base_temporal):
+    # El volcado trae la misma alerta dos veces el 2025-01-05 y otra vez el 2025-02-05
+    restaurar_sql(base_temporal, 'esquema_inicial.sql')
+
+    db = Database()
+    try:
+        fechas = [fila[0] for fila in db.conn.execute(
+            "SELECT fecha FROM alertas WHERE tipo = 'vencimiento' ORDER BY fecha")]
+        assert fechas == ['2025-01-05', '2025-02-05']
+    finally:
+        db.cerrar()
+
+
+def test_alertas_de_presupuesto_previas_no_se_repiten(base_temporal):
+    # El volcado tiene el presupuesto 1 ('🍕 Comida', 2025-03); simulamos que ya avisó dos veces
+    restaurar_sql(base_temporal, 'esquema_inicial.sql')
+    conn = sqlite3.connect(base_temporal)
+    conn.executemany("INSERT INTO alertas (tipo, mensaje, fecha, leida, nivel) VALUES ('presupuesto', ?, ?, 1, ?)", [
+        ("⚠️ Presupuesto '🍕 Comida' al 92%: $4,600 de $5,000", '2025-03-18', 'warning'),
+        ("🚨 ¡Presupuesto '🍕 Comida' excedido! 104%: $5,200 de $5,000", '2025-03-25', 'danger'),
+    ])
+    conn.commit()
+    conn.close()
+
+    db = Database()
+    try:
+        assert db.conn.execute('SELECT tipo, referencia, periodo, nivel, fecha FROM alertas_enviadas '
+                               'ORDER BY nivel').fetchall() == [
+            ('presupuesto', '1', '2025-03', '100', '2025-03-25'),
+            ('presupuesto', '1', '2025-03', '90', '2025-03-18'),
+        ]
+        with db.transaccion():
+            assert not db.crear_alerta_unica('presupuesto', 1, '2025-03', 100, 'otra vez', 'danger')
+            assert db.crear_alerta_unica('presupuesto', 1, '2025-04', 100, 'mes nuevo', 'danger')
+        # El historial de alertas queda intacto
+        assert db.conn.execute("SELECT COUNT(*) FROM alertas WHERE tipo = 'presupuesto'").fetchone()[0] == 3
+    finally:
+        db.cerrar()
+
+
+def test_alertas_sin_nivel(base_temporal):
+    conn = sqlite3.connect(base_temporal)
+    conn.execute('CREATE TABLE alertas (id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL, '
+                 'mensaje TEXT NOT NULL, fecha TEXT NOT NULL, leida INTEGER DEFAULT 0)')
+    conn.execute("INSERT INTO alertas (tipo, mensaje, fecha) VALUES ('info', 'Hola', '2025-01-01')")
+    conn.commit()
+    conn.close()
+
+    db = Database()
+    try:
+        assert db.conn.execute('SELECT nivel FROM alertas').fetchall() == [('info',)]
+    finally:
+        db.cerrar()
+
+
+@pytest.mark.skipif(not BASE_REPOSITORIO.exists(), reason='sin data/gastos.db')
+def test_base_del_repositorio(base_temporal):
+    shutil.copy(BASE_REPOSITORIO, base_temporal)
+
+    db = Database()
+    try:
+        assert db.conn.execute('PRAGMA user_version').fetchone()[0] == len(Database.MIGRACIONES)
+        # Las cotizaciones con el formato viejo se conservan en la tabla nueva
+        valores, _ = db.ultimas_cotizaciones('dolarapi')
+        assert valores.keys() >= {'Blue', 'Oficial'}
+        assert db.conn.execute('SELECT COUNT(*) FROM cotizaciones_legacy').fetchone()[0] == len(
+            db.conn.execute("SELECT * FROM cotizaciones WHERE fuente = 'dolarapi'").fetchall())
+        assert db.obtener_categorias()
+
+        gasto_id = db.agregar_gasto('2025-10-20', db.obtener_categorias()[0].nombre, 1500.25, 'ARS', 'prueba', 'Efectivo')
+        assert [g.monto for g in db.obtener_gastos('2025-10') if g.id == gasto_id] == [Dinero.desde(1500.25)]
+    finally:
+        db.cerrar()
+
+    # Reabrirla ya migrada no vuelve a tocar el esquema
+    db = Database()
+    db.cerrar()
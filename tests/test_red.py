@@ -0,0 +1,114 @@
+"""ClienteHTTP contra un servidor HTTP local de prueba"""
+import json
+import threading
+import time
+from concurrent.futures import wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from main import CircuitoAbierto, ClienteHTTP
+
+
+class Stub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.pedidos.append(self.path)
+        ruta, _, consulta = self.path.partition('?')
+        espera = float(consulta.split('=')[1]) if consulta.startswith('espera=') else 0
+        time.sleep(espera)
+        estado = 500 if ruta == '/error' else 200
+        cuerpo = json.dumps({'ruta': ruta}).encode()
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Stub)
+    servidor.daemon_threads = True
+    servidor.pedidos = []
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    servidor.url = f'http://127.0.0.1:{servidor.server_address[1]}'
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def cliente():
+    cliente = ClienteHTTP()
+    yield cliente
+    cliente.pool.shutdown(wait=False)
+
+
+def test_pedidos_iguales_en_curso_se_comparten(servidor, cliente):
+    cliente.registrar_proveedor('stub', timeout=2)
+    url = f'{servidor.url}/datos?espera=0.2'
+    futuros = [cliente.pedir_json('stub', url) for _ in range(5)]
+    assert all(futuro is futuros[0] for futuro in futuros)
+    assert futuros[0].result() == {'ruta': '/datos'}
+    assert servidor.pedidos == ['/datos?espera=0.2']
+
+
+def test_timeout_por_proveedor(servidor, cliente):
+    cliente.registrar_proveedor('lento', timeout=0.1)
+    inicio = time.perf_counter()
+    assert cliente.obtener_json('lento', f'{servidor.url}/datos?espera=1') is None
+    assert time.perf_counter() - inicio < 0.8
+    assert cliente.metricas()['lento']['fallas'] == 1
+
+
+def test_circuito_semiabierto_deja_pasar_una_sola_prueba(servidor, cliente):
+    cliente.registrar_proveedor('caido', timeout=2, umbral_fallas=2, enfriamiento=0.3)
+    for _ in range(2):
+        assert cliente.obtener_json('caido', f'{servidor.url}/error') is None
+    assert cliente.metricas()['caido']['circuito'] == 'abierto'
+
+    # Abierto: falla al instante sin llegar al servidor
+    with pytest.raises(CircuitoAbierto):
+        cliente.pedir_json('caido', f'{servidor.url}/datos').result()
+    assert len(servidor.pedidos) == 2
+
+    # Pasado el enfriamiento, de una ráfaga solo pasa la prueba; como falla, se reabre
+    time.sleep(0.35)
+    futuros = [cliente.pedir_json('caido', f'{servidor.url}/error?espera=0.{i}') for i in range(1, 6)]
+    wait(futuros)
+    assert sum(not isinstance(f.exception(), CircuitoAbierto) for f in futuros) == 1
+    assert len(servidor.pedidos) == 3
+    assert cliente.metricas()['caido']['circuito'] == 'abierto'
+
+    # Una prueba que sale bien cierra el circuito
+    time.sleep(0.35)
+    assert cliente.obtener_json('caido', f'{servidor.url}/datos') == {'ruta': '/datos'}
+    assert cliente.metricas()['caido']['circuito'] == 'cerrado'
+    assert cliente.obtener_json('caido', f'{servidor.url}/otros') == {'ruta': '/otros'}
+
+
+def test_conexion_se_reutiliza(servidor):
+    # Con un solo hilo en el pool, los pedidos sucesivos van por la misma conexión
+    cliente = ClienteHTTP(max_hilos=1)
+    cliente.registrar_proveedor('stub', timeout=2)
+    puertos = set()
+    original = Stub.do_GET
+
+    def do_get(self):
+        puertos.add(self.client_address[1])
+        original(self)
+
+    Stub.do_GET = do_get
+    try:
+        for i in range(3):
+            assert cliente.pedir_json('stub', f'{servidor.url}/datos/{i}').result() == {'ruta': f'/datos/{i}'}
+    finally:
+        Stub.do_GET = original
+        cliente.pool.shutdown(wait=False)
+    assert len(servidor.pedidos) == 3
+    assert len(puertos) == 1
@@ -0,0 +1,63 @@
+"""Los registros piden sus columnas por nombre: todas deben existir en bases migradas"""
+import shutil
+
+import pytest
+
+import main
+from main import Database, columnas
+from test_migraciones import BASE_REPOSITORIO, restaurar_sql
+
+# Registro -> tabla de la que se lee con SELECT {columnas(Registro)}
+TABLAS_REGISTROS = {
+    main.Gasto: 'gastos',
+    main.Categoria: 'categorias',
+    main.Cuenta: 'cuentas',
+    main.Sueldo: 'sueldos',
+    main.MetaAhorro: 'metas_ahorro',
+    main.Tarjeta: 'tarjetas',
+    main.Recurrente: 'transacciones_recurrentes',
+    main.Presupuesto: 'presupuestos',
+    main.CuentaPorPagar: 'cuentas_por_pagar',
+    main.Alerta: 'alertas',
+    main.Deuda: 'deudas_compartidas',
+    main.FinScore: 'finscore_historico',
+    main.Logro: 'logros',
+    main.ReglaContexto: 'reglas_contexto',
+    main.ReglaGeofence: 'reglas_geofence',
+    main.ReglaAhorro: 'reglas_ahorro_auto',
+    main.Suscripcion: 'suscripciones',
+    main.GrupoSplitwise: 'grupos_splitwise',
+    main.ParticipanteSplitwise: 'participantes_splitwise',
+    main.GastoSplitwise: 'gastos_splitwise',
+    main.PresupuestoCompartido: 'presupuestos_compartidos',
+    main.ParticipantePresupuesto: 'participantes_presupuesto',
+    main.AlertaConfiguracion: 'alertas_configuracion',
+    main.NotificacionBuddy: 'notificaciones_buddy',
+    main.TemaColor: 'temas_colores',
+}
+
+
+def preparar_nueva(ruta):
+    pass
+
+
+def preparar_version_inicial(ruta):
+    restaurar_sql(ruta, 'esquema_inicial.sql')
+
+
+def preparar_repositorio(ruta):
+    if not BASE_REPOSITORIO.exists():
+        pytest.skip('sin data/gastos.db')
+    shutil.copy(BASE_REPOSITORIO, ruta)
+
+
+@pytest.mark.parametrize('preparar', [preparar_nueva, preparar_version_inicial, preparar_repositorio])
+def test_registros_se_leen_en_bases_migradas(base_temporal, preparar):
+    preparar(base_temporal)
+    db = Database()
+    try:
+        for registro, tabla in TABLAS_REGISTROS.items():
+            filas = db._consultar(registro, f'SELECT {columnas(registro)} FROM {tabla} LIMIT 5').fetchall()
+            assert all(isinstance(fila, registro) for fila in filas)
+    finally:
+        db.cerrar()
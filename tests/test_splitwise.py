@@ -0,0 +1,52 @@
+import pytest
+
+
+# Cada camino por el que puede cambiar un saldo, sobre los grupos armados en el fixture
+MUTACIONES = {
+    'division_insert': "INSERT INTO divisiones_splitwise (gasto_id, participante, monto_debe) VALUES (1, 'Cami', 500)",
+    'division_update': 'UPDATE divisiones_splitwise SET monto_debe = monto_debe + 150 WHERE id = 2',
+    'division_pagada': 'UPDATE divisiones_splitwise SET pagado = 1 WHERE id = 3',
+    'division_delete': 'DELETE FROM divisiones_splitwise WHERE id = 2',
+    'pago_insert': "INSERT INTO pagos_splitwise (grupo_id, de_quien, para_quien, monto, fecha) "
+                   "VALUES (1, 'Beto', 'Ana', 700, '2025-01-02')",
+    'pago_update_monto': 'UPDATE pagos_splitwise SET monto = 900 WHERE id = 1',
+    'pago_update_personas': "UPDATE pagos_splitwise SET de_quien = 'Cami', para_quien = 'Beto' WHERE id = 1",
+    'pago_update_grupo': 'UPDATE pagos_splitwise SET grupo_id = 2 WHERE id = 1',
+    'pago_delete': 'DELETE FROM pagos_splitwise WHERE id = 1',
+    'gasto_update_pagador': "UPDATE gastos_splitwise SET pagado_por = 'Beto' WHERE id = 1",
+    'gasto_update_grupo': 'UPDATE gastos_splitwise SET grupo_id = 2 WHERE id = 1',
+    'gasto_delete': 'DELETE FROM gastos_splitwise WHERE id = 1',
+}
+
+
+def saldos_guardados(db):
+    return {(g, p): b for g, por_grupo in db.obtener_balances_grupos().items() for p, b in por_grupo.items()}
+
+
+def saldos_recalculados(db, grupos):
+    return {(g, p): b for g in grupos for p, b in db.calcular_balances_grupo(g).items() if b != 0}
+
+
+@pytest.fixture
+def grupo(db):
+    grupos = [db.crear_grupo_splitwise('Viaje'), db.crear_grupo_splitwise('Casa')]
+    for grupo_id in grupos:
+        for nombre in ('Ana', 'Beto', 'Cami'):
+            db.agregar_participante_splitwise(grupo_id, nombre)
+    db.agregar_gasto_splitwise(grupos[0], 'Nafta', 3000, 'Ana')
+    db.agregar_gasto_splitwise(grupos[0], 'Cena', 1000, 'Beto', divisiones={'Ana': 400, 'Cami': 600})
+    db.registrar_pago_splitwise(grupos[0], 'Beto', 'Ana', 250)
+    return grupos
+
+
+@pytest.mark.parametrize('sql', MUTACIONES.values(), ids=MUTACIONES.keys())
+def test_triggers_igualan_recalculo(db, grupo, sql):
+    assert saldos_guardados(db) == saldos_recalculados(db, grupo)
+
+    with db.transaccion():
+        db.conn.execute(sql)
+    guardados = saldos_guardados(db)
+    assert guardados == saldos_recalculados(db, grupo)
+
+    db.reconstruir_balances_splitwise()
+    assert saldos_guardados(db) == guardados